@@ -1,5 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from app.services.user_service import user_service
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.database import get_async_database
+from app.models.user import UserRole
+from app.services.ai_service import ai_service, async_ai_service, model_call_guard
+from app.services.analytics_service import EXPORT_COLUMNS, async_analytics_service
+from app.services.generation_cache import generation_cache
+from app.services.quiz_workers import quiz_followup_worker, quiz_precompute_worker
+from app.utils.auth import get_current_user
+from app.utils.export import EXPORT_FORMATS, encode_rows
 
 router = APIRouter()
 
@@ -7,9 +18,8 @@ router = APIRouter()
 async def list_organizations():
     """List all organizations"""
     try:
-        from app.core.database import get_database
-        db = get_database()
-        orgs = list(db.organizations.find())
+        db = get_async_database()
+        orgs = await db.organizations.find().to_list(length=None)
         for org in orgs:
             org["id"] = str(org["_id"])
         return {"organizations": orgs}
@@ -20,52 +30,33 @@ async def list_organizations():
 async def get_analytics(organization_id: str):
     """Get organization analytics"""
     try:
-        from app.core.database import get_database
-        from datetime import datetime, timedelta
-        db = get_database()
-        
-        # Get organization users
-        users = list(db.users.find({"organization_id": organization_id}))
-        user_ids = [str(user["_id"]) for user in users]
-        
-        # Calculate metrics
-        total_users = len(users)
-        active_users = db.events.count_documents({
-            "organization_id": organization_id,
-            "created_at": {"$gte": datetime.utcnow() - timedelta(days=7)}
-        })
-        
-        # Average tech score
-        avg_tech_score = sum(user.get("tech_score", 0) for user in users) / total_users if total_users > 0 else 0
-        
-        # Participation rate
-        users_with_activity = db.quiz_attempts.distinct("user_id", {
-            "user_id": {"$in": user_ids},
-            "created_at": {"$gte": datetime.utcnow() - timedelta(days=30)}
-        })
-        participation_rate = len(users_with_activity) / total_users if total_users > 0 else 0
-        
-        return {
-            "total_users": total_users,
-            "active_users": active_users,
-            "avg_tech_score": avg_tech_score,
-            "participation_rate": participation_rate
-        }
+        return await async_analytics_service.get_org_analytics(organization_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/ai-metrics")
+async def get_ai_metrics():
+    """Model call counters for tuning throughput against the deployment quota"""
+    return {
+        "calls": model_call_guard.stats(),
+        "concurrency": async_ai_service.stats(),
+        "cache": generation_cache.stats(),
+        "enrichment": ai_service.enrichment_stats(),
+        "quiz_precompute": quiz_precompute_worker.stats(),
+        "quiz_followup": quiz_followup_worker.stats(),
+    }
+
 @router.post("/sources")
 async def add_source(source_data: dict):
     """Add content source"""
     try:
-        from app.core.database import get_database
         from datetime import datetime
-        db = get_database()
+        db = get_async_database()
         
         source_data["created_at"] = datetime.utcnow()
         source_data["updated_at"] = datetime.utcnow()
         
-        result = db.sources.insert_one(source_data)
+        result = await db.sources.insert_one(source_data)
         return {"id": str(result.inserted_id), "status": "created"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -74,29 +65,45 @@ async def add_source(source_data: dict):
 async def generate_report(organization_id: str):
     """Generate organization report"""
     try:
-        from app.core.database import get_database
-        from datetime import datetime, timedelta
-        db = get_database()
-        
-        # Get organization users
-        users = list(db.users.find({"organization_id": organization_id}))
-        user_ids = [str(user["_id"]) for user in users]
-        
-        # Get weekly stats
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        completions = list(db.quiz_attempts.find({
-            "user_id": {"$in": user_ids},
-            "passed": True,
-            "created_at": {"$gte": week_ago}
-        }))
-        
-        return {
-            "organization_id": organization_id,
-            "period": "last_7_days",
-            "total_completions": len(completions),
-            "users": len(user_ids)
-        }
+        return await async_analytics_service.get_org_report(organization_id, days=7)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored timestamps are naive UTC; offsets given by the client are converted to match"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _require_org_admin(current_user: dict, organization_id: str) -> None:
+    """Only an admin of the organization may read its member-level data"""
+    if current_user.get("role") != UserRole.ADMIN.value or current_user.get("organization_id") != organization_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this organization")
+
+@router.get("/reports/export")
+async def export_report(
+    organization_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    view: str = Query("attempts", pattern="^(attempts|users|content)$"),
+    current_user=Depends(get_current_user),
+):
+    """Stream quiz completion data for an organization as CSV or NDJSON.
+
+    ``view`` selects one row per attempt, per user or per content item; the
+    range defaults to the last 7 days and ``end`` is exclusive.
+    """
+    _require_org_admin(current_user, organization_id)
+    end = _naive_utc(end) or datetime.utcnow()
+    start = _naive_utc(start) or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
 
+    rows = async_analytics_service.iter_completion_rows(organization_id, start, end, view=view)
+    filename = f"report_{organization_id}_{view}_{start:%Y%m%d}_{end:%Y%m%d}.{format}"
+    return StreamingResponse(
+        encode_rows(rows, format, EXPORT_COLUMNS[view]),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
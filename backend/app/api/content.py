@@ -1,107 +1,183 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
 from pydantic import BaseModel
-from app.services.content_service import content_service
-from app.services.ai_service import ai_service
+from fastapi.concurrency import run_in_threadpool
+from app.services.content_service import HEAVY_CONTENT_FIELDS, async_content_service
+from app.services.ai_service import async_ai_service
+from app.services.content_index import content_index
+from app.services.event_service import event_writer
+from app.models.event import EventType
 from app.services.elevenlabs_service import elevenlabs_service
 from app.services.storage_service import storage_service
 from app.core.config import settings
-from app.core.database import get_database
+from app.core.database import get_async_database
 from bson import ObjectId
 import json
 import logging
 from app.utils.auth import get_current_user
+from app.utils.sse import KEEPALIVE, format_sse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.get("/{content_id}")
-async def get_content(content_id: str):
-    """Get specific content item"""
+async def get_content(content_id: str, include: Optional[str] = None):
+    """Get specific content item.
+
+    Heavy fields are omitted unless requested, e.g. ``?include=transcript,transcript_segments``.
+    """
     try:
-        content = content_service.get_content_item(content_id)
+        body_fields = [field for field in (include or "").split(",") if field in HEAVY_CONTENT_FIELDS]
+        content = await async_content_service.get_content_item(content_id, body_fields=body_fields)
         if not content:
             raise HTTPException(status_code=404, detail="Content not found")
         return content
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{content_id}/related")
+async def get_related_content(content_id: str, limit: int = 5):
+    """Items most similar to this one by title, summary and tags, with their ``similarity``"""
+    try:
+        await run_in_threadpool(content_index.refresh)
+        ranked = await run_in_threadpool(content_index.related, content_id, min(max(limit, 1), 50))
+        similarities = dict(ranked)
+        cards = await async_content_service.get_content_cards([related_id for related_id, _ in ranked])
+        for card in cards:
+            card["similarity"] = round(similarities[card["id"]], 4)
+        return cards
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting related content: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _narrate(content_id: str, storyboard: list) -> str:
+    """Synthesize the narration and upload it, returning the audio URL"""
+    try:
+        # Generate narration audio
+        audio_bytes = await run_in_threadpool(elevenlabs_service.generate_narration_audio, storyboard)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating narration: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Failed to generate narration audio. ElevenLabs may not be configured: {str(e)}"
+        )
+    
+    try:
+        # Upload audio to blob storage
+        return await run_in_threadpool(
+            storage_service.upload_audio,
+            settings.STORAGE_CONTAINER_SUMMARIES,
+            f"summary_{content_id}",
+            audio_bytes,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading audio: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Failed to upload audio. Azure Storage may not be configured: {str(e)}"
+        )
+
+async def _save_animated_summary(content_id: str, animated_summary: dict) -> None:
+    # Store the storyboard with the other heavy fields; the item keeps the blob URI
+    db = get_async_database()
+    await async_content_service.save_content_body(content_id, {"animated_summary": animated_summary})
+    await db.content_items.update_one(
+        {"_id": ObjectId(content_id)},
+        {"$set": {"summary_blob_uri": animated_summary["audio_url"]}}
+    )
+
+async def _stream_animated_summary(content_id: str, content: dict) -> AsyncIterator[str]:
+    """``step`` per storyboard step as it is parsed, ``audio`` once uploaded, then ``done``"""
+    animated_summary = content.get("animated_summary")
+    if animated_summary:
+        for step in animated_summary.get("storyboard", []):
+            yield format_sse("step", step)
+        yield format_sse("audio", {"audio_url": animated_summary.get("audio_url")})
+        yield format_sse("done", animated_summary)
+        return
+
+    storyboard = []
+    try:
+        async for step in async_ai_service.stream_storyboard(content["summary"]):
+            storyboard.append(step)
+            yield format_sse("step", step)
+        if not storyboard:
+            raise HTTPException(status_code=503, detail="Failed to generate storyboard")
+        yield KEEPALIVE
+        audio_url = await _narrate(content_id, storyboard)
+        yield format_sse("audio", {"audio_url": audio_url})
+
+        animated_summary = {
+            "storyboard": storyboard,
+            "audio_url": audio_url
+        }
+        await _save_animated_summary(content_id, animated_summary)
+        yield format_sse("done", animated_summary)
+    except HTTPException as e:
+        yield format_sse("failed", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        logger.error(f"Error streaming animated summary: {e}")
+        yield format_sse("failed", {"status_code": 500, "detail": str(e)})
+
 @router.get("/{content_id}/summary")
-async def get_animated_summary(content_id: str):
-    """Get or generate animated summary for content"""
+async def get_animated_summary(content_id: str, stream: bool = False):
+    """Get or generate animated summary for content.
+
+    ``?stream=true`` answers with server-sent events instead, so the storyboard
+    can be shown while it is still being generated.
+    """
     try:
-        db = get_database()
-        content = content_service.get_content_item(content_id)
+        content = await async_content_service.get_content_item(content_id, body_fields=("animated_summary",))
         if not content:
             raise HTTPException(status_code=404, detail="Content not found")
         
         # Check if animated summary already exists
-        if content.get("animated_summary"):
+        if content.get("animated_summary") and not stream:
             return content["animated_summary"]
         
-        # Generate storyboard
         summary = content.get("summary", "")
-        if not summary:
+        if not summary and not content.get("animated_summary"):
             raise HTTPException(status_code=400, detail="Content summary not available")
         
-        try:
-            storyboard = ai_service.generate_storyboard(summary)
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Error generating storyboard: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail=f"Failed to generate storyboard. Azure OpenAI may not be configured: {str(e)}"
+        if stream:
+            return StreamingResponse(
+                _stream_animated_summary(content_id, content),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
             )
         
+        # Generate storyboard
         try:
-            # Generate narration audio
-            audio_bytes = elevenlabs_service.generate_narration_audio(storyboard)
+            storyboard = await async_ai_service.generate_storyboard(summary)
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error generating narration: {e}")
+            logger.error(f"Error generating storyboard: {e}")
             raise HTTPException(
                 status_code=503,
-                detail=f"Failed to generate narration audio. ElevenLabs may not be configured: {str(e)}"
+                detail=f"Failed to generate storyboard. Azure OpenAI may not be configured: {str(e)}"
             )
         
-        try:
-            # Upload audio to blob storage
-            audio_url = storage_service.upload_audio(
-                settings.STORAGE_CONTAINER_SUMMARIES,
-                f"summary_{content_id}",
-                audio_bytes,
-            )
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Error uploading audio: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail=f"Failed to upload audio. Azure Storage may not be configured: {str(e)}"
-            )
+        audio_url = await _narrate(content_id, storyboard)
         
         # Save animated summary
         animated_summary = {
             "storyboard": storyboard,
             "audio_url": audio_url
         }
-        
-        # Update content item
-        db.content_items.update_one(
-            {"_id": ObjectId(content_id)},
-            {
-                "$set": {
-                    "animated_summary": animated_summary,
-                    "summary_blob_uri": audio_url,
-                }
-            }
-        )
+        await _save_animated_summary(content_id, animated_summary)
         
         return animated_summary
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -109,17 +185,13 @@ async def get_animated_summary(content_id: str):
 async def mark_content_complete(content_id: str, current_user=Depends(get_current_user)):
     """Mark content as completed by user (viewed, not streak-eligible)"""
     try:
-        from datetime import datetime
-        db = get_database()
-        # Create event for tracking views
-        event = {
-            "user_id": current_user["id"],
-            "content_id": content_id,
-            "event_type": "content_viewed",
-            "organization_id": current_user.get("organization_id"),
-            "created_at": datetime.utcnow()
-        }
-        db.events.insert_one(event)
+        # Buffered; the events writer batches inserts and rollup updates
+        await event_writer.record(
+            EventType.CONTENT_VIEWED,
+            current_user["id"],
+            organization_id=current_user.get("organization_id"),
+            content_id=content_id,
+        )
         
         # Note: Streak is ONLY updated after a passed quiz, not on content completion
         # This endpoint just tracks that the user viewed the content
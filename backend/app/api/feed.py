@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
 
-from app.services.content_service import content_service
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.services.content_service import async_content_service
 from app.utils.auth import get_current_user
+from app.utils.pagination import InvalidCursorError
 
 router = APIRouter()
 
 
 @router.get("")
-async def get_feed(current_user=Depends(get_current_user)):
-    """Get personalized feed for the authenticated user."""
+async def get_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """Get a page of the personalized feed; pass ``next_cursor`` back to continue."""
     try:
-        feed = content_service.get_user_feed(current_user["id"])
-        return {"feed": feed}
+        return await async_content_service.get_feed_page(current_user, limit=limit, cursor=cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -20,7 +28,7 @@ async def get_feed(current_user=Depends(get_current_user)):
 async def get_todays_content(current_user=Depends(get_current_user)):
     """Get today's top content for streak tracking."""
     try:
-        content = content_service.get_todays_top_content(current_user["id"])
+        content = await async_content_service.get_todays_top_content(current_user)
         if not content:
             return {"content": None, "message": "No content available for today"}
         return {"content": content}
@@ -32,8 +40,7 @@ async def get_todays_content(current_user=Depends(get_current_user)):
 async def get_daily_feed_options(current_user=Depends(get_current_user)):
     """Get the latest article, video, and podcast options for the user."""
     try:
-        options = content_service.get_daily_feed_options(current_user["id"])
+        options = await async_content_service.get_daily_feed_options(current_user)
         return options
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
-
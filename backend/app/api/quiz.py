@@ -1,24 +1,87 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from app.services.quiz_service import quiz_service
-from app.services.user_service import user_service
+from typing import AsyncIterator, List, Optional
+from bson import ObjectId
+from app.core.config import settings
+from app.core.database import get_async_database
+from app.models.quiz import FollowupStatus
+from app.services.quiz_workers import quiz_followup_worker, quiz_precompute_worker
+from app.services.quiz_service import QuizGenerationPending, async_quiz_service
+from app.services.user_service import async_user_service
 from app.utils.auth import get_current_user
+from app.utils.sse import KEEPALIVE, format_sse
 
 router = APIRouter()
 
+# Seconds a client should wait before asking again for a quiz still being generated
+QUIZ_PENDING_RETRY_AFTER = 5
+# How often the follow-up event stream checks the attempt, and how many checks between keepalives
+FOLLOWUP_STREAM_POLL_SECONDS = 1.0
+FOLLOWUP_STREAM_KEEPALIVE_POLLS = 15
+
 class QuizSubmitRequest(BaseModel):
     answers: List[int]
     quiz_id: Optional[str] = None
 
+def _pending_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={"status": "pending", "retry_after": QUIZ_PENDING_RETRY_AFTER},
+        headers={"Retry-After": str(QUIZ_PENDING_RETRY_AFTER)},
+    )
+
+async def _followup_events(attempt_id: str, user_id: str) -> AsyncIterator[str]:
+    """Emit the follow-up state whenever it changes, until it is ready or has failed for good"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.QUIZ_FOLLOWUP_STREAM_SECONDS
+    last_state = None
+    polls = 0
+    while loop.time() < deadline:
+        payload = await async_quiz_service.get_followup(attempt_id, user_id)
+        if payload is None:
+            yield format_sse("failed", {"detail": "Attempt not found"})
+            return
+        # A retry can fail again between polls, so a change to final is news too
+        if (payload["status"], payload["final"]) != last_state:
+            last_state = (payload["status"], payload["final"])
+            yield format_sse("status", payload)
+        if payload["final"]:
+            return
+        polls += 1
+        if polls % FOLLOWUP_STREAM_KEEPALIVE_POLLS == 0:
+            yield KEEPALIVE
+        await asyncio.sleep(FOLLOWUP_STREAM_POLL_SECONDS)
+    yield format_sse("timeout", {"job_id": attempt_id, "status": last_state[0] if last_state else None})
+
 @router.get("/content/{content_id}")
 async def get_quiz(content_id: str, version: int = 1, current_user=Depends(get_current_user)):
     """Get quiz for content item"""
     try:
-        quiz = quiz_service.get_or_create_quiz(content_id, version)
-        if not quiz:
+        quiz = await async_quiz_service.get_quiz(content_id, version)
+        if quiz:
+            return quiz
+        if version != 1:
             raise HTTPException(status_code=404, detail="Quiz not found")
-        return quiz
+
+        if not settings.QUIZ_PRECOMPUTE_ENABLED:
+            # No worker drains the queue, so generate it in this request
+            try:
+                quiz = await async_quiz_service.get_or_create_quiz(content_id, version)
+            except QuizGenerationPending:
+                return _pending_response()
+            if not quiz:
+                raise HTTPException(status_code=404, detail="Quiz not found")
+            return quiz
+
+        # Not generated yet: move it to the front of the precompute queue
+        if await async_quiz_service.request_quiz(content_id) is None:
+            raise HTTPException(status_code=404, detail="Content not found")
+        quiz_precompute_worker.notify()
+        return _pending_response()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -26,9 +89,7 @@ async def get_quiz(content_id: str, version: int = 1, current_user=Depends(get_c
 async def submit_quiz(content_id: str, request: QuizSubmitRequest, current_user=Depends(get_current_user)):
     """Submit quiz answers"""
     try:
-        from app.core.database import get_database
-        from bson import ObjectId
-        db = get_database()
+        db = get_async_database()
         
         # Determine which quiz to use
         quiz = None
@@ -36,41 +97,41 @@ async def submit_quiz(content_id: str, request: QuizSubmitRequest, current_user=
         
         # If quiz_id was provided in request, use it (for retries)
         if request.quiz_id:
-            quiz = db.quizzes.find_one({"_id": ObjectId(request.quiz_id)})
+            quiz = await db.quizzes.find_one({"_id": ObjectId(request.quiz_id)})
             if quiz:
                 quiz["id"] = str(quiz["_id"])
-                attempt_count = db.quiz_attempts.count_documents(
+                attempt_count = await db.quiz_attempts.count_documents(
                     {"user_id": current_user["id"], "content_id": content_id}
                 )
                 attempt_number = attempt_count + 1
             else:
                 raise HTTPException(status_code=404, detail="Quiz not found")
         else:
-            latest_attempt = db.quiz_attempts.find_one(
+            latest_attempt = await db.quiz_attempts.find_one(
                 {"user_id": current_user["id"], "content_id": content_id},
                 sort=[("created_at", -1)]
             )
 
             if latest_attempt and latest_attempt.get("next_quiz_id") and not latest_attempt.get("passed"):
-                quiz = db.quizzes.find_one({"_id": ObjectId(latest_attempt["next_quiz_id"])})
+                quiz = await db.quizzes.find_one({"_id": ObjectId(latest_attempt["next_quiz_id"])})
                 if quiz:
                     quiz["id"] = str(quiz["_id"])
-                    attempt_count = db.quiz_attempts.count_documents(
+                    attempt_count = await db.quiz_attempts.count_documents(
                         {"user_id": current_user["id"], "content_id": content_id}
                     )
                     attempt_number = attempt_count + 1
                 else:
-                    quiz = quiz_service.get_or_create_quiz(content_id, version=1)
+                    quiz = await async_quiz_service.get_quiz(content_id, version=1)
                     attempt_number = 1
             else:
-                quiz = quiz_service.get_or_create_quiz(content_id, version=1)
+                quiz = await async_quiz_service.get_quiz(content_id, version=1)
                 attempt_number = 1
         
         if not quiz:
             raise HTTPException(status_code=404, detail="Quiz not found")
         
         # Submit answers
-        result = quiz_service.submit_quiz(
+        result = await async_quiz_service.submit_quiz(
             current_user["id"],
             content_id,
             str(quiz["_id"]),
@@ -80,9 +141,13 @@ async def submit_quiz(content_id: str, request: QuizSubmitRequest, current_user=
         
         # If passed, update streak
         if result.get("status") == "passed":
-            user_service.update_streak(current_user["id"])
+            await async_user_service.update_streak(current_user["id"])
+        elif result.get("job_id"):
+            quiz_followup_worker.notify()
         
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -90,12 +155,10 @@ async def submit_quiz(content_id: str, request: QuizSubmitRequest, current_user=
 async def get_retry_quiz(content_id: str, current_user=Depends(get_current_user)):
     """Get retry quiz after failure"""
     try:
-        from app.core.database import get_database
-        from bson import ObjectId
-        db = get_database()
+        db = get_async_database()
         
         # Get the latest attempt to find next_quiz_id
-        latest_attempt = db.quiz_attempts.find_one(
+        latest_attempt = await db.quiz_attempts.find_one(
             {"user_id": current_user["id"], "content_id": content_id},
             sort=[("created_at", -1)]
         )
@@ -108,9 +171,11 @@ async def get_retry_quiz(content_id: str, current_user=Depends(get_current_user)
         
         next_quiz_id = latest_attempt.get("next_quiz_id")
         if not next_quiz_id:
+            if latest_attempt.get("followup_status") in (FollowupStatus.PENDING.value, FollowupStatus.GENERATING.value):
+                return _pending_response()
             raise HTTPException(status_code=404, detail="Retry quiz not available")
         
-        quiz = db.quizzes.find_one({"_id": ObjectId(next_quiz_id)})
+        quiz = await db.quizzes.find_one({"_id": ObjectId(next_quiz_id)})
         if not quiz:
             raise HTTPException(status_code=404, detail="Retry quiz not found")
         
@@ -121,4 +186,26 @@ async def get_retry_quiz(content_id: str, current_user=Depends(get_current_user)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/attempts/{attempt_id}")
+async def get_attempt_followup(attempt_id: str, current_user=Depends(get_current_user)):
+    """Review hints and retry quiz for a failed attempt, once generated"""
+    try:
+        followup = await async_quiz_service.get_followup(attempt_id, current_user["id"])
+        if not followup:
+            raise HTTPException(status_code=404, detail="Attempt not found")
+        return followup
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/attempts/{attempt_id}/events")
+async def stream_attempt_followup(attempt_id: str, current_user=Depends(get_current_user)):
+    """Server-sent events with the follow-up state of a failed attempt"""
+    if not ObjectId.is_valid(attempt_id):
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    return StreamingResponse(
+        _followup_events(attempt_id, current_user["id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -94,6 +94,65 @@ class Settings(BaseSettings):
     AUTH_DEV_BYPASS_USER_ROLE: str = os.getenv("AUTH_DEV_BYPASS_USER_ROLE", "employee")
     AUTH_DEV_BYPASS_JOB_ROLE: str = os.getenv("AUTH_DEV_BYPASS_JOB_ROLE", "Software Engineer - Canva")
     AUTH_DEV_BYPASS_TENANT_ID: str = os.getenv("AUTH_DEV_BYPASS_TENANT_ID", "dev-tenant")
+    USER_IDENTITY_CACHE_TTL_SECONDS: int = int(os.getenv("USER_IDENTITY_CACHE_TTL_SECONDS", "300"))
+    USER_IDENTITY_CACHE_SIZE: int = int(os.getenv("USER_IDENTITY_CACHE_SIZE", "10000"))
+    EVENTS_BUFFER_SIZE: int = int(os.getenv("EVENTS_BUFFER_SIZE", "10000"))
+    EVENTS_FLUSH_BATCH_SIZE: int = int(os.getenv("EVENTS_FLUSH_BATCH_SIZE", "500"))
+    EVENTS_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("EVENTS_FLUSH_INTERVAL_SECONDS", "1.0"))
+    AI_CACHE_ENABLED: bool = bool(os.getenv("AI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"))
+    AI_CACHE_TTL_SECONDS: int = int(os.getenv("AI_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", "50000"))
+    AI_CACHE_MEMORY_ENTRIES: int = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "1024"))
+    # "azure" for DeepSeek on Azure AI Foundry, "local" for the deterministic offline backend
+    AI_PROVIDER: str = os.getenv("AI_PROVIDER", "azure")
+    AI_LOCAL_LATENCY_MS: float = float(os.getenv("AI_LOCAL_LATENCY_MS", "0"))
+    AI_LOCAL_JITTER_MS: float = float(os.getenv("AI_LOCAL_JITTER_MS", "0"))
+    AI_LOCAL_ERROR_RATE: float = float(os.getenv("AI_LOCAL_ERROR_RATE", "0"))
+    AI_LOCAL_SEED: int = int(os.getenv("AI_LOCAL_SEED", "0"))
+    AI_FUSED_ENRICHMENT: bool = bool(os.getenv("AI_FUSED_ENRICHMENT", "true").lower() in ("1", "true", "yes"))
+    # Items scored per relevance call when a batch is ingested
+    AI_SCORING_BATCH_SIZE: int = int(os.getenv("AI_SCORING_BATCH_SIZE", "25"))
+    # "model" scores role relevance with score_relevance; "local" uses the content index, offline.
+    # The two scales differ, so pick one per deployment and rescore with backfill_role_scores.py --all
+    RELEVANCE_SCORER: str = os.getenv("RELEVANCE_SCORER", "model")
+    # Hashed TF-IDF index over title, summary and tags, for related items and local relevance
+    CONTENT_INDEX_PATH: str = os.getenv("CONTENT_INDEX_PATH", "data/content_index.npz")
+    CONTENT_INDEX_DIM: int = int(os.getenv("CONTENT_INDEX_DIM", "2048"))
+    CONTENT_INDEX_REFRESH_SECONDS: float = float(os.getenv("CONTENT_INDEX_REFRESH_SECONDS", "60"))
+    # Long content is summarized map-reduce in chunks of this many tokens
+    AI_SUMMARY_CHUNK_TOKENS: int = int(os.getenv("AI_SUMMARY_CHUNK_TOKENS", "2000"))
+    AI_SUMMARY_REDUCE_TOKENS: int = int(os.getenv("AI_SUMMARY_REDUCE_TOKENS", "6000"))
+    AI_MAP_CONCURRENCY: int = int(os.getenv("AI_MAP_CONCURRENCY", "4"))
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+    AI_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "60"))
+    AI_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "30"))
+    # Deployment quota for the client-side token bucket; 0 disables a limit
+    AI_REQUESTS_PER_MINUTE: int = int(os.getenv("AI_REQUESTS_PER_MINUTE", "0"))
+    AI_TOKENS_PER_MINUTE: int = int(os.getenv("AI_TOKENS_PER_MINUTE", "0"))
+    AI_MAX_RETRIES: int = int(os.getenv("AI_MAX_RETRIES", "3"))
+    AI_BACKOFF_BASE_SECONDS: float = float(os.getenv("AI_BACKOFF_BASE_SECONDS", "1.0"))
+    AI_BACKOFF_MAX_SECONDS: float = float(os.getenv("AI_BACKOFF_MAX_SECONDS", "30"))
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    AI_CIRCUIT_RESET_SECONDS: float = float(os.getenv("AI_CIRCUIT_RESET_SECONDS", "30"))
+
+    # Ahead-of-time quiz generation
+    QUIZ_PRECOMPUTE_ENABLED: bool = bool(os.getenv("QUIZ_PRECOMPUTE_ENABLED", "true").lower() in ("1", "true", "yes"))
+    QUIZ_PRECOMPUTE_CONCURRENCY: int = int(os.getenv("QUIZ_PRECOMPUTE_CONCURRENCY", "2"))
+    QUIZ_PRECOMPUTE_POLL_SECONDS: float = float(os.getenv("QUIZ_PRECOMPUTE_POLL_SECONDS", "30"))
+    QUIZ_PRECOMPUTE_BATCH_SIZE: int = int(os.getenv("QUIZ_PRECOMPUTE_BATCH_SIZE", "50"))
+    QUIZ_PRECOMPUTE_MAX_FAILURES: int = int(os.getenv("QUIZ_PRECOMPUTE_MAX_FAILURES", "3"))
+    QUIZ_PRECOMPUTE_RETRY_SECONDS: int = int(os.getenv("QUIZ_PRECOMPUTE_RETRY_SECONDS", "600"))
+    # Review hints and retry quizzes for failed attempts, generated in the background
+    QUIZ_FOLLOWUP_CONCURRENCY: int = int(os.getenv("QUIZ_FOLLOWUP_CONCURRENCY", "4"))
+    QUIZ_FOLLOWUP_POLL_SECONDS: float = float(os.getenv("QUIZ_FOLLOWUP_POLL_SECONDS", "10"))
+    QUIZ_FOLLOWUP_MAX_FAILURES: int = int(os.getenv("QUIZ_FOLLOWUP_MAX_FAILURES", "3"))
+    QUIZ_FOLLOWUP_RETRY_SECONDS: int = int(os.getenv("QUIZ_FOLLOWUP_RETRY_SECONDS", "120"))
+    QUIZ_FOLLOWUP_STREAM_SECONDS: int = int(os.getenv("QUIZ_FOLLOWUP_STREAM_SECONDS", "120"))
+    # Single-flight quiz creation across processes
+    QUIZ_LEASE_SECONDS: int = int(os.getenv("QUIZ_LEASE_SECONDS", "300"))
+    QUIZ_LEASE_POLL_SECONDS: float = float(os.getenv("QUIZ_LEASE_POLL_SECONDS", "1.0"))
+    # Longest a caller waits on another holder's generation; kept well under the HTTP timeout
+    QUIZ_LEASE_WAIT_SECONDS: float = float(os.getenv("QUIZ_LEASE_WAIT_SECONDS", "20"))
     
     class Config:
         case_sensitive = True
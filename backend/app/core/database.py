@@ -1,3 +1,4 @@
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo.mongo_client import MongoClient
 from pymongo.database import Database
 from pymongo.server_api import ServerApi
@@ -10,7 +11,12 @@ class MongoDB:
     client: MongoClient = None
     db: Database = None
 
+class AsyncMongoDB:
+    client: AsyncIOMotorClient = None
+    db: AsyncIOMotorDatabase = None
+
 db = MongoDB()
+async_db = AsyncMongoDB()
 
 def connect_to_mongo():
     """Create database connection"""
@@ -37,11 +43,31 @@ def connect_to_mongo():
         logger.error(f"Failed to connect to MongoDB: {e}")
         raise
 
+def connect_to_mongo_async():
+    """Create the non-blocking (Motor) database connection used by API handlers"""
+    if not settings.MONGODB_URI:
+        raise RuntimeError(
+            "MongoDB connection string (MONGODB_URI) is not configured. "
+            "Please set MONGODB_URI environment variable to connect to MongoDB."
+        )
+    # Motor connects lazily, so no ping here: the first awaited operation
+    # surfaces connection errors without blocking the event loop at import.
+    async_db.client = AsyncIOMotorClient(settings.MONGODB_URI, server_api=ServerApi("1"))
+    async_db.db = async_db.client[settings.MONGODB_DB_NAME]
+    logger.info("Configured async MongoDB client")
+
 def close_mongo_connection():
-    """Close database connection"""
+    """Close database connections"""
     if db.client:
         db.client.close()
+        db.client = None
+        db.db = None
         logger.info("Disconnected from MongoDB")
+    if async_db.client:
+        async_db.client.close()
+        async_db.client = None
+        async_db.db = None
+        logger.info("Disconnected async MongoDB client")
 
 def get_database() -> Database:
     """Get database instance - lazily creates connection on first use"""
@@ -49,4 +75,8 @@ def get_database() -> Database:
         connect_to_mongo()
     return db.db
 
-
+def get_async_database() -> AsyncIOMotorDatabase:
+    """Get the Motor database instance for use inside async request handlers"""
+    if async_db.db is None:
+        connect_to_mongo_async()
+    return async_db.db
@@ -1,7 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from fastapi.concurrency import run_in_threadpool
+from app.core.database import close_mongo_connection
 from app.api import feed, content, quiz, admin, auth, user
+from app.services.ai_service import async_ai_service
+from app.services.content_index import content_index
+from app.services.event_service import event_writer
+from app.services.quiz_workers import quiz_followup_worker, quiz_precompute_worker
 
 app = FastAPI(
     title="PulseLoop API",
@@ -26,6 +32,25 @@ app.include_router(quiz.router, prefix="/api/quiz", tags=["quiz"])
 app.include_router(user.router, prefix="/api/me", tags=["user"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
+@app.on_event("startup")
+async def startup():
+    await event_writer.start()
+    if settings.QUIZ_PRECOMPUTE_ENABLED:
+        await quiz_precompute_worker.start()
+    await quiz_followup_worker.start()
+    # Load the saved related-content index and catch up with newer items
+    await run_in_threadpool(content_index.refresh)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Flush buffered events before the connections go away
+    await quiz_precompute_worker.stop()
+    await quiz_followup_worker.stop()
+    await event_writer.stop()
+    await async_ai_service.close()
+    await run_in_threadpool(content_index.save)
+    close_mongo_connection()
+
 @app.get("/")
 async def root():
     return {"message": "PulseLoop API", "version": "1.0.0"}
@@ -13,6 +13,13 @@ class SourceType(str, Enum):
     PODCAST = "podcast"
     MANUAL = "manual"
 
+class QuizStatus(str, Enum):
+    PENDING = "pending"  # Waiting for the precompute stage
+    REQUESTED = "requested"  # A user asked before it was ready; generated first
+    GENERATING = "generating"
+    READY = "ready"
+    FAILED = "failed"
+
 class Source(BaseModel):
     id: Optional[str] = None
     name: str
@@ -42,6 +49,8 @@ class ContentItem(BaseModel):
     summary_blob_uri: Optional[str] = None  # Blob URI for cached summary
     animated_summary: Optional[Dict] = None  # Storyboard and audio URL
     priority_score: float = 0.0  # AI-generated relevance score
+    role_scores: Dict[str, float] = {}  # Relevance per role, keyed by ContentService.role_score_key
+    quiz_status: QuizStatus = QuizStatus.PENDING  # Ahead-of-time quiz generation state
     metadata: Dict = {}  # Additional metadata (author, duration, etc.)
     created_at: datetime = datetime.utcnow()
     updated_at: datetime = datetime.utcnow()
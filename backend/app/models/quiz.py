@@ -1,6 +1,13 @@
 from typing import Optional, List, Dict
 from datetime import datetime
 from pydantic import BaseModel
+from enum import Enum
+
+class FollowupStatus(str, Enum):
+    PENDING = "pending"  # Waiting for the follow-up worker
+    GENERATING = "generating"
+    READY = "ready"
+    FAILED = "failed"
 
 class QuizQuestion(BaseModel):
     question: str
@@ -13,6 +20,8 @@ class Quiz(BaseModel):
     content_id: str
     questions: List[QuizQuestion]
     version: int = 1  # Version number for retry quizzes
+    retry_key: Optional[str] = None  # Missed-question fingerprint of a pooled retry quiz
+    review_hints: Optional[Dict] = None  # Shared hints for learners served a pooled retry quiz
     created_at: datetime = datetime.utcnow()
 
 class QuizAttempt(BaseModel):
@@ -28,6 +37,7 @@ class QuizAttempt(BaseModel):
     tech_score_change: int = 0  # Points gained/lost
     review_hints: Optional[Dict] = None  # Paragraph indices or timestamps
     next_quiz_id: Optional[str] = None  # If retry needed
+    followup_status: Optional[FollowupStatus] = None  # Review hints and retry quiz generation, failed attempts only
     created_at: datetime = datetime.utcnow()
 
 
@@ -0,0 +1,52 @@
+"""
+Audience key backfill
+Computes the normalized ``audience_keys`` array for existing content items so
+feed queries can be served from the audience_keys compound indexes.
+
+Usage:
+    python app/scripts/backfill_audience_keys.py [--all] [--batch-size 500]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, get_database
+from app.services.content_service import ContentService
+
+AUDIENCE_FIELDS = {"organization_id": 1, "role_tags": 1, "tags": 1, "source_id": 1}
+
+
+def backfill(recompute_all: bool = False, batch_size: int = 500) -> int:
+    db = get_database()
+    query = {} if recompute_all else {"audience_keys": {"$exists": False}}
+
+    updated = 0
+    operations = []
+    for item in db.content_items.find(query, AUDIENCE_FIELDS).batch_size(batch_size):
+        operations.append(UpdateOne(
+            {"_id": item["_id"]},
+            {"$set": {"audience_keys": ContentService.build_audience_keys(item)}},
+        ))
+        if len(operations) >= batch_size:
+            updated += db.content_items.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += db.content_items.bulk_write(operations, ordered=False).modified_count
+
+    # Segment feeds were built from the old query; let them rebuild on next read
+    db.feed_segments.delete_many({})
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill content_items.audience_keys")
+    parser.add_argument("--all", action="store_true", help="Recompute keys for every item, not only missing ones")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    count = backfill(recompute_all=args.all, batch_size=args.batch_size)
+    print(f"Updated audience keys on {count} content items")
@@ -0,0 +1,72 @@
+"""
+Role score backfill
+Scores existing content items for every role of their organization and
+stores the per-role ``role_scores`` vector, batching many items into each
+model call. ``priority_score`` is recomputed from the vector, so materialized
+feeds are dropped and rebuilt on their next read.
+
+Usage:
+    python app/scripts/backfill_role_scores.py [--all] [--batch-size 200] [--limit 1000]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, get_database
+from app.services.content_service import content_service
+
+SCORING_FIELDS = {"title": 1, "summary": 1, "description": 1, "role_tags": 1, "tags": 1, "organization_id": 1}
+
+
+def _score(items: List[dict]) -> int:
+    content_service.score_content_items(items)
+    operations = [
+        UpdateOne(
+            {"_id": item["_id"]},
+            {"$set": {"role_scores": item["role_scores"], "priority_score": item["priority_score"]}},
+        )
+        for item in items
+        if "role_scores" in item
+    ]
+    if not operations:
+        return 0
+    return get_database().content_items.bulk_write(operations, ordered=False).modified_count
+
+
+def backfill(rescore_all: bool = False, batch_size: int = 200, limit: Optional[int] = None) -> int:
+    db = get_database()
+    query = {} if rescore_all else {"role_scores": {"$exists": False}}
+    cursor = db.content_items.find(query, SCORING_FIELDS).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    updated = 0
+    batch: List[dict] = []
+    for item in cursor:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            updated += _score(batch)
+            batch = []
+    if batch:
+        updated += _score(batch)
+
+    # Segment feeds are ranked by the old priority scores; let them rebuild on next read
+    db.feed_segments.delete_many({})
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill content_items.role_scores")
+    parser.add_argument("--all", action="store_true", help="Rescore every item, not only unscored ones")
+    parser.add_argument("--batch-size", type=int, default=200, help="Items handed to the scorer at a time")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many items")
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    count = backfill(rescore_all=args.all, batch_size=args.batch_size, limit=args.limit)
+    print(f"Stored role scores on {count} content items")
@@ -0,0 +1,31 @@
+"""
+Content index rebuild
+Indexes every content item's title, summary and tags from scratch and saves
+the index to CONTENT_INDEX_PATH. The API and the ingestion function keep the
+saved index up to date on their own; rebuild it after changing
+CONTENT_INDEX_DIM or when items were edited or deleted in place.
+
+Usage:
+    python app/scripts/build_content_index.py [--path data/content_index.npz]
+"""
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.config import settings
+from app.core.database import connect_to_mongo
+from app.services.content_index import ContentIndex
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the related-content index")
+    parser.add_argument("--path", default=settings.CONTENT_INDEX_PATH)
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    started = time.perf_counter()
+    index = ContentIndex(path=args.path)
+    indexed = index.sync()
+    index.save()
+    print(f"Indexed {indexed} content items into {args.path} in {time.perf_counter() - started:.1f}s")
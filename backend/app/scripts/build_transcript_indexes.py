@@ -0,0 +1,57 @@
+"""
+Transcript index backfill
+Builds the BM25 ``transcript_index`` for content bodies stored before
+ingestion started building it, so review hints for older podcasts rank
+segments from the stored index instead of rebuilding it on every failed
+attempt. Indexes from an older layout are rebuilt too.
+
+Usage:
+    python app/scripts/build_transcript_indexes.py [--batch-size 50]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, get_database
+from app.utils.segment_index import SEGMENT_INDEX_VERSION, build_segment_index
+
+
+def build_indexes(batch_size: int = 50) -> int:
+    db = get_database()
+    query = {
+        "transcript_segments.0": {"$exists": True},
+        "transcript_index.version": {"$ne": SEGMENT_INDEX_VERSION},
+    }
+
+    built = 0
+    while True:
+        # Each pass indexes what it read, so re-querying always yields the next batch
+        bodies = list(db.content_bodies.find(query, {"transcript_segments": 1}).limit(batch_size))
+        if not bodies:
+            break
+        db.content_bodies.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": body["_id"]},
+                    {"$set": {"transcript_index": build_segment_index(body["transcript_segments"])}},
+                )
+                for body in bodies
+            ],
+            ordered=False,
+        )
+        built += len(bodies)
+
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build BM25 indexes over stored transcript segments")
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    count = build_indexes(batch_size=args.batch_size)
+    print(f"Built transcript indexes for {count} content items")
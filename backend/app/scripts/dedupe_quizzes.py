@@ -0,0 +1,66 @@
+"""
+Quiz deduplication
+Concurrent first requests used to store several version-1 quizzes for the
+same content item. Keeps the oldest one, points attempts and content items at
+it, and replaces the (content_id, version) index with the unique one that now
+prevents duplicates. Run once when upgrading an existing database.
+
+Usage:
+    python app/scripts/dedupe_quizzes.py [--dry-run]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from bson import ObjectId
+
+from app.core.database import connect_to_mongo, get_database
+
+INDEX_NAME = "content_id_1_version_1"
+
+
+def dedupe(dry_run: bool = False) -> int:
+    db = get_database()
+    duplicates = db.quizzes.aggregate([
+        {"$match": {"version": 1}},
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {"$group": {"_id": "$content_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+
+    removed = 0
+    for group in duplicates:
+        keep, extra = group["ids"][0], group["ids"][1:]
+        removed += len(extra)
+        if dry_run:
+            continue
+        extra_ids = [str(quiz_id) for quiz_id in extra]
+        db.quiz_attempts.update_many({"quiz_id": {"$in": extra_ids}}, {"$set": {"quiz_id": str(keep)}})
+        if ObjectId.is_valid(group["_id"]):
+            db.content_items.update_one(
+                {"_id": ObjectId(group["_id"]), "quiz_id": {"$in": extra_ids}},
+                {"$set": {"quiz_id": str(keep)}},
+            )
+        db.quizzes.delete_many({"_id": {"$in": extra}})
+
+    if not dry_run:
+        existing = db.quizzes.index_information().get(INDEX_NAME)
+        if existing and not existing.get("unique"):
+            db.quizzes.drop_index(INDEX_NAME)
+        db.quizzes.create_index(
+            [("content_id", 1), ("version", 1)],
+            unique=True,
+            partialFilterExpression={"version": 1},
+        )
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove duplicate version-1 quizzes")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    count = dedupe(dry_run=args.dry_run)
+    print(f"{'Found' if args.dry_run else 'Removed'} {count} duplicate quizzes")
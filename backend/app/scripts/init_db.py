@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from app.core.database import connect_to_mongo, get_database
+from app.services.analytics_service import MARKER_TTL_SECONDS, analytics_service
 from datetime import datetime
 from bson import ObjectId
 
@@ -24,16 +25,42 @@ def create_indexes():
     db.content_items.create_index("published_at")
     db.content_items.create_index("role_tags")
     db.content_items.create_index([("organization_id", 1), ("published_at", -1)])
+    # Feed queries filter on audience_keys and sort by rank or recency
+    db.content_items.create_index([
+        ("audience_keys", 1),
+        ("priority_score", -1),
+        ("published_at", -1),
+        ("created_at", -1),
+        ("_id", -1),
+    ])
+    db.content_items.create_index([("audience_keys", 1), ("type", 1), ("published_at", -1)])
+    # Quiz precompute queue, claimed highest priority first
+    db.content_items.create_index([("quiz_status", 1), ("priority_score", -1), ("published_at", -1)])
     
     # Quizzes indexes
     db.quizzes.create_index("content_id")
-    db.quizzes.create_index([("content_id", 1), ("version", 1)])
+    # One shared version-1 quiz per item; retry versions live in the per-item retry pool
+    db.quizzes.create_index(
+        [("content_id", 1), ("version", 1)],
+        unique=True,
+        partialFilterExpression={"version": 1},
+    )
+    # Retry quiz pool, served oldest first per missed-question fingerprint
+    db.quizzes.create_index(
+        [("content_id", 1), ("retry_key", 1), ("created_at", 1)],
+        partialFilterExpression={"retry_key": {"$exists": True}},
+    )
     
     # Quiz attempts indexes
     db.quiz_attempts.create_index("user_id")
     db.quiz_attempts.create_index("content_id")
     db.quiz_attempts.create_index([("user_id", 1), ("content_id", 1)])
     db.quiz_attempts.create_index("created_at")
+    # Follow-up queue for failed attempts, claimed oldest first
+    db.quiz_attempts.create_index(
+        [("followup_status", 1), ("created_at", 1)],
+        partialFilterExpression={"followup_status": {"$exists": True}},
+    )
     
     # Events indexes
     db.events.create_index("user_id")
@@ -41,6 +68,21 @@ def create_indexes():
     db.events.create_index("event_type")
     db.events.create_index("created_at")
     
+    # Organization rollups are read by organization and day range
+    db.org_rollups.create_index([("organization_id", 1), ("date", 1)])
+    db.org_rollup_markers.create_index("created_at", expireAfterSeconds=MARKER_TTL_SECONDS)
+    db.users.create_index([("organization_id", 1), ("last_quiz_attempt_at", -1)])
+    
+    # Materialized feed segments are read by _id; ingestion scans them by organization
+    db.feed_segments.create_index("organization_id")
+    
+    # Cached model responses expire by TTL and are evicted least-recently-used first
+    db.ai_generations.create_index("expires_at", expireAfterSeconds=0)
+    db.ai_generations.create_index("last_used_at")
+    
+    # Leases clean themselves up once lapsed
+    db.leases.create_index("expires_at", expireAfterSeconds=0)
+    
     # Sources indexes
     db.sources.create_index("organization_id")
     db.sources.create_index("enabled")
@@ -80,6 +122,7 @@ def create_sample_data():
     }
     user_result = db.users.insert_one(user)
     user_id = str(user_result.inserted_id)
+    analytics_service.record_user_membership(org_id)
     
     # Create sample source
     source = {
@@ -0,0 +1,26 @@
+"""
+Quiz precompute
+Generates the version-1 quiz for every content item that does not have one
+yet, highest priority first. Use it to backfill an existing database or to
+catch up after an outage; it can be stopped and rerun at any point.
+
+Usage:
+    python app/scripts/precompute_quizzes.py [--limit 100]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.database import connect_to_mongo
+from app.services.quiz_service import quiz_service
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate quizzes ahead of the first request")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many items")
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    counts = quiz_service.precompute_quizzes(limit=args.limit)
+    print(f"Generated {counts['ready']} quizzes, {counts['failed']} failed")
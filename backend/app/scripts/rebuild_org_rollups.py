@@ -0,0 +1,137 @@
+"""
+Organization rollup rebuild
+Recomputes org_rollups from the raw users, quiz_attempts and events
+collections. Run once when upgrading an existing database, or to repair
+counters after manual data changes; new activity keeps the rollups current.
+
+Usage:
+    python app/scripts/rebuild_org_rollups.py [--batch-size 1000]
+"""
+import argparse
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+from app.core.database import connect_to_mongo, get_database
+from app.services.analytics_service import MARKER_TTL_SECONDS, TOTAL_KEY, AnalyticsService
+
+
+def _empty_daily(organization_id: str, day: str) -> dict:
+    return {
+        "_id": f"{organization_id}|{day}",
+        "organization_id": organization_id,
+        "date": day,
+        "quiz_attempts": 0,
+        "quiz_passed": 0,
+        "quiz_failed": 0,
+        "tech_score_delta": 0,
+        "quiz_participants": 0,
+        "events_total": 0,
+        "events": {},
+        "active_users": 0,
+    }
+
+
+def rebuild(batch_size: int = 1000) -> int:
+    db = get_database()
+    rollups = {}
+    user_orgs = {}
+    markers = set()
+    marker_cutoff = datetime.utcnow() - timedelta(seconds=MARKER_TTL_SECONDS)
+
+    def daily(organization_id: str, at: datetime) -> dict:
+        day = AnalyticsService._day(at)
+        key = f"{organization_id}|{day}"
+        if key not in rollups:
+            rollups[key] = _empty_daily(organization_id, day)
+        return rollups[key]
+
+    for user in db.users.find({}, {"organization_id": 1, "tech_score": 1}).batch_size(batch_size):
+        organization_id = user.get("organization_id")
+        if not organization_id:
+            continue
+        user_orgs[str(user["_id"])] = organization_id
+        key = f"{organization_id}|{TOTAL_KEY}"
+        total = rollups.setdefault(key, {
+            "_id": key,
+            "organization_id": organization_id,
+            "date": TOTAL_KEY,
+            "user_count": 0,
+            "tech_score_total": 0,
+        })
+        total["user_count"] += 1
+        total["tech_score_total"] += user.get("tech_score", 0)
+
+    participants = set()
+    last_attempts = {}
+    attempt_fields = {"user_id": 1, "passed": 1, "tech_score_change": 1, "created_at": 1}
+    for attempt in db.quiz_attempts.find({}, attempt_fields).batch_size(batch_size):
+        organization_id = user_orgs.get(attempt.get("user_id"))
+        created_at = attempt.get("created_at")
+        if not organization_id or not created_at:
+            continue
+        doc = daily(organization_id, created_at)
+        doc["quiz_attempts"] += 1
+        doc["quiz_passed" if attempt.get("passed") else "quiz_failed"] += 1
+        doc["tech_score_delta"] += attempt.get("tech_score_change", 0)
+        if (doc["_id"], attempt["user_id"]) not in participants:
+            participants.add((doc["_id"], attempt["user_id"]))
+            doc["quiz_participants"] += 1
+            if created_at >= marker_cutoff:
+                markers.add((f"{doc['_id']}|quiz|{attempt['user_id']}", created_at))
+        if created_at > last_attempts.get(attempt["user_id"], datetime.min):
+            last_attempts[attempt["user_id"]] = created_at
+
+    active = set()
+    event_fields = {"user_id": 1, "organization_id": 1, "event_type": 1, "created_at": 1}
+    for event in db.events.find({"organization_id": {"$ne": None}}, event_fields).batch_size(batch_size):
+        created_at = event.get("created_at")
+        if not created_at:
+            continue
+        doc = daily(event["organization_id"], created_at)
+        event_type = event.get("event_type", "unknown")
+        doc["events_total"] += 1
+        doc["events"][event_type] = doc["events"].get(event_type, 0) + 1
+        if (doc["_id"], event.get("user_id")) not in active:
+            active.add((doc["_id"], event.get("user_id")))
+            doc["active_users"] += 1
+            if created_at >= marker_cutoff:
+                markers.add((f"{doc['_id']}|active|{event.get('user_id')}", created_at))
+
+    db.org_rollups.delete_many({})
+    operations = [ReplaceOne({"_id": key}, doc, upsert=True) for key, doc in rollups.items()]
+    for start in range(0, len(operations), batch_size):
+        db.org_rollups.bulk_write(operations[start:start + batch_size], ordered=False)
+
+    # Recent markers keep today's distinct counters exact as new activity arrives
+    db.org_rollup_markers.delete_many({})
+    marker_operations = [
+        UpdateOne({"_id": marker_id}, {"$setOnInsert": {"created_at": created_at}}, upsert=True)
+        for marker_id, created_at in markers
+    ]
+    for start in range(0, len(marker_operations), batch_size):
+        db.org_rollup_markers.bulk_write(marker_operations[start:start + batch_size], ordered=False)
+
+    user_operations = [
+        UpdateOne({"_id": ObjectId(user_id)}, {"$set": {"last_quiz_attempt_at": created_at}})
+        for user_id, created_at in last_attempts.items()
+        if ObjectId.is_valid(user_id)
+    ]
+    for start in range(0, len(user_operations), batch_size):
+        db.users.bulk_write(user_operations[start:start + batch_size], ordered=False)
+
+    return len(rollups)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild org_rollups from raw activity")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    count = rebuild(batch_size=args.batch_size)
+    print(f"Rebuilt {count} organization rollup documents")
@@ -8,12 +8,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from datetime import datetime
 from app.core.database import connect_to_mongo, get_database
+from app.services.content_service import ContentService
 
 def main():
     connect_to_mongo()
     db = get_database()
     now = datetime.utcnow()
-    db.content_items.insert_one({
+    item = {
         "title": "Platform engineering patterns at Canva",
         "type": "article",
         "source_id": "manual-demo",
@@ -25,7 +26,9 @@ def main():
         "priority_score": 0.9,
         "created_at": now,
         "updated_at": now,
-    })
+    }
+    item["audience_keys"] = ContentService.build_audience_keys(item)
+    db.content_items.insert_one(item)
     print("Inserted sample content.")
 
 if __name__ == "__main__":
@@ -0,0 +1,62 @@
+"""
+Content body migration
+Moves transcripts, transcript segments and animated summaries out of
+content_items into the content_bodies side collection so feed and detail
+reads stop pulling them over the wire.
+
+Usage:
+    python app/scripts/split_content_bodies.py [--batch-size 100]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from pymongo import UpdateOne
+
+from app.core.database import connect_to_mongo, get_database
+from app.services.content_service import HEAVY_CONTENT_FIELDS
+
+
+def split_bodies(batch_size: int = 100) -> int:
+    db = get_database()
+    query = {"$or": [{field: {"$exists": True}} for field in HEAVY_CONTENT_FIELDS]}
+    projection = {field: 1 for field in HEAVY_CONTENT_FIELDS}
+
+    moved = 0
+    while True:
+        # Each pass unsets what it moved, so re-querying always yields the next batch
+        items = list(db.content_items.find(query, projection).limit(batch_size))
+        if not items:
+            break
+
+        item_ids = [item["_id"] for item in items]
+        existing_bodies = {body["_id"]: body for body in db.content_bodies.find({"_id": {"$in": item_ids}})}
+
+        body_writes = []
+        for item in items:
+            existing = existing_bodies.get(item["_id"], {})
+            # Never overwrite a value already written to the side collection
+            fields = {field: item.get(field) for field in HEAVY_CONTENT_FIELDS if field not in existing}
+            if fields:
+                body_writes.append(UpdateOne({"_id": item["_id"]}, {"$set": fields}, upsert=True))
+        if body_writes:
+            db.content_bodies.bulk_write(body_writes, ordered=False)
+
+        db.content_items.update_many(
+            {"_id": {"$in": item_ids}},
+            {"$unset": {field: "" for field in HEAVY_CONTENT_FIELDS}},
+        )
+        moved += len(items)
+
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move heavy content fields into content_bodies")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    count = split_bodies(batch_size=args.batch_size)
+    print(f"Moved heavy fields for {count} content items")
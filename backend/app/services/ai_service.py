@@ -1,33 +1,114 @@
+import asyncio
 import json
 import logging
-from typing import List, Dict, Optional
-from openai import AzureOpenAI
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Tuple
+import openai
 from app.core.config import settings
+from app.services.generation_cache import generation_cache
+from app.services.llm_providers import LLMProvider, get_provider
+from app.utils.chunking import CHARS_PER_TOKEN, chunk_content, estimate_tokens, group_by_budget
+from app.utils.json_stream import JsonArrayStream
+from app.utils.resilience import (
+    ABORTED,
+    REJECTED,
+    THROTTLED,
+    TRANSIENT,
+    CallGuard,
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+)
 from fastapi import HTTPException, status
 
 logger = logging.getLogger(__name__)
 
+# (messages, completion parameters) for one chat completion
+ChatRequest = Tuple[List[Dict], Dict[str, Any]]
+
+# Quizzes on long transcripts are written from notes condensed to this size
+QUIZ_NOTES_TOKENS = 2500
+# How much of each item's summary a batch relevance request includes
+SCORING_ITEM_CHARS = 1200
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+
+
+def _classify_model_error(exc: BaseException) -> Tuple[str, Optional[float]]:
+    if isinstance(exc, openai.RateLimitError):
+        return THROTTLED, _retry_after_seconds(exc)
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+        return TRANSIENT, None
+    if isinstance(exc, openai.APIStatusError) and (exc.status_code >= 500 or exc.status_code == 408):
+        return TRANSIENT, _retry_after_seconds(exc)
+    if isinstance(exc, openai.APIError):
+        # The upstream answered and refused the request
+        return REJECTED, None
+    # Raised before the request went out, e.g. the local queue timeout
+    return ABORTED, None
+
+
+def _estimate_tokens(messages: List[Dict], params: Dict[str, Any]) -> int:
+    """Rough prompt size plus the completion budget"""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + int(params.get("max_tokens") or 0)
+
+
+# Shared by the sync and async services so both draw on one quota and one breaker
+model_call_guard = CallGuard(
+    _classify_model_error,
+    bucket=TokenBucket(settings.AI_REQUESTS_PER_MINUTE, settings.AI_TOKENS_PER_MINUTE),
+    breaker=CircuitBreaker(settings.AI_CIRCUIT_FAILURE_THRESHOLD, settings.AI_CIRCUIT_RESET_SECONDS),
+    max_retries=settings.AI_MAX_RETRIES,
+    backoff_base=settings.AI_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.AI_BACKOFF_MAX_SECONDS,
+)
+
+
+def _circuit_unavailable(exc: CircuitOpenError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Azure OpenAI is unavailable: {exc}")
+
+
 class AIService:
-    def __init__(self):
-        self._client: Optional[AzureOpenAI] = None
-        self.model = settings.deepseek_model
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        self._provider = provider or get_provider()
+        self._client: Optional[Any] = None
+        self.model = self._provider.model
+        self._stats_lock = threading.Lock()
+        self._enrichment_stats = {"fused": 0, "fallbacks": 0, "calls_saved": 0}
 
-    def _get_client(self) -> AzureOpenAI:
-        """Lazily create Azure OpenAI client on first use"""
+    def _get_client(self) -> Any:
+        """Lazily create the provider's client on first use"""
         if self._client is None:
-            if not settings.deepseek_endpoint or not settings.deepseek_key:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail="Azure OpenAI (DeepSeek) is not configured. Please set AZURE_DEEPSEEK_ENDPOINT and AZURE_DEEPSEEK_KEY environment variables."
-                )
             try:
-                self._client = AzureOpenAI(
-                    api_key=settings.deepseek_key,
-                    azure_endpoint=settings.deepseek_endpoint,
-                    api_version=settings.openai_api_version,
-                )
+                self._client = self._provider.create_client()
+            except HTTPException:
+                raise
             except Exception as exc:
-                logger.error("Failed to initialize Azure OpenAI client: %s", exc)
+                logger.error("Failed to initialize %s model client: %s", self._provider.name, exc)
                 raise HTTPException(
                     status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                     detail=f"Failed to connect to Azure OpenAI: {exc}"
@@ -35,76 +116,125 @@ class AIService:
         return self._client
 
     @property
-    def client(self) -> AzureOpenAI:
+    def client(self) -> Any:
         """Property accessor for lazy client initialization"""
         return self._get_client()
-    
+
+    def _chat(
+        self,
+        method: str,
+        messages: List[Dict],
+        cache: bool = True,
+        parse: Optional[Callable[[str], Any]] = None,
+        **params,
+    ) -> Any:
+        """Run one chat completion, answering byte-identical requests from the generation cache.
+
+        With ``parse`` the parsed reply is returned, and the reply is only
+        cached when parsing gives a non-empty result, so a malformed reply is
+        never replayed to later callers.
+        """
+        key = None
+        if cache:
+            key = generation_cache.make_key(method, self.model, messages, params)
+            cached = generation_cache.get(key)
+            if cached is not None:
+                usable, result = self._parse_cached(cached, parse)
+                if usable:
+                    return result
+
+        client = self._get_client()
+        try:
+            response = model_call_guard.call(
+                lambda: client.chat.completions.create(model=self.model, messages=messages, **params),
+                tokens=_estimate_tokens(messages, params),
+            )
+        except CircuitOpenError as exc:
+            raise _circuit_unavailable(exc) from exc
+        reply = response.choices[0].message.content
+        result = parse(reply) if parse else reply
+        if key and result:
+            generation_cache.set(key, method, self.model, reply)
+        return result
+
+    @staticmethod
+    def _parse_cached(cached: str, parse: Optional[Callable[[str], Any]]) -> Tuple[bool, Any]:
+        """Whether a cached reply still parses to something usable, and the parsed value"""
+        if parse is None:
+            return True, cached
+        try:
+            result = parse(cached)
+        except Exception:
+            return False, None
+        return bool(result), result
+
     def generate_summary(
         self,
         content: str,
         content_type: str = "article",
         transcript_segments: Optional[List[Dict]] = None,
     ) -> str:
-        """Generate a concise summary of the content"""
-        try:
-            trimmed_content = content[:8000] if content else ""
-
-            if content_type == "podcast":
-                prompt = (
-                    "You are summarizing an audio/video transcript that teaches industry news. "
-                    "Write 2-3 short paragraphs highlighting the most important takeaways, "
-                    "key people or companies mentioned, and recommended actions for the listener. "
-                    "Avoid referencing timestamps directly in the summary.\n\n"
-                    f"Transcript excerpt:\n{trimmed_content}\n\nSummary:"
-                )
-            else:
-                prompt = (
-                    "Generate a concise summary (2-3 paragraphs) of the following article content.\n\n"
-                    f"Content:\n{trimmed_content}\n\nSummary:"
-                )
+        """Generate a concise summary of the content.
 
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries of technical and industry content."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            return response.choices[0].message.content
+        Content longer than one chunk is summarized map-reduce: chunks cut on
+        transcript segment boundaries are noted in parallel, then merged.
+        """
+        try:
+            summary = self._map_reduce_summary(content, content_type, transcript_segments)
+            if summary is not None:
+                return summary
+            messages, params = self._summary_request(content, content_type)
+            return self._chat("generate_summary", messages, **params)
         except Exception as e:
             logger.error(f"Error generating summary: {e}")
             raise
-    
+
+    def _map_reduce_summary(
+        self,
+        content: str,
+        content_type: str,
+        transcript_segments: Optional[List[Dict]],
+    ) -> Optional[str]:
+        """Summary of content too long for one prompt, or None when it fits in one"""
+        notes = self._condense(content, content_type, transcript_segments, settings.AI_SUMMARY_REDUCE_TOKENS)
+        if notes is None:
+            return None
+        messages, params = self._reduce_summary_request(notes, content_type)
+        return self._chat("generate_summary", messages, **params)
+
+    def _condense(
+        self,
+        content: str,
+        content_type: str,
+        transcript_segments: Optional[List[Dict]],
+        max_tokens: int,
+    ) -> Optional[List[str]]:
+        """Notes covering all of the content within ``max_tokens``, or None if it fits in one chunk"""
+        chunks = chunk_content(content, transcript_segments, settings.AI_SUMMARY_CHUNK_TOKENS)
+        if len(chunks) <= 1:
+            return None
+        replies = self._chat_parallel("summarize_chunk", self._chunk_notes_requests(chunks, content_type))
+        notes = [self._label_notes(chunk, reply) for chunk, reply in zip(chunks, replies)]
+        groups = self._merge_groups(notes, max_tokens)
+        while groups:
+            notes = self._chat_parallel("merge_notes", [self._notes_merge_request(group) for group in groups])
+            groups = self._merge_groups(notes, max_tokens)
+        return notes
+
+    def _chat_parallel(self, method: str, requests: List[ChatRequest]) -> List[str]:
+        """Independent completions, at most AI_MAP_CONCURRENCY at a time, in request order"""
+        with ThreadPoolExecutor(max_workers=max(1, min(settings.AI_MAP_CONCURRENCY, len(requests)))) as pool:
+            return list(pool.map(lambda request: self._chat(method, request[0], **request[1]), requests))
+
     def generate_tags(self, content: str, summary: str) -> List[str]:
         """Generate relevant tags for the content"""
         try:
-            prompt = f"""Based on the following content and summary, generate 3-5 relevant tags (single words or short phrases).
-            
-Summary: {summary}
-
-Tags (comma-separated):"""
-            
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that generates relevant tags for content."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=100
-            )
-            
-            tags = response.choices[0].message.content.strip().split(",")
-            return [tag.strip() for tag in tags]
+            messages, params = self._tags_request(summary)
+            return self._chat("generate_tags", messages, parse=self._parse_tags, **params)
         except Exception as e:
             logger.error(f"Error generating tags: {e}")
             return []
-    
+
     def generate_quiz(
         self,
         content: str,
@@ -114,68 +244,13 @@ Tags (comma-separated):"""
     ) -> List[Dict]:
         """Generate 5 multiple-choice questions based on the content"""
         try:
-            trimmed_content = content[:10000] if content else ""
-
-            if content_type == "podcast":
-                formatted_segments = self._format_segments_for_prompt(transcript_segments)
-                prompt = (
-                    "You are creating a quiz for learners who watched or listened to the following transcript excerpts. "
-                    "Generate 5 multiple-choice questions that test understanding of the key ideas. "
-                    "Questions should be specific enough that the correct answer can be found in the transcript. "
-                    "If possible, note in the explanation which time range covers the answer.\n\n"
-                    f"Transcript excerpts with timestamps:\n{formatted_segments}\n\n"
-                    f"Transcript excerpt:\n{trimmed_content}\n\n"
-                    f"Summary:\n{summary}\n\n"
-                    "Return JSON with a 'questions' array. Each question must include 'question', 'options' (4 strings), "
-                    "'correct_answer' (0-3), and 'explanation'."
-                )
-            else:
-                prompt = (
-                    "Generate 5 multiple-choice questions based on the article summary below. "
-                    "Each question must have 4 answer options, identify the correct option by index (0-3), "
-                    "and include a short explanation citing the key idea.\n\n"
-                    f"Summary:\n{summary}\n\n"
-                    f"Article excerpt:\n{trimmed_content}\n"
-                )
-
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates educational quizzes. Always return valid JSON with a 'questions' array."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
-            )
-            
-            content = response.choices[0].message.content
-            # Try to parse as JSON
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # If direct parsing fails, try to extract JSON from markdown code blocks
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    logger.error(f"Could not parse quiz JSON: {content}")
-                    return []
-            
-            # Handle both direct array and wrapped in object
-            if isinstance(result, dict) and "questions" in result:
-                return result["questions"]
-            elif isinstance(result, list):
-                return result
-            else:
-                # Try to extract questions from the response
-                return list(result.values()) if isinstance(result, dict) else []
+            notes = self._condense(content, content_type, transcript_segments, QUIZ_NOTES_TOKENS)
+            messages, params = self._quiz_request(content, summary, content_type, transcript_segments, notes)
+            return self._chat("generate_quiz", messages, parse=self._quiz_parser("quiz"), **params)
         except Exception as e:
             logger.error(f"Error generating quiz: {e}")
             raise
-    
+
     def generate_review_hints(
         self,
         summary: str,
@@ -188,54 +263,14 @@ Tags (comma-separated):"""
     ) -> Dict:
         """Generate review hints (paragraph indices or timestamps) for missed concepts"""
         try:
-            if content_type == "podcast" and (transcript_segments or candidate_segments):
-                formatted_segments = self._format_segments_for_prompt(
-                    candidate_segments or transcript_segments,
-                    limit=60,
-                    max_chars=220,
-                )
-                prompt = (
-                    f"The learner missed {len(wrong_answers)} questions in a quiz about this {content_type}. "
-                    "Identify the most relevant transcript segments to review. "
-                    "Return JSON with a 'timestamps' array containing strings formatted as 'MM:SS-MM:SS', "
-                    "an optional 'articleHighlights' array (leave empty for audio/video), "
-                    "and a 'concepts' array summarising the key ideas they should revisit. "
-                    "Prioritise the transcript segments provided below.\n\n"
-                    f"Summary:\n{summary}\n\n"
-                    f"Questions (with correct answers/explanations):\n{json.dumps(original_quiz, indent=2)}\n\n"
-                    f"Transcript segments:\n{formatted_segments}\n"
-                )
-            else:
-                prompt = (
-                    f"The user answered {len(wrong_answers)} questions incorrectly in a quiz about this article.\n\n"
-                    f"Summary:\n{summary}\n\n"
-                    f"Questions (with correct answers/explanations):\n{json.dumps(original_quiz, indent=2)}\n\n"
-                    "Return JSON with:\n"
-                    "{\n"
-                    '  "articleHighlights": [{"paragraphIndex": number}, ...],\n'
-                    '  "timestamps": [],\n'
-                    '  "concepts": ["concept1", "concept2"]\n'
-                    "}\n"
-                    "Paragraph indices should be zero-based."
-                )
-
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that provides targeted learning feedback. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=500,
-                response_format={"type": "json_object"}
+            messages, params = self._review_hints_request(
+                summary, content_type, wrong_answers, original_quiz, transcript_segments, candidate_segments,
             )
-            
-            return json.loads(response.choices[0].message.content)
+            return json.loads(self._chat("generate_review_hints", messages, cache=False, **params))
         except Exception as e:
             logger.error(f"Error generating review hints: {e}")
             return {"articleHighlights": [], "timestamps": [], "concepts": []}
-    
+
     def generate_retry_quiz(
         self,
         summary: str,
@@ -247,66 +282,395 @@ Tags (comma-separated):"""
     ) -> List[Dict]:
         """Generate a new quiz focusing on the concepts the user missed"""
         try:
-            trimmed_transcript = transcript[:9000] if transcript else ""
-
-            if content_type == "podcast" and transcript_segments:
-                formatted_segments = self._format_segments_for_prompt(transcript_segments, limit=40, max_chars=180)
-                prompt = (
-                    "Generate 5 NEW multiple-choice questions to help the learner revisit the missed concepts in this "
-                    f"{content_type} transcript. Focus on the listed concepts and ensure each question can be answered "
-                    "using the transcript excerpts provided. Include the correct answer index and a short explanation.\n\n"
-                    f"Summary:\n{summary}\n\n"
-                    f"Concepts to reinforce: {', '.join(wrong_concepts) if wrong_concepts else 'Refer to transcript'}\n\n"
-                    f"Transcript excerpts with timestamps:\n{formatted_segments}\n\n"
-                    f"Transcript excerpt:\n{trimmed_transcript}\n"
-                )
-            else:
-                prompt = (
-                    "Generate 5 new multiple-choice questions focusing on the concepts the learner missed.\n\n"
-                    f"Summary:\n{summary}\n\n"
-                    f"Concepts to reinforce: {', '.join(wrong_concepts) if wrong_concepts else 'Refer to article'}\n\n"
-                    f"Article excerpt:\n{trimmed_transcript}\n"
-                )
-            
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates educational quizzes focusing on specific concepts. Always return valid JSON with a 'questions' array."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
+            messages, params = self._retry_quiz_request(
+                summary, transcript, content_type, wrong_concepts, transcript_segments,
             )
-            
-            content = response.choices[0].message.content
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    logger.error(f"Could not parse retry quiz JSON: {content}")
-                    return []
-            
-            if isinstance(result, dict) and "questions" in result:
-                return result["questions"]
-            elif isinstance(result, list):
-                return result
-            else:
-                return list(result.values()) if isinstance(result, dict) else []
+            return self._chat("generate_retry_quiz", messages, cache=False, parse=self._quiz_parser("retry quiz"), **params)
         except Exception as e:
             logger.error(f"Error generating retry quiz: {e}")
             raise
-    
+
     def generate_storyboard(self, summary: str) -> List[Dict]:
         """Generate a storyboard for animated summary"""
         try:
-            prompt = f"""Create a step-by-step storyboard for an animated diagram that explains the key points from this summary.
-            
+            messages, params = self._storyboard_request(summary)
+            return self._chat("generate_storyboard", messages, parse=self._parse_storyboard, **params)
+        except Exception as e:
+            logger.error(f"Error generating storyboard: {e}")
+            return []
+
+    def calculate_priority_score(self, content: str, role_tags: List[str]) -> float:
+        """Calculate relevance score for a role"""
+        try:
+            messages, params = self._priority_request(content, role_tags)
+            return self._average_score(self._chat("calculate_priority_score", messages, parse=self._parse_json_object, **params))
+        except Exception as e:
+            logger.error(f"Error calculating priority score: {e}")
+            return 0.5
+
+    def score_relevance(self, items: List[Dict], roles: List[str]) -> List[Optional[Dict[str, float]]]:
+        """Relevance (0.0 to 1.0) of many items for every role, AI_SCORING_BATCH_SIZE items per call.
+
+        Items are described by their ``title`` and ``summary`` (or
+        ``description``). Returns a ``{role: score}`` map per item, in order,
+        or None for an item whose batch failed or that the model left out.
+        """
+        if not items or not roles:
+            return [None] * len(items)
+        size = max(1, settings.AI_SCORING_BATCH_SIZE)
+        batches = [items[index:index + size] for index in range(0, len(items), size)]
+
+        def score_batch(batch: List[Dict]) -> List[Optional[Dict[str, float]]]:
+            try:
+                messages, params = self._batch_priority_request(batch, roles)
+                scores = self._chat(
+                    "score_relevance",
+                    messages,
+                    parse=lambda reply: self._usable_batch_scores(reply, len(batch), roles),
+                    **params,
+                )
+                return scores or [None] * len(batch)
+            except Exception as e:
+                logger.error(f"Error scoring relevance for {len(batch)} items: {e}")
+                return [None] * len(batch)
+
+        results: List[Optional[Dict[str, float]]] = []
+        with ThreadPoolExecutor(max_workers=max(1, min(settings.AI_MAP_CONCURRENCY, len(batches)))) as pool:
+            for scores in pool.map(score_batch, batches):
+                results.extend(scores)
+        return results
+
+    def enrich_content(
+        self,
+        content: str,
+        content_type: str,
+        role_tags: List[str],
+        summary: Optional[str] = None,
+        transcript_segments: Optional[List[Dict]] = None,
+        score: bool = True,
+    ) -> Optional[Dict]:
+        """Summary, tags and per-role relevance from a single model call.
+
+        Returns ``{"summary", "tags", "scores", "priority_score"}`` or None when
+        the reply cannot be used, in which case callers fall back to
+        generate_summary, generate_tags and calculate_priority_score. With
+        ``score=False`` relevance is left to a later ``score_relevance`` batch.
+        """
+        separate_calls = (2 if summary else 3) - (0 if score else 1)
+        try:
+            # Content too long for one prompt is summarized map-reduce first, then tagged and scored
+            generated_summary = None if summary else self._map_reduce_summary(content, content_type, transcript_segments)
+            summary = summary or generated_summary
+            messages, params = self._enrichment_request(content, content_type, role_tags, summary, score)
+            result = self._chat(
+                "enrich_content",
+                messages,
+                parse=lambda reply: self._parse_enrichment(json.loads(reply), needs_summary=not summary),
+                **params,
+            )
+            if result is not None and generated_summary:
+                result["summary"] = generated_summary
+        except Exception as e:
+            logger.error(f"Error enriching content: {e}")
+            result = None
+
+        with self._stats_lock:
+            if result is None:
+                self._enrichment_stats["fallbacks"] += 1
+            else:
+                self._enrichment_stats["fused"] += 1
+                self._enrichment_stats["calls_saved"] += separate_calls - 1
+        return result
+
+    def enrichment_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._enrichment_stats)
+
+    @staticmethod
+    def _summary_request(content: str, content_type: str) -> ChatRequest:
+        trimmed_content = content[:8000] if content else ""
+
+        if content_type == "podcast":
+            prompt = (
+                "You are summarizing an audio/video transcript that teaches industry news. "
+                "Write 2-3 short paragraphs highlighting the most important takeaways, "
+                "key people or companies mentioned, and recommended actions for the listener. "
+                "Avoid referencing timestamps directly in the summary.\n\n"
+                f"Transcript excerpt:\n{trimmed_content}\n\nSummary:"
+            )
+        else:
+            prompt = (
+                "Generate a concise summary (2-3 paragraphs) of the following article content.\n\n"
+                f"Content:\n{trimmed_content}\n\nSummary:"
+            )
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries of technical and industry content."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.7, "max_tokens": 500}
+
+    @staticmethod
+    def _chunk_notes_requests(chunks: List[Dict], content_type: str) -> List[ChatRequest]:
+        kind = "transcript" if content_type == "podcast" else "article"
+        requests = []
+        for index, chunk in enumerate(chunks, start=1):
+            prompt = (
+                f"This is part {index} of {len(chunks)} of a {kind}. "
+                "List its key points, people, companies, figures and recommendations as 3-6 short bullets, "
+                "using only what this part says.\n\n"
+                f"Part {index}:\n{chunk['text']}\n\nKey points:"
+            )
+            messages = [
+                {"role": "system", "content": "You are a helpful assistant that takes precise notes on technical and industry content."},
+                {"role": "user", "content": prompt}
+            ]
+            requests.append((messages, {"temperature": 0.3, "max_tokens": 300}))
+        return requests
+
+    @staticmethod
+    def _notes_merge_request(notes: List[str]) -> ChatRequest:
+        joined = "\n\n".join(notes)
+        prompt = (
+            "Merge these notes from consecutive parts of the same content into one shorter list of bullets. "
+            "Keep the most important points, people, companies and figures, and keep the time ranges in brackets.\n\n"
+            f"{joined}\n\nMerged notes:"
+        )
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that takes precise notes on technical and industry content."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.3, "max_tokens": 600}
+
+    @staticmethod
+    def _reduce_summary_request(notes: List[str], content_type: str) -> ChatRequest:
+        joined = "\n\n".join(notes)
+        if content_type == "podcast":
+            prompt = (
+                "You are summarizing an audio/video transcript that teaches industry news, from notes that cover it in order. "
+                "Write 2-3 short paragraphs highlighting the most important takeaways, "
+                "key people or companies mentioned, and recommended actions for the listener. "
+                "Avoid referencing timestamps directly in the summary.\n\n"
+                f"Notes:\n{joined}\n\nSummary:"
+            )
+        else:
+            prompt = (
+                "Generate a concise summary (2-3 paragraphs) of an article from these notes, which cover it in order.\n\n"
+                f"Notes:\n{joined}\n\nSummary:"
+            )
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that creates clear, concise summaries of technical and industry content."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.7, "max_tokens": 500}
+
+    @staticmethod
+    def _label_notes(chunk: Dict, notes: str) -> str:
+        if chunk.get("start_ms") is None:
+            return notes.strip()
+        time_range = AIService._format_time_range(chunk["start_ms"], chunk.get("end_ms") or chunk["start_ms"])
+        return f"[{time_range}]\n{notes.strip()}"
+
+    @staticmethod
+    def _merge_groups(notes: List[str], max_tokens: int) -> Optional[List[List[str]]]:
+        """Runs of notes to merge while they are over budget, or None once they fit"""
+        if len(notes) <= 1 or estimate_tokens("\n\n".join(notes)) <= max_tokens:
+            return None
+        groups = group_by_budget(notes, max_tokens)
+        if len(groups) == len(notes):
+            # Every note fills the budget on its own; merging pairs still shrinks them
+            groups = [notes[index:index + 2] for index in range(0, len(notes), 2)]
+        return groups
+
+    @staticmethod
+    def _tags_request(summary: str) -> ChatRequest:
+        prompt = f"""Based on the following content and summary, generate 3-5 relevant tags (single words or short phrases).
+
+Summary: {summary}
+
+Tags (comma-separated):"""
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that generates relevant tags for content."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.5, "max_tokens": 100}
+
+    @staticmethod
+    def _parse_tags(reply: str) -> List[str]:
+        tags = reply.strip().split(",")
+        return [tag.strip() for tag in tags if tag.strip()]
+
+    @classmethod
+    def _quiz_parser(cls, label: str) -> Callable[[str], List[Dict]]:
+        return lambda reply: cls.valid_questions(cls._parse_json_items(reply, "questions", label))
+
+    @staticmethod
+    def valid_questions(questions: Any) -> List[Dict]:
+        """The well-formed multiple-choice questions in a parsed reply"""
+        if not isinstance(questions, list):
+            return []
+        return [
+            question for question in questions
+            if isinstance(question, dict)
+            and isinstance(question.get("question"), str) and question["question"].strip()
+            and isinstance(question.get("options"), list) and len(question["options"]) >= 2
+            and isinstance(question.get("correct_answer"), int)
+            and not isinstance(question["correct_answer"], bool)
+            and 0 <= question["correct_answer"] < len(question["options"])
+        ]
+
+    @classmethod
+    def _parse_storyboard(cls, reply: str) -> List[Dict]:
+        return cls._parse_json_items(reply, "steps", "storyboard")
+
+    @staticmethod
+    def _parse_json_object(reply: str) -> Optional[Dict]:
+        result = json.loads(reply)
+        return result if isinstance(result, dict) else None
+
+    @classmethod
+    def _quiz_request(
+        cls,
+        content: str,
+        summary: str,
+        content_type: str,
+        transcript_segments: Optional[List[Dict]],
+        notes: Optional[List[str]] = None,
+    ) -> ChatRequest:
+        trimmed_content = content[:10000] if content else ""
+
+        if content_type == "podcast" and notes:
+            # Long transcript: notes on every part, by time range, instead of its opening minutes
+            joined = "\n\n".join(notes)
+            prompt = (
+                "You are creating a quiz for learners who watched or listened to a long transcript, "
+                "summarized below as notes on each part with its time range. "
+                "Generate 5 multiple-choice questions that test understanding of the key ideas across the whole transcript. "
+                "Questions should be specific enough that the correct answer can be found in the notes. "
+                "If possible, note in the explanation which time range covers the answer.\n\n"
+                f"Transcript notes:\n{joined}\n\n"
+                f"Summary:\n{summary}\n\n"
+                "Return JSON with a 'questions' array. Each question must include 'question', 'options' (4 strings), "
+                "'correct_answer' (0-3), and 'explanation'."
+            )
+        elif content_type == "podcast":
+            formatted_segments = cls._format_segments_for_prompt(transcript_segments)
+            prompt = (
+                "You are creating a quiz for learners who watched or listened to the following transcript excerpts. "
+                "Generate 5 multiple-choice questions that test understanding of the key ideas. "
+                "Questions should be specific enough that the correct answer can be found in the transcript. "
+                "If possible, note in the explanation which time range covers the answer.\n\n"
+                f"Transcript excerpts with timestamps:\n{formatted_segments}\n\n"
+                f"Transcript excerpt:\n{trimmed_content}\n\n"
+                f"Summary:\n{summary}\n\n"
+                "Return JSON with a 'questions' array. Each question must include 'question', 'options' (4 strings), "
+                "'correct_answer' (0-3), and 'explanation'."
+            )
+        else:
+            excerpt = "Article notes:\n" + "\n\n".join(notes) if notes else f"Article excerpt:\n{trimmed_content}"
+            prompt = (
+                "Generate 5 multiple-choice questions based on the article summary below. "
+                "Each question must have 4 answer options, identify the correct option by index (0-3), "
+                "and include a short explanation citing the key idea.\n\n"
+                f"Summary:\n{summary}\n\n"
+                f"{excerpt}\n"
+            )
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that creates educational quizzes. Always return valid JSON with a 'questions' array."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.7, "max_tokens": 1500, "response_format": {"type": "json_object"}}
+
+    @classmethod
+    def _review_hints_request(
+        cls,
+        summary: str,
+        content_type: str,
+        wrong_answers: List[int],
+        original_quiz: List[Dict],
+        transcript_segments: Optional[List[Dict]],
+        candidate_segments: Optional[List[Dict]],
+    ) -> ChatRequest:
+        if content_type == "podcast" and (transcript_segments or candidate_segments):
+            formatted_segments = cls._format_segments_for_prompt(
+                candidate_segments or transcript_segments,
+                limit=60,
+                max_chars=220,
+            )
+            prompt = (
+                f"The learner missed {len(wrong_answers)} questions in a quiz about this {content_type}. "
+                "Identify the most relevant transcript segments to review. "
+                "Return JSON with a 'timestamps' array containing strings formatted as 'MM:SS-MM:SS', "
+                "an optional 'articleHighlights' array (leave empty for audio/video), "
+                "and a 'concepts' array summarising the key ideas they should revisit. "
+                "Prioritise the transcript segments provided below.\n\n"
+                f"Summary:\n{summary}\n\n"
+                f"Questions (with correct answers/explanations):\n{json.dumps(original_quiz, indent=2)}\n\n"
+                f"Transcript segments:\n{formatted_segments}\n"
+            )
+        else:
+            prompt = (
+                f"The user answered {len(wrong_answers)} questions incorrectly in a quiz about this article.\n\n"
+                f"Summary:\n{summary}\n\n"
+                f"Questions (with correct answers/explanations):\n{json.dumps(original_quiz, indent=2)}\n\n"
+                "Return JSON with:\n"
+                "{\n"
+                '  "articleHighlights": [{"paragraphIndex": number}, ...],\n'
+                '  "timestamps": [],\n'
+                '  "concepts": ["concept1", "concept2"]\n'
+                "}\n"
+                "Paragraph indices should be zero-based."
+            )
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that provides targeted learning feedback. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.5, "max_tokens": 500, "response_format": {"type": "json_object"}}
+
+    @classmethod
+    def _retry_quiz_request(
+        cls,
+        summary: str,
+        transcript: Optional[str],
+        content_type: str,
+        wrong_concepts: List[str],
+        transcript_segments: Optional[List[Dict]],
+    ) -> ChatRequest:
+        trimmed_transcript = transcript[:9000] if transcript else ""
+
+        if content_type == "podcast" and transcript_segments:
+            formatted_segments = cls._format_segments_for_prompt(transcript_segments, limit=40, max_chars=180)
+            prompt = (
+                "Generate 5 NEW multiple-choice questions to help the learner revisit the missed concepts in this "
+                f"{content_type} transcript. Focus on the listed concepts and ensure each question can be answered "
+                "using the transcript excerpts provided. Include the correct answer index and a short explanation.\n\n"
+                f"Summary:\n{summary}\n\n"
+                f"Concepts to reinforce: {', '.join(wrong_concepts) if wrong_concepts else 'Refer to transcript'}\n\n"
+                f"Transcript excerpts with timestamps:\n{formatted_segments}\n\n"
+                f"Transcript excerpt:\n{trimmed_transcript}\n"
+            )
+        else:
+            prompt = (
+                "Generate 5 new multiple-choice questions focusing on the concepts the learner missed.\n\n"
+                f"Summary:\n{summary}\n\n"
+                f"Concepts to reinforce: {', '.join(wrong_concepts) if wrong_concepts else 'Refer to article'}\n\n"
+                f"Article excerpt:\n{trimmed_transcript}\n"
+            )
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that creates educational quizzes focusing on specific concepts. Always return valid JSON with a 'questions' array."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.7, "max_tokens": 1500, "response_format": {"type": "json_object"}}
+
+    @staticmethod
+    def _storyboard_request(summary: str) -> ChatRequest:
+        prompt = f"""Create a step-by-step storyboard for an animated diagram that explains the key points from this summary.
+
 Summary: {summary}
 
 Return a JSON array of storyboard steps. Each step should have:
@@ -327,45 +691,16 @@ Format:
 ]
 
 Limit to 5-8 steps."""
-            
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates visual storyboards for educational content. Always return valid JSON with a 'steps' array."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
-            )
-            
-            content = response.choices[0].message.content
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    logger.error(f"Could not parse storyboard JSON: {content}")
-                    return []
-            
-            if isinstance(result, dict) and "steps" in result:
-                return result["steps"]
-            elif isinstance(result, list):
-                return result
-            else:
-                return list(result.values()) if isinstance(result, dict) else []
-        except Exception as e:
-            logger.error(f"Error generating storyboard: {e}")
-            return []
-    
-    def calculate_priority_score(self, content: str, role_tags: List[str]) -> float:
-        """Calculate relevance score for a role"""
-        try:
-            prompt = f"""Rate the relevance of this content (0.0 to 1.0) for the following roles: {', '.join(role_tags)}
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that creates visual storyboards for educational content. Always return valid JSON with a 'steps' array."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.7, "max_tokens": 1000, "response_format": {"type": "json_object"}}
+
+    @staticmethod
+    def _priority_request(content: str, role_tags: List[str]) -> ChatRequest:
+        prompt = f"""Rate the relevance of this content (0.0 to 1.0) for the following roles: {', '.join(role_tags)}
 
 Content: {content[:1000]}
 
@@ -377,29 +712,155 @@ Return a JSON object with scores for each role:
   }},
   "average": 0.725
 }}"""
-            
-            client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that rates content relevance. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=200,
-                response_format={"type": "json_object"}
+
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that rates content relevance. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.3, "max_tokens": 200, "response_format": {"type": "json_object"}}
+
+    @staticmethod
+    def _batch_priority_request(items: List[Dict], roles: List[str]) -> ChatRequest:
+        role_lines = "\n".join(f"- R{index}: {role}" for index, role in enumerate(roles, start=1))
+        item_blocks = "\n\n".join(
+            f"Item {index}: {item.get('title') or 'Untitled'}\n"
+            f"{(item.get('summary') or item.get('description') or '')[:SCORING_ITEM_CHARS]}"
+            for index, item in enumerate(items, start=1)
+        )
+        prompt = (
+            "Rate the relevance (0.0 to 1.0) of each content item below for each of these roles, in this order:\n"
+            f"{role_lines}\n\n"
+            f"{item_blocks}\n\n"
+            'Return JSON: {"items": [{"item": 1, "scores": [0.85, 0.4]}]} '
+            "with one entry per item and one score per role, in role order."
+        )
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that rates how relevant content items are to job roles. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+        # Room for every item's entry: its number plus one short score per role
+        max_tokens = 50 + len(items) * (15 + 6 * len(roles))
+        return messages, {"temperature": 0.3, "max_tokens": max_tokens, "response_format": {"type": "json_object"}}
+
+    @classmethod
+    def _usable_batch_scores(cls, reply: str, count: int, roles: List[str]) -> Optional[List[Optional[Dict[str, float]]]]:
+        """Parsed batch scores, or None when the reply scored no item at all"""
+        scores = cls._parse_batch_scores(reply, count, roles)
+        return scores if any(scores) else None
+
+    @classmethod
+    def _parse_batch_scores(cls, reply: str, count: int, roles: List[str]) -> List[Optional[Dict[str, float]]]:
+        results: List[Optional[Dict[str, float]]] = [None] * count
+        for entry in cls._parse_json_items(reply, "items", "relevance scores"):
+            if not isinstance(entry, dict):
+                continue
+            index, scores = entry.get("item"), entry.get("scores")
+            if not isinstance(index, int) or not 1 <= index <= count:
+                continue
+            if not isinstance(scores, list) or len(scores) != len(roles):
+                continue
+            if not all(isinstance(value, (int, float)) for value in scores):
+                continue
+            results[index - 1] = {role: min(max(float(value), 0.0), 1.0) for role, value in zip(roles, scores)}
+        return results
+
+    @staticmethod
+    def _enrichment_request(
+        content: str,
+        content_type: str,
+        role_tags: List[str],
+        summary: Optional[str],
+        score: bool = True,
+    ) -> ChatRequest:
+        if summary:
+            source = f"Summary:\n{summary}"
+            summary_instruction = 'Set "summary" to null.'
+        elif content_type == "podcast":
+            source = f"Transcript excerpt:\n{content[:8000]}"
+            summary_instruction = (
+                'Set "summary" to 2-3 short paragraphs highlighting the most important takeaways, key people or '
+                "companies mentioned, and recommended actions for the listener, without referencing timestamps."
             )
-            
-            result = json.loads(response.choices[0].message.content)
-            if "average" in result:
-                return result["average"]
-            elif "scores" in result and result["scores"]:
-                scores = list(result["scores"].values())
-                return sum(scores) / len(scores) if scores else 0.5
-            return 0.5
-        except Exception as e:
-            logger.error(f"Error calculating priority score: {e}")
-            return 0.5
+        else:
+            source = f"Content:\n{content[:8000]}"
+            summary_instruction = 'Set "summary" to a concise summary (2-3 paragraphs) of the article.'
+        if not score:
+            scores_instruction = ""
+            reply_format = '{"summary": "...", "tags": ["..."]}'
+        else:
+            if role_tags:
+                roles_instruction = f"Rate the relevance (0.0 to 1.0) of the content for these roles: {', '.join(role_tags)}."
+            else:
+                roles_instruction = "Rate the relevance (0.0 to 1.0) of the content for each of the tags you generate."
+            scores_instruction = f'{roles_instruction} Put them in "scores" keyed by role, and their mean in "average".\n'
+            reply_format = '{"summary": "...", "tags": ["..."], "scores": {"role": 0.85}, "average": 0.85}'
+
+        prompt = (
+            "Enrich the following industry content for a learning feed.\n"
+            f"{summary_instruction}\n"
+            'Set "tags" to 3-5 relevant tags (single words or short phrases).\n'
+            f"{scores_instruction}\n"
+            f"{source}\n\n"
+            f"Return JSON: {reply_format}"
+        )
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that summarizes, tags and rates technical and industry content. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {"temperature": 0.5, "max_tokens": 900, "response_format": {"type": "json_object"}}
+
+    @staticmethod
+    def _parse_json_items(reply: str, key: str, label: str) -> List[Dict]:
+        """Pull the ``key`` array out of a JSON reply, tolerating markdown fences and bare arrays"""
+        try:
+            result = json.loads(reply)
+        except json.JSONDecodeError:
+            # If direct parsing fails, try to extract JSON from markdown code blocks
+            json_match = re.search(r'\{.*\}', reply, re.DOTALL)
+            if json_match:
+                result = json.loads(json_match.group())
+            else:
+                logger.error(f"Could not parse {label} JSON: {reply}")
+                return []
+
+        # Handle both direct array and wrapped in object
+        if isinstance(result, dict) and key in result:
+            return result[key]
+        elif isinstance(result, list):
+            return result
+        else:
+            return list(result.values()) if isinstance(result, dict) else []
+
+    @classmethod
+    def _parse_enrichment(cls, result: Dict, needs_summary: bool) -> Optional[Dict]:
+        if not isinstance(result, dict):
+            return None
+        summary = result.get("summary")
+        if needs_summary and not (isinstance(summary, str) and summary.strip()):
+            return None
+        tags = result.get("tags")
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        if not isinstance(tags, list):
+            return None
+        scores = result.get("scores") or {}
+        if not isinstance(scores, dict) or not all(isinstance(value, (int, float)) for value in scores.values()):
+            return None
+        return {
+            "summary": summary.strip() if needs_summary else None,
+            "tags": [str(tag).strip() for tag in tags if str(tag).strip()],
+            "scores": scores,
+            "priority_score": cls._average_score(result),
+        }
+
+    @staticmethod
+    def _average_score(result: Dict) -> float:
+        if isinstance(result.get("average"), (int, float)):
+            return result["average"]
+        elif "scores" in result and result["scores"]:
+            scores = list(result["scores"].values())
+            return sum(scores) / len(scores) if scores else 0.5
+        return 0.5
 
     @staticmethod
     def _format_segments_for_prompt(
@@ -435,6 +896,339 @@ Return a JSON object with scores for each role:
 
         return f"{_fmt(start_ms)}-{_fmt(end_ms)}"
 
-# Singleton instance
-ai_service = AIService()
 
+class AsyncAIService:
+    """Non-blocking model calls for the FastAPI request path.
+
+    Completions run on the provider's async client. A process-wide semaphore caps how
+    many are in flight, so a burst of generations queues here instead of
+    exhausting the quota or the loop, and every call is bounded by a timeout
+    covering both the wait for a slot and the completion itself.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.AI_MAX_CONCURRENCY,
+        timeout: float = settings.AI_REQUEST_TIMEOUT_SECONDS,
+        queue_timeout: float = settings.AI_QUEUE_TIMEOUT_SECONDS,
+        provider: Optional[LLMProvider] = None,
+    ):
+        self._provider = provider or get_provider()
+        self._client: Optional[Any] = None
+        self.model = self._provider.model
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.timeouts = 0
+
+    def _get_client(self) -> Any:
+        """Lazily create the provider's async client on first use"""
+        if self._client is None:
+            try:
+                self._client = self._provider.create_async_client(self._timeout)
+            except HTTPException:
+                raise
+            except Exception as exc:
+                logger.error("Failed to initialize %s model client: %s", self._provider.name, exc)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Failed to connect to Azure OpenAI: {exc}"
+                ) from exc
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self._provider.name,
+            "max_concurrency": self._max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+        }
+
+    async def _chat(
+        self,
+        method: str,
+        messages: List[Dict],
+        cache: bool = True,
+        timeout: Optional[float] = None,
+        parse: Optional[Callable[[str], Any]] = None,
+        **params,
+    ) -> Any:
+        """Async twin of AIService._chat; replies are cached only once ``parse`` accepts them"""
+        key = None
+        if cache:
+            key = generation_cache.make_key(method, self.model, messages, params)
+            cached = await generation_cache.get_async(key)
+            if cached is not None:
+                usable, result = AIService._parse_cached(cached, parse)
+                if usable:
+                    return result
+
+        client = self._get_client()
+        try:
+            response = await model_call_guard.call_async(
+                lambda: self._complete(client, messages, params, timeout),
+                tokens=_estimate_tokens(messages, params),
+            )
+        except CircuitOpenError as exc:
+            raise _circuit_unavailable(exc) from exc
+
+        reply = response.choices[0].message.content
+        result = parse(reply) if parse else reply
+        if key and result:
+            await generation_cache.set_async(key, method, self.model, reply)
+        return result
+
+    async def _complete(
+        self,
+        client: Any,
+        messages: List[Dict],
+        params: Dict[str, Any],
+        timeout: Optional[float],
+    ):
+        """One attempt: wait for a concurrency slot, then run the completion under the timeout"""
+        await self._acquire_slot()
+        try:
+            return await asyncio.wait_for(
+                client.chat.completions.create(model=self.model, messages=messages, **params),
+                timeout or self._timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self._release_slot()
+
+    async def _stream(self, messages: List[Dict], params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream one completion's text, holding a concurrency slot until the stream ends.
+
+        Only opening the stream is retried; the whole stream shares one timeout.
+        """
+        client = self._get_client()
+
+        async def open_stream():
+            await self._acquire_slot()
+            try:
+                return await asyncio.wait_for(
+                    client.chat.completions.create(model=self.model, messages=messages, stream=True, **params),
+                    self._timeout,
+                )
+            except BaseException:
+                self._release_slot()
+                raise
+
+        try:
+            stream = await model_call_guard.call_async(open_stream, tokens=_estimate_tokens(messages, params))
+        except CircuitOpenError as exc:
+            raise _circuit_unavailable(exc) from exc
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._timeout
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    raise
+                # Azure sends content-filter chunks without choices
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+            self._release_slot()
+
+    async def _acquire_slot(self) -> None:
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._queue_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many AI generations in progress, please retry shortly",
+            )
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _map_reduce_summary(
+        self,
+        content: str,
+        content_type: str,
+        transcript_segments: Optional[List[Dict]],
+    ) -> Optional[str]:
+        """Summary of content too long for one prompt, or None when it fits in one"""
+        notes = await self._condense(content, content_type, transcript_segments, settings.AI_SUMMARY_REDUCE_TOKENS)
+        if notes is None:
+            return None
+        messages, params = AIService._reduce_summary_request(notes, content_type)
+        return await self._chat("generate_summary", messages, **params)
+
+    async def _condense(
+        self,
+        content: str,
+        content_type: str,
+        transcript_segments: Optional[List[Dict]],
+        max_tokens: int,
+    ) -> Optional[List[str]]:
+        """Notes covering all of the content within ``max_tokens``, or None if it fits in one chunk"""
+        chunks = chunk_content(content, transcript_segments, settings.AI_SUMMARY_CHUNK_TOKENS)
+        if len(chunks) <= 1:
+            return None
+        replies = await self._chat_parallel("summarize_chunk", AIService._chunk_notes_requests(chunks, content_type))
+        notes = [AIService._label_notes(chunk, reply) for chunk, reply in zip(chunks, replies)]
+        groups = AIService._merge_groups(notes, max_tokens)
+        while groups:
+            notes = await self._chat_parallel("merge_notes", [AIService._notes_merge_request(group) for group in groups])
+            groups = AIService._merge_groups(notes, max_tokens)
+        return notes
+
+    async def _chat_parallel(self, method: str, requests: List[ChatRequest]) -> List[str]:
+        """Independent completions, at most AI_MAP_CONCURRENCY of them from this call at a time"""
+        limit = asyncio.Semaphore(settings.AI_MAP_CONCURRENCY)
+
+        async def run(messages: List[Dict], params: Dict[str, Any]) -> str:
+            async with limit:
+                return await self._chat(method, messages, **params)
+
+        return list(await asyncio.gather(*(run(messages, params) for messages, params in requests)))
+
+    async def generate_summary(
+        self,
+        content: str,
+        content_type: str = "article",
+        transcript_segments: Optional[List[Dict]] = None,
+    ) -> str:
+        """Generate a concise summary of the content, map-reduce when it is longer than one chunk"""
+        try:
+            summary = await self._map_reduce_summary(content, content_type, transcript_segments)
+            if summary is not None:
+                return summary
+            messages, params = AIService._summary_request(content, content_type)
+            return await self._chat("generate_summary", messages, **params)
+        except Exception as e:
+            logger.error(f"Error generating summary: {e}")
+            raise
+
+    async def generate_quiz(
+        self,
+        content: str,
+        summary: str,
+        content_type: str = "article",
+        transcript_segments: Optional[List[Dict]] = None,
+    ) -> List[Dict]:
+        """Generate 5 multiple-choice questions based on the content"""
+        try:
+            notes = await self._condense(content, content_type, transcript_segments, QUIZ_NOTES_TOKENS)
+            messages, params = AIService._quiz_request(content, summary, content_type, transcript_segments, notes)
+            return await self._chat("generate_quiz", messages, parse=AIService._quiz_parser("quiz"), **params)
+        except Exception as e:
+            logger.error(f"Error generating quiz: {e}")
+            raise
+
+    async def generate_review_hints(
+        self,
+        summary: str,
+        transcript: Optional[str],
+        content_type: str,
+        wrong_answers: List[int],
+        original_quiz: List[Dict],
+        transcript_segments: Optional[List[Dict]] = None,
+        candidate_segments: Optional[List[Dict]] = None,
+    ) -> Dict:
+        """Generate review hints (paragraph indices or timestamps) for missed concepts"""
+        try:
+            messages, params = AIService._review_hints_request(
+                summary, content_type, wrong_answers, original_quiz, transcript_segments, candidate_segments,
+            )
+            return json.loads(await self._chat("generate_review_hints", messages, cache=False, **params))
+        except Exception as e:
+            logger.error(f"Error generating review hints: {e}")
+            return {"articleHighlights": [], "timestamps": [], "concepts": []}
+
+    async def generate_retry_quiz(
+        self,
+        summary: str,
+        transcript: Optional[str],
+        content_type: str,
+        wrong_concepts: List[str],
+        original_quiz: List[Dict],
+        transcript_segments: Optional[List[Dict]] = None,
+    ) -> List[Dict]:
+        """Generate a new quiz focusing on the concepts the user missed"""
+        try:
+            messages, params = AIService._retry_quiz_request(
+                summary, transcript, content_type, wrong_concepts, transcript_segments,
+            )
+            return await self._chat(
+                "generate_retry_quiz", messages, cache=False, parse=AIService._quiz_parser("retry quiz"), **params,
+            )
+        except Exception as e:
+            logger.error(f"Error generating retry quiz: {e}")
+            raise
+
+    async def generate_storyboard(self, summary: str) -> List[Dict]:
+        """Generate a storyboard for animated summary"""
+        try:
+            messages, params = AIService._storyboard_request(summary)
+            return await self._chat("generate_storyboard", messages, parse=AIService._parse_storyboard, **params)
+        except Exception as e:
+            logger.error(f"Error generating storyboard: {e}")
+            return []
+
+    async def stream_storyboard(self, summary: str) -> AsyncIterator[Dict]:
+        """Yield storyboard steps as each one is completed in the streamed reply.
+
+        Shares its cache entries with ``generate_storyboard``.
+        """
+        messages, params = AIService._storyboard_request(summary)
+        key = generation_cache.make_key("generate_storyboard", self.model, messages, params)
+        cached = await generation_cache.get_async(key)
+        usable, steps = AIService._parse_cached(cached, AIService._parse_storyboard) if cached is not None else (False, None)
+        if usable:
+            for step in steps:
+                yield step
+            return
+
+        parser = JsonArrayStream()
+        reply = []
+        emitted = 0
+        chunks = self._stream(messages, params)
+        try:
+            async for text in chunks:
+                reply.append(text)
+                for step in parser.feed(text):
+                    emitted += 1
+                    yield step
+        finally:
+            # Release the model slot right away if the client goes away mid-stream
+            await chunks.aclose()
+        reply = "".join(reply)
+        steps = AIService._parse_storyboard(reply)
+        if not emitted:
+            # Not the expected shape; let the tolerant parser have the whole reply
+            for step in steps:
+                yield step
+        if steps:
+            await generation_cache.set_async(key, "generate_storyboard", self.model, reply)
+
+
+# Singleton instances
+ai_service = AIService()
+async_ai_service = AsyncAIService()
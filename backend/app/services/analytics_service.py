@@ -0,0 +1,415 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.database import Database
+
+from app.core.database import get_async_database, get_database
+
+logger = logging.getLogger(__name__)
+
+# org_rollups holds one "<org>|total" document per organization (user count and
+# summed tech score) plus one "<org>|<YYYY-MM-DD>" document per active day.
+# Daily distinct counters are kept exact with marker documents that expire.
+TOTAL_KEY = "total"
+MARKER_TTL_SECONDS = 3 * 24 * 3600
+ACTIVE_WINDOW_DAYS = 7
+PARTICIPATION_WINDOW_DAYS = 30
+
+EXPORT_BATCH_SIZE = 1000
+
+# Columns written by each completion export view
+EXPORT_COLUMNS = {
+    "attempts": [
+        "user_id", "email", "job_role", "content_id", "content_title", "quiz_id",
+        "attempt_number", "passed", "correct_count", "wrong_count", "tech_score_change", "created_at",
+    ],
+    "users": [
+        "user_id", "email", "job_role", "attempts", "completions", "tech_score_change",
+        "first_attempt_at", "last_attempt_at",
+    ],
+    "content": [
+        "content_id", "content_title", "attempts", "completions", "users",
+        "first_attempt_at", "last_attempt_at",
+    ],
+}
+
+# (filter, update, upsert) triples, applied in order
+RollupWrite = Tuple[Dict[str, Any], Dict[str, Any], bool]
+
+
+class AnalyticsService:
+    """Maintains per-organization rollups incrementally as activity is written"""
+
+    @property
+    def db(self) -> Database:
+        return get_database()
+
+    def record_quiz_attempt(
+        self,
+        organization_id: Optional[str],
+        user_id: str,
+        passed: bool,
+        tech_score_change: int,
+        at: Optional[datetime] = None,
+    ) -> None:
+        if not organization_id:
+            return
+        at = at or datetime.utcnow()
+        try:
+            self._apply(self._quiz_attempt_writes(organization_id, passed, tech_score_change, at))
+            if self._mark_first(organization_id, user_id, "quiz", at):
+                self._apply(self._distinct_writes(organization_id, "quiz_participants", at))
+        except Exception as e:
+            logger.warning(f"Error updating quiz rollups for {organization_id}: {e}")
+
+    def record_event(
+        self,
+        organization_id: Optional[str],
+        user_id: str,
+        event_type: str,
+        at: Optional[datetime] = None,
+        count: int = 1,
+    ) -> None:
+        if not organization_id:
+            return
+        at = at or datetime.utcnow()
+        try:
+            self._apply(self._event_writes(organization_id, event_type, at, count))
+            if self._mark_first(organization_id, user_id, "active", at):
+                self._apply(self._distinct_writes(organization_id, "active_users", at))
+        except Exception as e:
+            logger.warning(f"Error updating event rollups for {organization_id}: {e}")
+
+    def record_user_membership(
+        self,
+        organization_id: Optional[str],
+        tech_score: int = 0,
+        joined: bool = True,
+    ) -> None:
+        if not organization_id:
+            return
+        try:
+            self._apply(self._membership_writes(organization_id, tech_score, joined))
+        except Exception as e:
+            logger.warning(f"Error updating membership rollups for {organization_id}: {e}")
+
+    def _apply(self, writes: List[RollupWrite]) -> None:
+        for filter_doc, update, upsert in writes:
+            self.db.org_rollups.update_one(filter_doc, update, upsert=upsert)
+
+    def _mark_first(self, organization_id: str, user_id: str, kind: str, at: datetime) -> bool:
+        marker_id, update = self._marker_upsert(organization_id, user_id, kind, at)
+        result = self.db.org_rollup_markers.update_one({"_id": marker_id}, update, upsert=True)
+        return result.upserted_id is not None
+
+    @staticmethod
+    def _day(at: datetime) -> str:
+        return at.strftime("%Y-%m-%d")
+
+    @classmethod
+    def _daily_key(cls, organization_id: str, at: datetime) -> Dict[str, Any]:
+        return {"_id": f"{organization_id}|{cls._day(at)}"}
+
+    @classmethod
+    def _daily_insert_fields(cls, organization_id: str, at: datetime) -> Dict[str, Any]:
+        return {"organization_id": organization_id, "date": cls._day(at)}
+
+    @classmethod
+    def _quiz_attempt_writes(
+        cls, organization_id: str, passed: bool, tech_score_change: int, at: datetime
+    ) -> List[RollupWrite]:
+        return [
+            (
+                cls._daily_key(organization_id, at),
+                {
+                    "$inc": {
+                        "quiz_attempts": 1,
+                        "quiz_passed": 1 if passed else 0,
+                        "quiz_failed": 0 if passed else 1,
+                        "tech_score_delta": tech_score_change,
+                    },
+                    "$setOnInsert": cls._daily_insert_fields(organization_id, at),
+                },
+                True,
+            ),
+            (
+                {"_id": f"{organization_id}|{TOTAL_KEY}"},
+                {
+                    "$inc": {"tech_score_total": tech_score_change},
+                    "$setOnInsert": {"organization_id": organization_id, "date": TOTAL_KEY},
+                },
+                True,
+            ),
+        ]
+
+    @classmethod
+    def _event_writes(cls, organization_id: str, event_type: str, at: datetime, count: int) -> List[RollupWrite]:
+        return [(
+            cls._daily_key(organization_id, at),
+            {
+                "$inc": {"events_total": count, f"events.{event_type}": count},
+                "$setOnInsert": cls._daily_insert_fields(organization_id, at),
+            },
+            True,
+        )]
+
+    @classmethod
+    def _distinct_writes(cls, organization_id: str, counter: str, at: datetime) -> List[RollupWrite]:
+        return [(
+            cls._daily_key(organization_id, at),
+            {"$inc": {counter: 1}, "$setOnInsert": cls._daily_insert_fields(organization_id, at)},
+            True,
+        )]
+
+    @staticmethod
+    def _membership_writes(organization_id: str, tech_score: int, joined: bool) -> List[RollupWrite]:
+        sign = 1 if joined else -1
+        return [(
+            {"_id": f"{organization_id}|{TOTAL_KEY}"},
+            {
+                "$inc": {"user_count": sign, "tech_score_total": sign * (tech_score or 0)},
+                "$setOnInsert": {"organization_id": organization_id, "date": TOTAL_KEY},
+            },
+            True,
+        )]
+
+    @classmethod
+    def _marker_upsert(cls, organization_id: str, user_id: str, kind: str, at: datetime) -> Tuple[str, Dict[str, Any]]:
+        marker_id = f"{organization_id}|{cls._day(at)}|{kind}|{user_id}"
+        return marker_id, {"$setOnInsert": {"created_at": at}}
+
+    @classmethod
+    def _rollup_window_query(cls, organization_id: str, now: datetime) -> Dict[str, Any]:
+        """Every rollup document the analytics endpoints need, in one indexed query"""
+        oldest = now - timedelta(days=PARTICIPATION_WINDOW_DAYS - 1)
+        return {
+            "organization_id": organization_id,
+            "$or": [
+                {"date": TOTAL_KEY},
+                {"date": {"$gte": cls._day(oldest), "$lte": cls._day(now)}},
+            ],
+        }
+
+    @classmethod
+    def _summarize(cls, rollups: List[Dict[str, Any]], now: datetime, days: int) -> Dict[str, Any]:
+        """Fold the total document and the daily documents of the last ``days`` days"""
+        since = cls._day(now - timedelta(days=days - 1))
+        summary = {
+            "user_count": 0,
+            "tech_score_total": 0,
+            "events_total": 0,
+            "quiz_attempts": 0,
+            "quiz_passed": 0,
+            "quiz_failed": 0,
+        }
+        for rollup in rollups:
+            if rollup.get("date") == TOTAL_KEY:
+                summary["user_count"] = rollup.get("user_count", 0)
+                summary["tech_score_total"] = rollup.get("tech_score_total", 0)
+            elif rollup.get("date", "") >= since:
+                for field in ("events_total", "quiz_attempts", "quiz_passed", "quiz_failed"):
+                    summary[field] += rollup.get(field, 0)
+        return summary
+
+    @staticmethod
+    def _completion_export_pipeline(
+        organization_id: str, start: datetime, end: datetime, view: str
+    ) -> List[Dict[str, Any]]:
+        """Aggregation over the org's users joined to their attempts in [start, end)"""
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"organization_id": organization_id}},
+            {"$project": {"email": 1, "job_role": 1}},
+            {"$lookup": {
+                "from": "quiz_attempts",
+                "let": {"user_id": {"$toString": "$_id"}},
+                "pipeline": [
+                    {"$match": {
+                        "$expr": {"$eq": ["$user_id", "$$user_id"]},
+                        "created_at": {"$gte": start, "$lt": end},
+                    }},
+                    {"$sort": {"created_at": 1}},
+                    {"$project": {"answers": 0, "review_hints": 0}},
+                ],
+                "as": "attempt",
+            }},
+            {"$unwind": "$attempt"},
+        ]
+        content_lookup = [
+            {"$lookup": {
+                "from": "content_items",
+                "let": {"content_id": {"$convert": {"input": "$content_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$content_id"]}}},
+                    {"$project": {"title": 1}},
+                ],
+                "as": "content",
+            }},
+            {"$set": {"content_title": {"$first": "$content.title"}}},
+            {"$unset": "content"},
+        ]
+        completed = {"$cond": ["$attempt.passed", 1, 0]}
+
+        if view == "users":
+            return pipeline + [
+                {"$group": {
+                    "_id": "$_id",
+                    "email": {"$first": "$email"},
+                    "job_role": {"$first": "$job_role"},
+                    "attempts": {"$sum": 1},
+                    "completions": {"$sum": completed},
+                    "tech_score_change": {"$sum": "$attempt.tech_score_change"},
+                    "first_attempt_at": {"$min": "$attempt.created_at"},
+                    "last_attempt_at": {"$max": "$attempt.created_at"},
+                }},
+                {"$sort": {"_id": 1}},
+                {"$set": {"user_id": {"$toString": "$_id"}}},
+            ]
+        if view == "content":
+            return pipeline + [
+                {"$group": {
+                    "_id": "$attempt.content_id",
+                    "attempts": {"$sum": 1},
+                    "completions": {"$sum": completed},
+                    "user_ids": {"$addToSet": "$_id"},
+                    "first_attempt_at": {"$min": "$attempt.created_at"},
+                    "last_attempt_at": {"$max": "$attempt.created_at"},
+                }},
+                {"$set": {"content_id": "$_id", "users": {"$size": "$user_ids"}}},
+                {"$unset": "user_ids"},
+                {"$sort": {"_id": 1}},
+            ] + content_lookup
+        if view == "attempts":
+            # Streams user by user without a blocking sort over the whole org
+            return pipeline + [
+                {"$replaceWith": {"$mergeObjects": [
+                    "$attempt",
+                    {"user_id": {"$toString": "$_id"}, "email": "$email", "job_role": "$job_role"},
+                ]}},
+            ] + content_lookup
+        raise ValueError(f"Unsupported export view: {view}")
+
+    @staticmethod
+    def _participation_query(organization_id: str, now: datetime) -> Dict[str, Any]:
+        return {
+            "organization_id": organization_id,
+            "last_quiz_attempt_at": {"$gte": now - timedelta(days=PARTICIPATION_WINDOW_DAYS)},
+        }
+
+
+class AsyncAnalyticsService:
+    """Non-blocking rollup writes and reads for the FastAPI request path"""
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    async def record_quiz_attempt(
+        self,
+        organization_id: Optional[str],
+        user_id: str,
+        passed: bool,
+        tech_score_change: int,
+        at: Optional[datetime] = None,
+    ) -> None:
+        if not organization_id:
+            return
+        at = at or datetime.utcnow()
+        try:
+            await self._apply(AnalyticsService._quiz_attempt_writes(organization_id, passed, tech_score_change, at))
+            if await self._mark_first(organization_id, user_id, "quiz", at):
+                await self._apply(AnalyticsService._distinct_writes(organization_id, "quiz_participants", at))
+        except Exception as e:
+            logger.warning(f"Error updating quiz rollups for {organization_id}: {e}")
+
+    async def record_event(
+        self,
+        organization_id: Optional[str],
+        user_id: str,
+        event_type: str,
+        at: Optional[datetime] = None,
+        count: int = 1,
+    ) -> None:
+        if not organization_id:
+            return
+        at = at or datetime.utcnow()
+        try:
+            await self._apply(AnalyticsService._event_writes(organization_id, event_type, at, count))
+            if await self._mark_first(organization_id, user_id, "active", at):
+                await self._apply(AnalyticsService._distinct_writes(organization_id, "active_users", at))
+        except Exception as e:
+            logger.warning(f"Error updating event rollups for {organization_id}: {e}")
+
+    async def record_user_membership(
+        self,
+        organization_id: Optional[str],
+        tech_score: int = 0,
+        joined: bool = True,
+    ) -> None:
+        if not organization_id:
+            return
+        try:
+            await self._apply(AnalyticsService._membership_writes(organization_id, tech_score, joined))
+        except Exception as e:
+            logger.warning(f"Error updating membership rollups for {organization_id}: {e}")
+
+    async def get_org_analytics(self, organization_id: str) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        rollups = await self.db.org_rollups.find(
+            AnalyticsService._rollup_window_query(organization_id, now)
+        ).to_list(length=None)
+        summary = AnalyticsService._summarize(rollups, now, ACTIVE_WINDOW_DAYS)
+        participants = await self.db.users.count_documents(
+            AnalyticsService._participation_query(organization_id, now)
+        )
+
+        total_users = summary["user_count"]
+        return {
+            "total_users": total_users,
+            # Activity events in the window, as this metric has always counted
+            "active_users": summary["events_total"],
+            "avg_tech_score": summary["tech_score_total"] / total_users if total_users > 0 else 0,
+            "participation_rate": participants / total_users if total_users > 0 else 0,
+        }
+
+    async def get_org_report(self, organization_id: str, days: int = 7) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        rollups = await self.db.org_rollups.find(
+            AnalyticsService._rollup_window_query(organization_id, now)
+        ).to_list(length=None)
+        summary = AnalyticsService._summarize(rollups, now, days)
+        return {
+            "organization_id": organization_id,
+            "period": f"last_{days}_days",
+            "total_completions": summary["quiz_passed"],
+            "users": summary["user_count"],
+        }
+
+    async def iter_completion_rows(
+        self,
+        organization_id: str,
+        start: datetime,
+        end: datetime,
+        view: str = "attempts",
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield export rows from a server-side cursor, one batch in memory at a time"""
+        pipeline = AnalyticsService._completion_export_pipeline(organization_id, start, end, view)
+        cursor = self.db.users.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+        async for row in cursor:
+            yield row
+
+    async def _apply(self, writes: List[RollupWrite]) -> None:
+        for filter_doc, update, upsert in writes:
+            await self.db.org_rollups.update_one(filter_doc, update, upsert=upsert)
+
+    async def _mark_first(self, organization_id: str, user_id: str, kind: str, at: datetime) -> bool:
+        marker_id, update = AnalyticsService._marker_upsert(organization_id, user_id, kind, at)
+        result = await self.db.org_rollup_markers.update_one({"_id": marker_id}, update, upsert=True)
+        return result.upserted_id is not None
+
+
+# Singleton instances
+analytics_service = AnalyticsService()
+async_analytics_service = AsyncAnalyticsService()
@@ -0,0 +1,250 @@
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+INDEX_FIELDS = {"title": 1, "summary": 1, "tags": 1}
+# Title words and tags say more about an item than any one summary word
+TITLE_WEIGHT = 2
+TAG_WEIGHT = 3
+# ObjectIds are minted before the insert lands, so an item can appear with an
+# _id older than one already synced; each sync re-reads this far back.
+SYNC_OVERLAP = timedelta(minutes=10)
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]+")
+_STOPWORDS = {
+    "about", "after", "also", "and", "are", "been", "but", "can", "for", "from", "has", "have", "how",
+    "into", "its", "more", "new", "not", "now", "our", "over", "the", "their", "they", "this", "was",
+    "what", "when", "which", "who", "will", "with", "you", "your",
+}
+
+
+class ContentIndex:
+    """Hashed TF-IDF vectors of every item's title, summary and tags.
+
+    Tokens are hashed into ``dim`` buckets, so the vocabulary never has to be
+    stored and a new item is one more row of the term-frequency matrix. The
+    IDF-weighted, normalized matrix is rebuilt lazily after changes, so a
+    similarity query is one matrix-vector product over all items.
+
+    The index is saved to ``path`` and catches up with items inserted
+    elsewhere (the ingestion function, other API instances) by reading the
+    ones with a newer ``_id`` than the last sync saw, less SYNC_OVERLAP.
+    Edits and deletions made by other processes are never picked up; rebuild
+    with build_content_index.py after changing items in place.
+    """
+
+    def __init__(self, dim: int = settings.CONTENT_INDEX_DIM, path: str = settings.CONTENT_INDEX_PATH) -> None:
+        self.dim = dim
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._tf = np.zeros((0, dim), dtype=np.float32)
+        self._df = np.zeros(dim, dtype=np.float64)
+        self._weighted: Optional[np.ndarray] = None
+        # Newest _id read by sync(); items added locally do not move it
+        self._synced_id: Optional[ObjectId] = None
+        self._loaded = False
+        self._synced_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, content_id: str, item: dict) -> None:
+        """Index or re-index one item"""
+        vector = self._term_frequencies(item)
+        with self._lock:
+            row = self._rows.get(content_id)
+            if row is None:
+                row = self._append_row()
+                self._ids[row] = content_id
+                self._rows[content_id] = row
+            else:
+                self._df -= self._tf[row] > 0
+            self._tf[row] = vector
+            self._df += vector > 0
+            self._weighted = None
+
+    def remove(self, content_id: str) -> None:
+        with self._lock:
+            row = self._rows.pop(content_id, None)
+            if row is None:
+                return
+            self._df -= self._tf[row] > 0
+            self._tf[row] = 0
+            self._ids[row] = None
+            self._weighted = None
+
+    def related(self, content_id: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Items most similar to ``content_id`` by cosine similarity, best first"""
+        with self._lock:
+            row = self._rows.get(content_id)
+            if row is None:
+                return []
+            weighted = self._weighted_matrix()
+            similarities = weighted @ weighted[row]
+            similarities[row] = -1.0
+            return self._top(similarities, limit)
+
+    def score_roles(self, items: List[dict], roles: List[str]) -> List[Dict[str, float]]:
+        """Cosine similarity (0.0 to 1.0) between each item and each role's name, without a model call"""
+        if not items or not roles:
+            return [{} for _ in items]
+        with self._lock:
+            idf = self._current_idf()
+        item_vectors = self._normalize(np.stack([self._term_frequencies(item) for item in items]) * idf)
+        role_vectors = self._normalize(np.stack([self._term_frequencies({"title": role}) for role in roles]) * idf)
+        scores = item_vectors @ role_vectors.T
+        return [
+            {role: float(round(value, 4)) for role, value in zip(roles, item_scores)}
+            for item_scores in scores
+        ]
+
+    def refresh(self) -> None:
+        """Load the saved index once, then pick up new items at most every CONTENT_INDEX_REFRESH_SECONDS"""
+        if self._loaded and time.monotonic() - self._synced_at < settings.CONTENT_INDEX_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.load()
+                self._loaded = True
+            self.sync()
+
+    def sync(self) -> int:
+        """Index items inserted since the last sync; returns how many were added"""
+        query = {}
+        if self._synced_id is not None:
+            since = self._synced_id.generation_time - SYNC_OVERLAP
+            query = {"_id": {"$gte": ObjectId.from_datetime(since)}}
+        added = 0
+        try:
+            for item in get_database().content_items.find(query, INDEX_FIELDS).sort("_id", 1):
+                content_id = str(item["_id"])
+                if content_id not in self._rows:
+                    self.add(content_id, item)
+                    added += 1
+                if self._synced_id is None or item["_id"] > self._synced_id:
+                    self._synced_id = item["_id"]
+        except Exception as e:
+            logger.error(f"Error syncing content index: {e}")
+        self._synced_at = time.monotonic()
+        return added
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        with self._lock:
+            rows = sorted(self._rows.values())
+            ids = np.array([self._ids[row] for row in rows], dtype=str)
+            tf = self._tf[rows]
+            synced_id = str(self._synced_id or "")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written aside and swapped in, so a reader never sees a half-written file
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as handle:
+            np.savez_compressed(handle, dim=np.array(self.dim), ids=ids, tf=tf, synced_id=np.array(synced_id))
+        os.replace(temporary, path)
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Replace the index with the saved one; False if there is none or it was built for another dim"""
+        path = path or self.path
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                if int(saved["dim"]) != self.dim:
+                    logger.warning(f"Ignoring content index {path} built with dim {int(saved['dim'])}")
+                    return False
+                ids = [str(content_id) for content_id in saved["ids"]]
+                tf = saved["tf"].astype(np.float32)
+                synced_id = str(saved["synced_id"]) if "synced_id" in saved.files else ""
+        except Exception as e:
+            logger.error(f"Error loading content index {path}: {e}")
+            return False
+        with self._lock:
+            self._ids = list(ids)
+            self._rows = {content_id: row for row, content_id in enumerate(ids)}
+            self._tf = tf
+            self._df = (tf > 0).sum(axis=0).astype(np.float64)
+            self._weighted = None
+            # Without a recorded sync position the next sync reads everything once
+            self._synced_id = ObjectId(synced_id) if synced_id else None
+        return True
+
+    def _append_row(self) -> int:
+        row = len(self._ids)
+        if row >= len(self._tf):
+            # Grow geometrically so adding items one at a time stays cheap
+            grown = np.zeros((max(64, len(self._tf) * 2), self.dim), dtype=np.float32)
+            grown[: len(self._tf)] = self._tf
+            self._tf = grown
+        self._ids.append(None)
+        return row
+
+    def _current_idf(self) -> np.ndarray:
+        return (np.log((1.0 + len(self._rows)) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+    def _weighted_matrix(self) -> np.ndarray:
+        if self._weighted is None:
+            self._weighted = self._normalize(self._tf[: len(self._ids)] * self._current_idf())
+        return self._weighted
+
+    def _top(self, similarities: np.ndarray, limit: int) -> List[Tuple[str, float]]:
+        limit = min(limit, len(similarities))
+        if limit <= 0:
+            return []
+        candidates = np.argpartition(-similarities, limit - 1)[:limit]
+        ranked = candidates[np.argsort(-similarities[candidates])]
+        return [
+            (self._ids[row], float(similarities[row]))
+            for row in ranked
+            if self._ids[row] is not None and similarities[row] > 0
+        ]
+
+    def _term_frequencies(self, item: dict) -> np.ndarray:
+        """Log-scaled hashed term counts for one item"""
+        buckets = [self._bucket(token) for token in self._tokens(item)]
+        counts = np.bincount(np.array(buckets, dtype=np.int64), minlength=self.dim) if buckets else np.zeros(self.dim)
+        return np.log1p(counts).astype(np.float32)
+
+    @staticmethod
+    def _tokens(item: dict) -> List[str]:
+        tokens = _words(item.get("title") or "") * TITLE_WEIGHT + _words(item.get("summary") or "")
+        for tag in item.get("tags") or []:
+            tag = str(tag).strip().lower()
+            if tag:
+                tokens.extend([f"tag:{tag}"] * TAG_WEIGHT)
+                tokens.extend(_words(tag))
+        return tokens
+
+    def _bucket(self, token: str) -> int:
+        # crc32 rather than hash(), which is salted per process and would break saved indexes
+        return zlib.crc32(token.encode("utf-8")) % self.dim
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _TOKEN.findall(text.lower()) if word not in _STOPWORDS]
+
+
+# Singleton instance
+content_index = ContentIndex()
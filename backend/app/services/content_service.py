@@ -1,17 +1,70 @@
+import hashlib
+import json
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence
 from datetime import datetime, timedelta
 from bson import ObjectId
-from app.core.database import get_database
-from app.models.content import ContentItem, ContentType
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.database import Database
+from app.core.config import settings
+from app.core.database import get_async_database, get_database
+from app.models.content import ContentItem, ContentType, QuizStatus
 from app.models.user import User
 from app.services.ai_service import ai_service
+from app.services.content_index import content_index
+from app.utils.segment_index import build_segment_index
+from app.utils.pagination import InvalidCursorError, cursor_values, decode_cursor, encode_cursor, keyset_filter
 
 logger = logging.getLogger(__name__)
 
+FEED_SORT = [
+    ("priority_score", -1),
+    ("published_at", -1),
+    ("created_at", -1),
+]
+# _id breaks ties so keyset pagination never skips or repeats an item
+FEED_PAGE_SORT = FEED_SORT + [("_id", -1)]
+# Types a feed cursor may carry for each FEED_PAGE_SORT field; missing sort fields are null
+FEED_CURSOR_TYPES = ((int, float, type(None)), (datetime, type(None)), (datetime, type(None)), (str,))
+
+# Materialized feeds keep this many ranked cards per audience segment and are
+# rebuilt from content_items once older than FEED_SEGMENT_MAX_AGE.
+FEED_SEGMENT_SIZE = 100
+FEED_SEGMENT_MAX_AGE = timedelta(hours=6)
+DAILY_OPTION_TYPES = tuple(content_type.value for content_type in ContentType)
+FEED_CARD_FIELDS = (
+    "title",
+    "type",
+    "source_id",
+    "organization_id",
+    "url",
+    "description",
+    "summary",
+    "published_at",
+    "role_tags",
+    "tags",
+    "priority_score",
+    "metadata",
+    "created_at",
+)
+FEED_CARD_PROJECTION = {field: 1 for field in FEED_CARD_FIELDS}
+AUDIENCE_GLOBAL = "global"
+
+# Large fields kept out of content_items in the content_bodies side collection
+# (same _id) and only loaded when quiz generation, review hints or the detail
+# view ask for them. transcript_index is the BM25 index over transcript_segments.
+HEAVY_CONTENT_FIELDS = ("transcript", "transcript_segments", "transcript_index", "animated_summary")
+HEAVY_FIELDS_EXCLUSION = {field: 0 for field in HEAVY_CONTENT_FIELDS}
+# Cards store the ObjectId as a hex string, which orders the same way
+FEED_SEGMENT_ORDER = {**dict(FEED_SORT), "id": -1}
+
+
 class ContentService:
-    def __init__(self):
-        self.db = get_database()
+    """Synchronous content access, used by the ingestion function and scripts"""
+
+    @property
+    def db(self) -> Database:
+        return get_database()
     
     @staticmethod
     def slugify(value: str) -> str:
@@ -21,64 +74,125 @@ class ContentService:
         value = re.sub(r"[^a-z0-9]+", "-", value).strip("-")
         return value or "content"
     
+    def _find_organization(self, organization_id: Optional[str]) -> Optional[dict]:
+        if not organization_id:
+            return None
+        try:
+            return self.db.organizations.find_one({"_id": ObjectId(organization_id)})
+        except Exception:
+            logger.debug("Organization %s not found by ObjectId", organization_id)
+            return self.db.organizations.find_one({"slug": organization_id})
+
     def _build_user_content_query(self, user: dict) -> dict:
-        and_clauses: List[dict] = []
+        org_document = self._find_organization(user.get("organization_id"))
+        return self._compose_user_content_query(user, org_document)
 
-        job_role = (user.get("job_role") or user.get("role") or "").strip()
-        organization_id = user.get("organization_id")
-        org_document = None
+    @classmethod
+    def _compose_user_content_query(cls, user: dict, org_document: Optional[dict]) -> dict:
+        """Build the audience filter for a user once their organization is resolved"""
+        return cls._compose_segment_query(cls._resolve_segment(user, org_document))
 
-        if organization_id:
-            try:
-                org_document = self.db.organizations.find_one({"_id": ObjectId(organization_id)})
-            except Exception:
-                logger.debug("Organization %s not found by ObjectId", organization_id)
-                org_document = self.db.organizations.find_one({"slug": organization_id})
-
-            if org_document:
-                and_clauses.append({
-                    "$or": [
-                        {"organization_id": organization_id},
-                        {"organization_id": {"$exists": False}},
-                        {"organization_id": None},
-                    ]
-                })
+    @staticmethod
+    def _segment_key(user: dict) -> str:
+        """Identify the audience segment a user belongs to without any lookups.
 
-        if job_role:
-            normalized_role = job_role.lower()
-            and_clauses.append({
-                "$or": [
-                    {"role_tags": {"$in": [job_role, normalized_role, job_role.title()]}},
-                    {"role_tags": {"$size": 0}},
-                    {"role_tags": {"$exists": False}},
-                ]
-            })
-            role_keywords = {token for token in job_role.lower().replace("/", " ").replace("-", " ").split() if len(token) > 3}
-            if role_keywords:
-                and_clauses.append({
-                    "$or": [
-                        {"tags": {"$in": list(role_keywords)}},
-                        {"tags": {"$exists": False}},
-                    ]
-                })
-        else:
-            and_clauses.append({
-                "$or": [
-                    {"role_tags": {"$size": 0}},
-                    {"role_tags": {"$exists": False}},
-                ]
-            })
+        Users sharing organization, job role and explicit source list always
+        receive the same ranked feed, so they share one materialized segment.
+        """
+        descriptor = [
+            user.get("organization_id") or "",
+            (user.get("job_role") or user.get("role") or "").strip(),
+            sorted(user.get("source_ids") or []),
+        ]
+        return hashlib.sha1(json.dumps(descriptor).encode("utf-8")).hexdigest()
 
+    @staticmethod
+    def _resolve_segment(user: dict, org_document: Optional[dict]) -> dict:
+        """Resolve the audience attributes that determine which content matches"""
         source_ids = user.get("source_ids")
         if not source_ids and org_document:
             source_ids = org_document.get("sources")
+        return {
+            # Only scope by organization when it exists, as the feed query always has
+            "organization_id": user.get("organization_id") if org_document else None,
+            "job_role": (user.get("job_role") or user.get("role") or "").strip(),
+            "source_ids": sorted(source_ids or []),
+        }
+
+    @staticmethod
+    def _audience_key_groups(segment: dict) -> List[List[str]]:
+        """Audience key alternatives a content item must hit, one group per targeting axis.
 
+        An item matches a segment when its ``audience_keys`` intersect every group.
+        """
+        groups: List[List[str]] = []
+
+        job_role = (segment.get("job_role") or "").strip()
+        if job_role:
+            groups.append([f"role:{job_role.lower()}", f"role:{AUDIENCE_GLOBAL}"])
+            role_keywords = sorted({token for token in job_role.lower().replace("/", " ").replace("-", " ").split() if len(token) > 3})
+            if role_keywords:
+                groups.append([f"tag:{keyword}" for keyword in role_keywords] + [f"tag:{AUDIENCE_GLOBAL}"])
+        else:
+            groups.append([f"role:{AUDIENCE_GLOBAL}"])
+
+        organization_id = segment.get("organization_id")
+        if organization_id:
+            groups.append([f"org:{organization_id}", f"org:{AUDIENCE_GLOBAL}"])
+
+        source_ids = segment.get("source_ids")
         if source_ids:
-            and_clauses.append({"source_id": {"$in": source_ids}})
+            groups.append([f"src:{source_id}" for source_id in source_ids])
+
+        return groups
+
+    @classmethod
+    def _compose_segment_query(cls, segment: dict) -> dict:
+        # Every clause constrains the same multikey field, so the planner can
+        # serve the feed from the (audience_keys, priority_score, ...) index.
+        and_clauses = [{"audience_keys": {"$in": group}} for group in cls._audience_key_groups(segment)]
+        if len(and_clauses) == 1:
+            return and_clauses[0]
+        return {"$and": and_clauses}
+
+    @classmethod
+    def _item_matches_segment(cls, item: dict, segment: dict) -> bool:
+        item_keys = set(item.get("audience_keys") or [])
+        return all(item_keys.intersection(group) for group in cls._audience_key_groups(segment))
+
+    @staticmethod
+    def build_audience_keys(item: dict) -> List[str]:
+        """Normalized targeting keys stored on each content item at ingest time.
 
-        if and_clauses:
-            return {"$and": and_clauses}
-        return {}
+        Untargeted axes get a ``<axis>:global`` key so that "no restriction"
+        is an indexable value rather than an ``$exists``/``$size`` check.
+        """
+        keys: List[str] = []
+
+        organization_id = item.get("organization_id")
+        keys.append(f"org:{organization_id or AUDIENCE_GLOBAL}")
+
+        role_tags = [role.strip().lower() for role in item.get("role_tags") or [] if role and role.strip()]
+        keys.extend(f"role:{role}" for role in role_tags)
+        if not role_tags:
+            keys.append(f"role:{AUDIENCE_GLOBAL}")
+
+        if "tags" not in item or item.get("tags") is None:
+            keys.append(f"tag:{AUDIENCE_GLOBAL}")
+        else:
+            keys.extend(f"tag:{tag.strip().lower()}" for tag in item["tags"] if tag and tag.strip())
+
+        if item.get("source_id"):
+            keys.append(f"src:{item['source_id']}")
+
+        return list(dict.fromkeys(keys))
+
+    @staticmethod
+    def _feed_card(item: dict) -> dict:
+        """The slice of a content item stored in a materialized segment feed"""
+        card = {field: item.get(field) for field in FEED_CARD_FIELDS if field in item}
+        card["id"] = str(item["_id"])
+        return card
 
     @staticmethod
     def _format_content_item(item: Optional[dict]) -> Optional[dict]:
@@ -100,11 +214,7 @@ class ContentService:
 
             content_items = (
                 self.db.content_items.find(query)
-                .sort([
-                    ("priority_score", -1),
-                    ("published_at", -1),
-                    ("created_at", -1),
-                ])
+                .sort(FEED_SORT)
                 .limit(limit)
             )
             
@@ -120,88 +230,286 @@ class ContentService:
             logger.error(f"Error getting user feed: {e}")
             return []
     
-    def get_content_item(self, content_id: str) -> Optional[dict]:
-        """Get a specific content item"""
+    def get_content_item(self, content_id: str, body_fields: Sequence[str] = ()) -> Optional[dict]:
+        """Get a specific content item, optionally with some of its heavy fields"""
         try:
-            item = self.db.content_items.find_one({"_id": ObjectId(content_id)})
+            item = self.db.content_items.find_one({"_id": ObjectId(content_id)}, HEAVY_FIELDS_EXCLUSION)
             if item:
+                if body_fields:
+                    item.update(self.load_content_body(content_id, body_fields))
                 item["id"] = str(item["_id"])
                 item["_id"] = str(item["_id"])
             return item
         except Exception as e:
             logger.error(f"Error getting content item: {e}")
             return None
+
+    def load_content_body(self, content_id: str, fields: Sequence[str] = HEAVY_CONTENT_FIELDS) -> dict:
+        """Lazily fetch heavy fields (transcript, segments, animated summary) for an item"""
+        projection = {field: 1 for field in fields}
+        body = self.db.content_bodies.find_one({"_id": ObjectId(content_id)}, projection) or {}
+        missing = ContentService._missing_body_fields(body, fields)
+        if missing:
+            # Items not yet split by scripts/split_content_bodies.py keep them inline
+            legacy = self.db.content_items.find_one({"_id": ObjectId(content_id)}, {field: 1 for field in missing}) or {}
+            body.update({field: legacy.get(field) for field in missing})
+        return {field: body.get(field) for field in fields}
+
+    def save_content_body(self, content_id: str, fields: dict) -> None:
+        self.db.content_bodies.update_one({"_id": ObjectId(content_id)}, {"$set": fields}, upsert=True)
+
+    @staticmethod
+    def _missing_body_fields(body: dict, fields: Sequence[str]) -> List[str]:
+        return [field for field in fields if field not in body]
+
+    @staticmethod
+    def _split_heavy_fields(content_data: dict) -> dict:
+        """Pop heavy fields off a new item; every one is recorded, even when empty"""
+        body = {field: content_data.pop(field, None) for field in HEAVY_CONTENT_FIELDS}
+        if body["transcript_segments"] and not body["transcript_index"]:
+            # Built once here so review hints rank segments without scanning the transcript
+            body["transcript_index"] = build_segment_index(body["transcript_segments"])
+        return body
     
+    def _enrich_sequentially(self, content_data: dict, content_text: str, score: bool = True) -> None:
+        """Summary, tags and priority score from separate model calls"""
+        # Generate summary if not provided
+        transcript_segments = content_data.get("transcript_segments") or []
+        if not content_data.get("summary") and content_text:
+            content_data["summary"] = ai_service.generate_summary(
+                content_text,
+                content_data.get("type", "article"),
+                transcript_segments=transcript_segments,
+            )
+
+        summary_text = content_data.get("summary") or ""
+        description_text = content_data.get("description") or ""
+
+        # Generate descriptive tags
+        if summary_text:
+            self._merge_tags(content_data, ai_service.generate_tags(description_text, summary_text))
+        self._infer_role_tags(content_data)
+
+        # Calculate priority score
+        priority_source = summary_text or description_text or content_data.get("transcript") or ""
+        if score and priority_source:
+            role_context = content_data.get("role_tags") or content_data.get("tags") or []
+            content_data["priority_score"] = ai_service.calculate_priority_score(priority_source, role_context)
+
+    def _apply_enrichment(self, content_data: dict, enrichment: dict) -> None:
+        if not content_data.get("summary"):
+            content_data["summary"] = enrichment["summary"]
+        self._merge_tags(content_data, enrichment["tags"])
+        self._infer_role_tags(content_data)
+        if enrichment["scores"]:
+            content_data["role_scores"] = self._role_score_vector(enrichment["scores"])
+        content_data["priority_score"] = enrichment["priority_score"]
+
+    @staticmethod
+    def _merge_tags(content_data: dict, generated_tags: List[str]) -> None:
+        if generated_tags:
+            existing_tags = content_data.get("tags") or []
+            content_data["tags"] = list(dict.fromkeys([tag.strip() for tag in (existing_tags + generated_tags) if tag]))
+
+    @staticmethod
+    def _normalise_role_tags(role_tags: List[str]) -> List[str]:
+        normalised_roles = []
+        seen_roles = set()
+        for role in role_tags:
+            if not role:
+                continue
+            role_text = role.strip()
+            if not role_text:
+                continue
+            key = role_text.lower()
+            if key not in seen_roles:
+                seen_roles.add(key)
+                normalised_roles.append(role_text)
+        return normalised_roles
+
+    @staticmethod
+    def _infer_role_tags(content_data: dict) -> None:
+        """Derive role tags from generated tags if none provided"""
+        if not content_data.get("role_tags") and content_data.get("tags"):
+            inferred_roles = []
+            seen_roles = set()
+            for tag in content_data["tags"]:
+                key = tag.lower()
+                if key not in seen_roles:
+                    seen_roles.add(key)
+                    inferred_roles.append(tag)
+            content_data["role_tags"] = inferred_roles[:5]
+
     def create_content_item(self, content_data: dict) -> str:
         """Create a new content item"""
         try:
-            # Generate summary if not provided
-            transcript_segments = content_data.get("transcript_segments") or []
-            if not content_data.get("summary"):
-                content_text = content_data.get("transcript") or content_data.get("description", "")
-                if content_text:
-                    content_data["summary"] = ai_service.generate_summary(
-                        content_text,
-                        content_data.get("type", "article"),
-                        transcript_segments=transcript_segments,
+            self._enrich_content_item(content_data)
+            return self._insert_content_item(content_data)
+        except Exception as e:
+            logger.error(f"Error creating content item: {e}")
+            raise
+
+    def create_content_items(self, items: List[dict]) -> List[Optional[str]]:
+        """Create a batch of new items, scoring their relevance together.
+
+        Summaries and tags are still generated per item, but each item is
+        scored for every role of its organization in a shared
+        ``score_relevance`` call instead of one call of its own. Returns the
+        new ids in order, with None for an item that could not be created.
+        """
+        enriched: List[Optional[dict]] = []
+        for content_data in items:
+            try:
+                self._enrich_content_item(content_data, score=False)
+                enriched.append(content_data)
+            except Exception as e:
+                logger.error(f"Error enriching content item {content_data.get('url') or content_data.get('title')}: {e}")
+                enriched.append(None)
+
+        self.score_content_items([content_data for content_data in enriched if content_data is not None])
+
+        content_ids: List[Optional[str]] = []
+        for content_data in enriched:
+            if content_data is None:
+                content_ids.append(None)
+                continue
+            try:
+                content_ids.append(self._insert_content_item(content_data))
+            except Exception as e:
+                logger.error(f"Error creating content item {content_data.get('url') or content_data.get('title')}: {e}")
+                content_ids.append(None)
+        return content_ids
+
+    def _enrich_content_item(self, content_data: dict, score: bool = True) -> None:
+        """Summary, tags and, unless ``score`` is False, relevance for a new item"""
+        content_text = content_data.get("transcript") or content_data.get("description", "")
+        if content_data.get("role_tags"):
+            content_data["role_tags"] = self._normalise_role_tags(content_data["role_tags"])
+
+        enrichment = None
+        if settings.AI_FUSED_ENRICHMENT and (content_data.get("summary") or content_text):
+            enrichment = ai_service.enrich_content(
+                content_text,
+                content_data.get("type", "article"),
+                content_data.get("role_tags") or [],
+                summary=content_data.get("summary"),
+                transcript_segments=content_data.get("transcript_segments"),
+                score=score,
+            )
+        if enrichment:
+            self._apply_enrichment(content_data, enrichment)
+        else:
+            self._enrich_sequentially(content_data, content_text, score=score)
+
+    def score_content_items(self, items: List[dict]) -> None:
+        """Per-role relevance for enriched items, batched by organization"""
+        by_organization: Dict[Optional[str], List[dict]] = {}
+        for content_data in items:
+            by_organization.setdefault(content_data.get("organization_id"), []).append(content_data)
+
+        for organization_id, group in by_organization.items():
+            org_document = self._find_organization(organization_id)
+            roles = self._normalise_role_tags(
+                list((org_document or {}).get("roles") or [])
+                + [role for content_data in group for role in content_data.get("role_tags") or []]
+            )
+            if settings.RELEVANCE_SCORER == "local":
+                # Term weights come from the indexed corpus, so make sure it is loaded
+                content_index.refresh()
+                group_scores = content_index.score_roles(group, roles)
+            else:
+                group_scores = ai_service.score_relevance(group, roles)
+            for content_data, scores in zip(group, group_scores):
+                if scores:
+                    self._apply_role_scores(content_data, scores)
+                    continue
+                # Left out of its batch; score it on its own as before
+                priority_source = content_data.get("summary") or content_data.get("description") or ""
+                if priority_source:
+                    content_data["priority_score"] = ai_service.calculate_priority_score(
+                        priority_source, content_data.get("role_tags") or content_data.get("tags") or [],
                     )
 
-            summary_text = content_data.get("summary") or ""
-            description_text = content_data.get("description") or ""
-
-            # Generate descriptive tags
-            if summary_text:
-                generated_tags = ai_service.generate_tags(description_text, summary_text)
-                if generated_tags:
-                    existing_tags = content_data.get("tags") or []
-                    content_data["tags"] = list(dict.fromkeys([tag.strip() for tag in (existing_tags + generated_tags) if tag]))
-
-            # Normalise role tags
-            if content_data.get("role_tags"):
-                normalised_roles = []
-                seen_roles = set()
-                for role in content_data["role_tags"]:
-                    if not role:
-                        continue
-                    role_text = role.strip()
-                    if not role_text:
-                        continue
-                    key = role_text.lower()
-                    if key not in seen_roles:
-                        seen_roles.add(key)
-                        normalised_roles.append(role_text)
-                content_data["role_tags"] = normalised_roles
-
-            # Derive role tags from generated tags if none provided
-            if not content_data.get("role_tags") and content_data.get("tags"):
-                inferred_roles = []
-                seen_roles = set()
-                for tag in content_data["tags"]:
-                    key = tag.lower()
-                    if key not in seen_roles:
-                        seen_roles.add(key)
-                        inferred_roles.append(tag)
-                content_data["role_tags"] = inferred_roles[:5]
-
-            # Calculate priority score
-            priority_source = summary_text or description_text or content_data.get("transcript") or ""
-            if priority_source:
-                role_context = content_data.get("role_tags") or content_data.get("tags") or []
-                content_data["priority_score"] = ai_service.calculate_priority_score(priority_source, role_context)
-            
-            # Ensure tags field exists
-            if "tags" not in content_data:
-                content_data["tags"] = []
+    def _apply_role_scores(self, content_data: dict, scores: Dict[str, float]) -> None:
+        """Store the role score vector and rank the item by the roles it targets"""
+        content_data["role_scores"] = self._role_score_vector(scores)
+        targeted = [
+            content_data["role_scores"][key]
+            for key in (self.role_score_key(role) for role in content_data.get("role_tags") or [])
+            if key in content_data["role_scores"]
+        ]
+        values = targeted or list(content_data["role_scores"].values())
+        content_data["priority_score"] = sum(values) / len(values) if values else 0.5
 
-            # Set timestamps
-            content_data["created_at"] = datetime.utcnow()
-            content_data["updated_at"] = datetime.utcnow()
-            
-            result = self.db.content_items.insert_one(content_data)
-            return str(result.inserted_id)
+    @staticmethod
+    def role_score_key(role: str) -> str:
+        """Key of a role in ``role_scores``; dots and dollars cannot appear in field names"""
+        return role.strip().lower().replace(".", "").replace("$", "")
+
+    @classmethod
+    def _role_score_vector(cls, scores: Dict[str, float]) -> Dict[str, float]:
+        return {
+            cls.role_score_key(role): round(float(value), 4)
+            for role, value in scores.items()
+            if isinstance(value, (int, float)) and cls.role_score_key(role)
+        }
+
+    def _insert_content_item(self, content_data: dict) -> str:
+        # Ensure tags field exists
+        if "tags" not in content_data:
+            content_data["tags"] = []
+
+        content_data["audience_keys"] = self.build_audience_keys(content_data)
+        # Picked up by the quiz precompute stage, highest priority first
+        content_data["quiz_status"] = QuizStatus.PENDING.value
+
+        # Set timestamps
+        content_data["created_at"] = datetime.utcnow()
+        content_data["updated_at"] = datetime.utcnow()
+        
+        body = self._split_heavy_fields(content_data)
+        result = self.db.content_items.insert_one(content_data)
+        body["_id"] = result.inserted_id
+        self.db.content_bodies.insert_one(body)
+        self._refresh_segments_for_item(content_data)
+        try:
+            content_index.add(str(result.inserted_id), content_data)
         except Exception as e:
-            logger.error(f"Error creating content item: {e}")
-            raise
+            # The next sync picks the item up from the database
+            logger.warning(f"Error indexing content item: {e}")
+        return str(result.inserted_id)
+
+    def _refresh_segments_for_item(self, item: dict) -> None:
+        """Fold a newly inserted item into every materialized feed it belongs to"""
+        try:
+            organization_id = item.get("organization_id")
+            segment_filter = {"organization_id": {"$in": [organization_id, None]}} if organization_id else {}
+            card = self._feed_card(item)
+            item_type = item.get("type")
+
+            for segment in self.db.feed_segments.find(segment_filter, {"items": 0, "latest_by_type": 0}):
+                if not self._item_matches_segment(item, segment):
+                    continue
+
+                self.db.feed_segments.update_one(
+                    {"_id": segment["_id"]},
+                    {"$push": {"items": {"$each": [card], "$sort": FEED_SEGMENT_ORDER, "$slice": FEED_SEGMENT_SIZE}}},
+                )
+                if item_type in DAILY_OPTION_TYPES:
+                    latest_field = f"latest_by_type.{item_type}"
+                    self.db.feed_segments.update_one(
+                        {
+                            "_id": segment["_id"],
+                            "$or": [
+                                {latest_field: None},
+                                {f"{latest_field}.published_at": {"$lte": item.get("published_at")}},
+                            ],
+                        },
+                        {"$set": {latest_field: card}},
+                    )
+        except Exception as e:
+            # Segments are rebuilt once they age out, so a missed refresh only delays the item
+            logger.warning(f"Error refreshing feed segments for {item.get('_id')}: {e}")
     
     def get_todays_top_content(self, user_id: str) -> Optional[dict]:
         """Get the top content item for today's streak (latest overall)"""
@@ -215,42 +523,233 @@ class ContentService:
             return None
     
     def get_daily_feed_options(self, user_id: str) -> dict:
-        """Get daily feed with latest article and podcast options"""
+        """Get daily feed with the latest item of every content type"""
         try:
             # Get user and their role
             user = self.db.users.find_one({"_id": ObjectId(user_id)})
             if not user:
-                return {"article": None, "podcast": None}
-            
+                return self._empty_daily_options()
+
             query = self._build_user_content_query(user)
-            
-            # Get latest article
-            article_query = {**query, "type": "article"}
-            latest_article = self.db.content_items.find_one(
-                article_query,
-                sort=[("published_at", -1)]
+            facets = list(self.db.content_items.aggregate(self._latest_by_type_pipeline(query)))
+            return self._parse_latest_by_type(facets)
+        except Exception as e:
+            logger.error(f"Error getting daily feed options: {e}")
+            return self._empty_daily_options()
+
+    @staticmethod
+    def _latest_by_type_pipeline(query: dict) -> List[dict]:
+        """Newest item per content type for an audience, in one aggregation round trip.
+
+        The sort runs once, ahead of the facets, where it can use the
+        ``published_at`` index; each facet then keeps the first item of its type.
+        """
+        return [
+            {"$match": query},
+            {"$sort": {"published_at": -1}},
+            {"$project": FEED_CARD_PROJECTION},
+            {"$facet": {
+                content_type: [
+                    {"$match": {"type": content_type}},
+                    {"$limit": 1},
+                ]
+                for content_type in DAILY_OPTION_TYPES
+            }},
+        ]
+
+    @classmethod
+    def _parse_latest_by_type(cls, facets: List[dict]) -> dict:
+        result = facets[0] if facets else {}
+        return {
+            content_type: cls._feed_card(result[content_type][0]) if result.get(content_type) else None
+            for content_type in DAILY_OPTION_TYPES
+        }
+
+    @staticmethod
+    def _empty_daily_options() -> dict:
+        return {content_type: None for content_type in DAILY_OPTION_TYPES}
+
+
+class AsyncContentService:
+    """Non-blocking content reads for the FastAPI request path"""
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    async def _find_organization(self, organization_id: Optional[str]) -> Optional[dict]:
+        if not organization_id:
+            return None
+        try:
+            return await self.db.organizations.find_one({"_id": ObjectId(organization_id)})
+        except Exception:
+            logger.debug("Organization %s not found by ObjectId", organization_id)
+            return await self.db.organizations.find_one({"slug": organization_id})
+
+    async def _build_user_content_query(self, user: dict) -> dict:
+        org_document = await self._find_organization(user.get("organization_id"))
+        return ContentService._compose_user_content_query(user, org_document)
+
+    async def _load_segment(self, user: dict) -> dict:
+        """Read the user's materialized feed with a single _id lookup, building it on a miss"""
+        key = ContentService._segment_key(user)
+        segment = await self.db.feed_segments.find_one({"_id": key})
+        refreshed_at = segment.get("refreshed_at") if segment else None
+        if refreshed_at and datetime.utcnow() - refreshed_at < FEED_SEGMENT_MAX_AGE:
+            return segment
+        return await self._build_segment(key, user)
+
+    async def _build_segment(self, key: str, user: dict) -> dict:
+        org_document = await self._find_organization(user.get("organization_id"))
+        segment = ContentService._resolve_segment(user, org_document)
+        query = ContentService._compose_segment_query(segment)
+
+        cursor = (
+            self.db.content_items.find(query, FEED_CARD_PROJECTION)
+            .sort(FEED_PAGE_SORT)
+            .limit(FEED_SEGMENT_SIZE)
+        )
+        items = [ContentService._feed_card(item) async for item in cursor]
+
+        facets = await self.db.content_items.aggregate(
+            ContentService._latest_by_type_pipeline(query)
+        ).to_list(length=1)
+        latest_by_type = ContentService._parse_latest_by_type(facets)
+
+        segment.update({
+            "items": items,
+            "latest_by_type": latest_by_type,
+            "refreshed_at": datetime.utcnow(),
+        })
+        await self.db.feed_segments.replace_one({"_id": key}, segment, upsert=True)
+        return segment
+
+    async def get_segment_feed(self, user: dict, limit: int = 20) -> List[dict]:
+        """Get the ranked feed for an already-resolved user record"""
+        try:
+            segment = await self._load_segment(user)
+            return [dict(item) for item in segment.get("items", [])[:limit]]
+        except Exception as e:
+            logger.error(f"Error getting user feed: {e}")
+            return []
+
+    async def get_feed_page(self, user: dict, limit: int = 20, cursor: Optional[str] = None) -> dict:
+        """Get one page of the ranked feed using keyset pagination.
+
+        The first page is served from the materialized segment; later pages
+        continue strictly after the cursor's sort key with an index range scan,
+        so every page costs the same regardless of depth.
+        """
+        segment = await self._load_segment(user)
+
+        if not cursor:
+            items = segment.get("items", [])
+            page = [dict(item) for item in items[:limit]]
+            has_more = len(items) > limit or len(items) >= FEED_SEGMENT_SIZE
+        else:
+            values = decode_cursor(cursor, FEED_CURSOR_TYPES)
+            try:
+                values[-1] = ObjectId(values[-1])
+            except Exception as exc:
+                raise InvalidCursorError("Malformed pagination cursor") from exc
+
+            query = {"$and": [
+                ContentService._compose_segment_query(segment),
+                keyset_filter(FEED_PAGE_SORT, values),
+            ]}
+            found = await (
+                self.db.content_items.find(query, FEED_CARD_PROJECTION)
+                .sort(FEED_PAGE_SORT)
+                .limit(limit + 1)
+                .to_list(length=limit + 1)
             )
-            
-            # Get latest podcast
-            podcast_query = {**query, "type": "podcast"}
-            latest_podcast = self.db.content_items.find_one(
-                podcast_query,
-                sort=[("published_at", -1)]
+            has_more = len(found) > limit
+            page = [ContentService._feed_card(item) for item in found[:limit]]
+
+        next_cursor = None
+        if has_more and page:
+            next_cursor = encode_cursor(cursor_values(page[-1], FEED_PAGE_SORT))
+        return {"feed": page, "next_cursor": next_cursor}
+
+    async def get_user_feed(self, user_id: str, limit: int = 20) -> List[dict]:
+        """Get personalized feed for user based on their role"""
+        try:
+            user = await self.db.users.find_one({"_id": ObjectId(user_id)})
+            if not user:
+                return []
+            return await self.get_segment_feed(user, limit)
+        except Exception as e:
+            logger.error(f"Error getting user feed: {e}")
+            return []
+
+    async def get_content_item(self, content_id: str, body_fields: Sequence[str] = ()) -> Optional[dict]:
+        """Get a specific content item, optionally with some of its heavy fields"""
+        try:
+            item = await self.db.content_items.find_one({"_id": ObjectId(content_id)}, HEAVY_FIELDS_EXCLUSION)
+            if item:
+                if body_fields:
+                    item.update(await self.load_content_body(content_id, body_fields))
+                item["id"] = str(item["_id"])
+                item["_id"] = str(item["_id"])
+            return item
+        except Exception as e:
+            logger.error(f"Error getting content item: {e}")
+            return None
+
+    async def get_content_cards(self, content_ids: List[str]) -> List[dict]:
+        """Feed cards for the given items, in the order given"""
+        try:
+            cursor = self.db.content_items.find(
+                {"_id": {"$in": [ObjectId(content_id) for content_id in content_ids]}},
+                FEED_CARD_PROJECTION,
             )
-            
-            result = {
-                "article": None,
-                "podcast": None
+            cards = {str(item["_id"]): ContentService._feed_card(item) async for item in cursor}
+            return [cards[content_id] for content_id in content_ids if content_id in cards]
+        except Exception as e:
+            logger.error(f"Error getting content cards: {e}")
+            return []
+
+    async def load_content_body(self, content_id: str, fields: Sequence[str] = HEAVY_CONTENT_FIELDS) -> dict:
+        """Lazily fetch heavy fields (transcript, segments, animated summary) for an item"""
+        projection = {field: 1 for field in fields}
+        body = await self.db.content_bodies.find_one({"_id": ObjectId(content_id)}, projection) or {}
+        missing = ContentService._missing_body_fields(body, fields)
+        if missing:
+            # Items not yet split by scripts/split_content_bodies.py keep them inline
+            legacy = await self.db.content_items.find_one(
+                {"_id": ObjectId(content_id)}, {field: 1 for field in missing}
+            ) or {}
+            body.update({field: legacy.get(field) for field in missing})
+        return {field: body.get(field) for field in fields}
+
+    async def save_content_body(self, content_id: str, fields: dict) -> None:
+        await self.db.content_bodies.update_one({"_id": ObjectId(content_id)}, {"$set": fields}, upsert=True)
+
+    async def get_todays_top_content(self, user: dict) -> Optional[dict]:
+        """Get the top content item for today's streak (latest overall)"""
+        try:
+            feed = await self.get_segment_feed(user, limit=1)
+            if feed:
+                return feed[0]
+            return None
+        except Exception as e:
+            logger.error(f"Error getting today's top content: {e}")
+            return None
+
+    async def get_daily_feed_options(self, user: dict) -> dict:
+        """Get daily feed with the latest item of every content type"""
+        try:
+            segment = await self._load_segment(user)
+            latest_by_type = segment.get("latest_by_type") or {}
+            return {
+                content_type: dict(latest_by_type[content_type]) if latest_by_type.get(content_type) else None
+                for content_type in DAILY_OPTION_TYPES
             }
-            
-            result["article"] = self._format_content_item(latest_article)
-            result["podcast"] = self._format_content_item(latest_podcast)
-            
-            return result
         except Exception as e:
             logger.error(f"Error getting daily feed options: {e}")
-            return {"article": None, "podcast": None}
+            return ContentService._empty_daily_options()
 
-# Singleton instance
+# Singleton instances
 content_service = ContentService()
+async_content_service = AsyncContentService()
 
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.core.database import get_async_database
+from app.models.event import EventType
+from app.services.analytics_service import AnalyticsService, async_analytics_service
+
+logger = logging.getLogger(__name__)
+
+
+class EventWriter:
+    """Buffers events in a bounded queue and writes them with batched inserts.
+
+    A background task flushes once ``batch_size`` events are waiting or
+    ``flush_interval`` seconds after the first buffered event, whichever comes
+    first. ``record`` waits when the buffer is full, so producers slow down
+    instead of growing memory. Before ``start`` (scripts, jobs) and after
+    ``stop`` events are written straight through.
+    """
+
+    def __init__(
+        self,
+        max_buffer: int = settings.EVENTS_BUFFER_SIZE,
+        batch_size: int = settings.EVENTS_FLUSH_BATCH_SIZE,
+        flush_interval: float = settings.EVENTS_FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self._max_buffer = max_buffer
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_buffer)
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    async def stop(self) -> None:
+        """Drain everything buffered, then stop the flusher"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def record(
+        self,
+        event_type: EventType,
+        user_id: str,
+        organization_id: Optional[str] = None,
+        content_id: Optional[str] = None,
+        quiz_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        created_at: Optional[datetime] = None,
+    ) -> None:
+        event = {
+            "user_id": user_id,
+            "event_type": EventType(event_type).value,
+            "organization_id": organization_id,
+            "created_at": created_at or datetime.utcnow(),
+        }
+        if content_id is not None:
+            event["content_id"] = content_id
+        if quiz_id is not None:
+            event["quiz_id"] = quiz_id
+        if metadata:
+            event["metadata"] = metadata
+
+        if self.running:
+            await self._queue.put(event)
+        else:
+            await self._write_batch([event])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": self._queue.qsize() if self._queue else 0,
+            "max_buffer": self._max_buffer,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._flush_interval
+            while len(batch) < self._batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write_batch(batch)
+            except Exception as e:
+                # One bad batch must not stop batching for the rest of the process
+                logger.error(f"Error flushing {len(batch)} events: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _on_task_done(task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        logger.error(f"Event flusher stopped unexpectedly; events are now written unbatched: {error}")
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        failed_indexes = set()
+        try:
+            await self.db.events.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+            logger.error(f"Error writing {len(failed_indexes)} of {len(batch)} events: {e}")
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Error writing {len(batch)} events: {e}")
+            return
+
+        written = [event for index, event in enumerate(batch) if index not in failed_indexes]
+        self.written += len(written)
+        self.failed += len(failed_indexes)
+        self.flushes += 1
+        try:
+            await self._record_rollups(written)
+        except Exception as e:
+            logger.error(f"Error recording rollups for {len(written)} events: {e}")
+
+    @staticmethod
+    async def _record_rollups(events: List[Dict[str, Any]]) -> None:
+        """One rollup update per (org, user, type, day) instead of one per event"""
+        groups: Dict[tuple, List[Any]] = {}
+        for event in events:
+            if not event.get("organization_id"):
+                continue
+            key = (
+                event["organization_id"],
+                event["user_id"],
+                event["event_type"],
+                AnalyticsService._day(event["created_at"]),
+            )
+            group = groups.setdefault(key, [event["created_at"], 0])
+            group[1] += 1
+        for (organization_id, user_id, event_type, _), (at, count) in groups.items():
+            await async_analytics_service.record_event(organization_id, user_id, event_type, at, count=count)
+
+
+# Singleton instance
+event_writer = EventWriter()
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.database import Database
+
+from app.core.config import settings
+from app.core.database import get_async_database, get_database
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# How many stores pass between checks of the collection size
+EVICTION_CHECK_INTERVAL = 100
+ENTRY_PROJECTION = {"response": 1, "expires_at": 1}
+# In-process hits refresh last_used_at in Mongo at most this often per entry,
+# so eviction still sees the hottest entries as recently used
+TOUCH_INTERVAL_SECONDS = 600
+
+
+class GenerationCache:
+    """Content-addressed cache of model responses.
+
+    Entries are keyed by a hash of (method, model, messages, parameters), so a
+    byte-identical request is answered without calling the model. Responses
+    live in the ``ai_generations`` collection, shared by the API and the
+    ingestion function, with a TTL index on ``expires_at`` and LRU eviction on
+    ``last_used_at`` once ``max_entries`` is exceeded. A small in-process LRU
+    sits in front so repeated hits skip the database as well.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.AI_CACHE_ENABLED,
+        ttl_seconds: int = settings.AI_CACHE_TTL_SECONDS,
+        max_entries: int = settings.AI_CACHE_MAX_ENTRIES,
+        memory_entries: int = settings.AI_CACHE_MEMORY_ENTRIES,
+    ) -> None:
+        self.enabled = enabled
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._memory: TTLCache[str] = TTLCache(max_entries=memory_entries, default_ttl=ttl_seconds)
+        # Entries whose last_used_at was refreshed within TOUCH_INTERVAL_SECONDS
+        self._touched: TTLCache[bool] = TTLCache(max_entries=memory_entries, default_ttl=TOUCH_INTERVAL_SECONDS)
+        self._lock = threading.Lock()
+        self._stores_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def db(self) -> Database:
+        return get_database()
+
+    @property
+    def async_db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    @staticmethod
+    def make_key(method: str, model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"method": method, "model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._count(hit=True)
+            if self._touch_due(key):
+                try:
+                    self.db.ai_generations.update_one(*self._touch(key))
+                except Exception as e:
+                    logger.warning(f"Error touching generation cache entry: {e}")
+            return cached
+
+        try:
+            entry = self.db.ai_generations.find_one_and_update(*self._touch(key), projection=ENTRY_PROJECTION)
+        except Exception as e:
+            logger.warning(f"Error reading generation cache: {e}")
+            entry = None
+        return self._remember(key, entry)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._count(hit=True)
+            if self._touch_due(key):
+                try:
+                    await self.async_db.ai_generations.update_one(*self._touch(key))
+                except Exception as e:
+                    logger.warning(f"Error touching generation cache entry: {e}")
+            return cached
+
+        try:
+            entry = await self.async_db.ai_generations.find_one_and_update(*self._touch(key), projection=ENTRY_PROJECTION)
+        except Exception as e:
+            logger.warning(f"Error reading generation cache: {e}")
+            entry = None
+        return self._remember(key, entry)
+
+    def set(self, key: str, method: str, model: str, response: str) -> None:
+        if not self.enabled or not response:
+            return
+        document = self._entry_document(method, model, response)
+        self._memory.set(key, response, ttl=self._ttl_seconds)
+        self._touched.set(key, True)
+        try:
+            self.db.ai_generations.replace_one({"_id": key}, document, upsert=True)
+            if self._eviction_due():
+                self._evict()
+        except Exception as e:
+            logger.warning(f"Error writing generation cache: {e}")
+
+    async def set_async(self, key: str, method: str, model: str, response: str) -> None:
+        if not self.enabled or not response:
+            return
+        document = self._entry_document(method, model, response)
+        self._memory.set(key, response, ttl=self._ttl_seconds)
+        self._touched.set(key, True)
+        try:
+            await self.async_db.ai_generations.replace_one({"_id": key}, document, upsert=True)
+            if self._eviction_due():
+                # Rare, so the shared sync trim runs off the event loop rather than being duplicated
+                await asyncio.to_thread(self._evict)
+        except Exception as e:
+            logger.warning(f"Error writing generation cache: {e}")
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._touched.clear()
+        self.db.ai_generations.delete_many({})
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory": self._memory.stats(),
+        }
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _touch(key: str) -> tuple:
+        """find_one_and_update arguments that fetch a live entry and mark it recently used"""
+        now = datetime.utcnow()
+        return (
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}, "$inc": {"hits": 1}},
+        )
+
+    def _touch_due(self, key: str) -> bool:
+        """True at most once per TOUCH_INTERVAL_SECONDS for a key served from memory"""
+        if self._touched.get(key):
+            return False
+        self._touched.set(key, True)
+        return True
+
+    def _remember(self, key: str, entry: Optional[Dict[str, Any]]) -> Optional[str]:
+        if entry is None:
+            self._count(hit=False)
+            return None
+        expires_at = entry["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        self._memory.set(key, entry["response"], expires_at=expires_at)
+        # The lookup just refreshed last_used_at
+        self._touched.set(key, True)
+        self._count(hit=True)
+        return entry["response"]
+
+    def _entry_document(self, method: str, model: str, response: str) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {
+            "method": method,
+            "model": model,
+            "response": response,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": now + timedelta(seconds=self._ttl_seconds),
+            "hits": 0,
+        }
+
+    def _eviction_due(self) -> bool:
+        with self._lock:
+            self._stores_since_check += 1
+            if self._stores_since_check < EVICTION_CHECK_INTERVAL:
+                return False
+            self._stores_since_check = 0
+            return True
+
+    def _evict(self) -> None:
+        """Trim the least recently used entries once the collection outgrows its bound"""
+        excess = self.db.ai_generations.estimated_document_count() - self._max_entries
+        if excess <= 0:
+            return
+        stale = self.db.ai_generations.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)
+        stale_ids = [entry["_id"] for entry in stale]
+        if stale_ids:
+            self._count_evictions(self.db.ai_generations.delete_many({"_id": {"$in": stale_ids}}).deleted_count)
+
+    def _count_evictions(self, deleted: int) -> None:
+        with self._lock:
+            self.evictions += deleted
+
+
+# Singleton instance
+generation_cache = GenerationCache()
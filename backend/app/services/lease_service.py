@@ -0,0 +1,76 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+from app.core.database import get_async_database, get_database
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseService:
+    """Named, self-expiring locks in the ``leases`` collection.
+
+    A lease is shared by every API instance and the ingestion function, and
+    lapses after ``ttl`` seconds, so a holder that crashes only blocks the
+    name until then. ``acquire`` returns a token to pass to ``release``, or
+    None while someone else holds the lease.
+    """
+
+    @property
+    def db(self) -> Database:
+        return get_database()
+
+    def acquire(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            self.db.leases.update_one(*self._acquire_update(name, token, ttl), upsert=True)
+            return token
+        except DuplicateKeyError:
+            return None
+
+    def release(self, name: str, token: str) -> None:
+        try:
+            self.db.leases.delete_one({"_id": name, "token": token})
+        except Exception as e:
+            logger.error(f"Error releasing lease {name}: {e}")
+
+    @staticmethod
+    def _acquire_update(name: str, token: str, ttl: float) -> tuple:
+        """Takes over a missing or lapsed lease; a live one makes the upsert hit a duplicate key"""
+        now = datetime.utcnow()
+        return (
+            {"_id": name, "expires_at": {"$lte": now}},
+            {"$set": {"token": token, "acquired_at": now, "expires_at": now + timedelta(seconds=ttl)}},
+        )
+
+
+class AsyncLeaseService:
+    """Non-blocking access to the same leases"""
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    async def acquire(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            await self.db.leases.update_one(*LeaseService._acquire_update(name, token, ttl), upsert=True)
+            return token
+        except DuplicateKeyError:
+            return None
+
+    async def release(self, name: str, token: str) -> None:
+        try:
+            await self.db.leases.delete_one({"_id": name, "token": token})
+        except Exception as e:
+            logger.error(f"Error releasing lease {name}: {e}")
+
+
+# Singleton instances
+lease_service = LeaseService()
+async_lease_service = AsyncLeaseService()
@@ -0,0 +1,378 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import openai
+from fastapi import HTTPException, status
+from openai import AsyncAzureOpenAI, AzureOpenAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _require_configuration() -> None:
+    if not settings.deepseek_endpoint or not settings.deepseek_key:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Azure OpenAI (DeepSeek) is not configured. Please set AZURE_DEEPSEEK_ENDPOINT and AZURE_DEEPSEEK_KEY environment variables."
+        )
+
+
+class LLMProvider:
+    """Creates the chat clients behind ``AIService`` and ``AsyncAIService``.
+
+    A client only needs ``chat.completions.create`` (with ``stream=True`` on
+    the async one) and ``close``, returning objects shaped like the OpenAI
+    SDK's. ``model`` is part of every generation cache key, so replies from
+    different providers never answer for each other.
+    """
+
+    name = ""
+
+    @property
+    def model(self) -> str:
+        raise NotImplementedError
+
+    def create_client(self) -> Any:
+        raise NotImplementedError
+
+    def create_async_client(self, timeout: float) -> Any:
+        raise NotImplementedError
+
+
+class AzureProvider(LLMProvider):
+    """DeepSeek on Azure AI Foundry"""
+
+    name = "azure"
+
+    @property
+    def model(self) -> str:
+        return settings.deepseek_model
+
+    def create_client(self) -> AzureOpenAI:
+        _require_configuration()
+        return AzureOpenAI(
+            api_key=settings.deepseek_key,
+            azure_endpoint=settings.deepseek_endpoint,
+            api_version=settings.openai_api_version,
+            max_retries=0,  # retries are handled by model_call_guard
+        )
+
+    def create_async_client(self, timeout: float) -> AsyncAzureOpenAI:
+        _require_configuration()
+        return AsyncAzureOpenAI(
+            api_key=settings.deepseek_key,
+            azure_endpoint=settings.deepseek_endpoint,
+            api_version=settings.openai_api_version,
+            timeout=timeout,
+            max_retries=0,  # retries are handled by model_call_guard
+        )
+
+
+class LocalProvider(LLMProvider):
+    """Deterministic offline backend for load tests and local development.
+
+    Replies are derived from a hash of the request, so the same prompt always
+    gets the same schema-valid summary, quiz, storyboard or score. Each call
+    waits ``latency_ms`` plus up to ``jitter_ms``, and fails with probability
+    ``error_rate`` with the throttling, server and connection errors the
+    Azure SDK raises, so the retry and circuit-breaker paths run as well.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        latency_ms: float = settings.AI_LOCAL_LATENCY_MS,
+        jitter_ms: float = settings.AI_LOCAL_JITTER_MS,
+        error_rate: float = settings.AI_LOCAL_ERROR_RATE,
+        seed: int = settings.AI_LOCAL_SEED,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def model(self) -> str:
+        return "local-deterministic"
+
+    def create_client(self) -> "LocalChatClient":
+        return LocalChatClient(self)
+
+    def create_async_client(self, timeout: float) -> "AsyncLocalChatClient":
+        return AsyncLocalChatClient(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "errors": self.errors}
+
+    def next_call(self) -> tuple:
+        """Delay in seconds and the error to raise, if any, for one call"""
+        with self._lock:
+            self.calls += 1
+            delay = (self.latency_ms + self._random.random() * self.jitter_ms) / 1000.0
+            error = None
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                self.errors += 1
+                error = self._random.choice(_INJECTED_ERRORS)()
+        return delay, error
+
+    def reply(self, messages: List[Dict]) -> str:
+        system = messages[0].get("content") or "" if messages else ""
+        prompt = messages[-1].get("content") or "" if messages else ""
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode("utf-8")).digest()
+        rng = random.Random(digest)
+        for marker, build in _REPLY_BUILDERS:
+            if marker in system:
+                return build(prompt, rng)
+        return _summary_reply(prompt, rng)
+
+
+class LocalChatClient:
+    """Synchronous client with the slice of the ``AzureOpenAI`` interface the services use"""
+
+    def __init__(self, provider: LocalProvider) -> None:
+        self._provider = provider
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict], stream: bool = False, **params):
+        delay, error = self._provider.next_call()
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        reply = self._provider.reply(messages)
+        if stream:
+            return iter([_stream_chunk(piece) for piece in _stream_pieces(reply)])
+        return _completion(reply)
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncLocalChatClient:
+    """Async counterpart of ``LocalChatClient`` for ``AsyncAIService``"""
+
+    def __init__(self, provider: LocalProvider) -> None:
+        self._provider = provider
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str, messages: List[Dict], stream: bool = False, **params):
+        delay, error = self._provider.next_call()
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        reply = self._provider.reply(messages)
+        if stream:
+            return _LocalStream(reply)
+        return _completion(reply)
+
+    async def close(self) -> None:
+        pass
+
+
+class _LocalStream:
+    """Replays a reply as streamed deltas, yielding to the loop between them"""
+
+    def __init__(self, reply: str) -> None:
+        self._pieces = _stream_pieces(reply)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for piece in self._pieces:
+            await asyncio.sleep(0)
+            yield _stream_chunk(piece)
+
+    async def close(self) -> None:
+        self._pieces = []
+
+
+def _completion(reply: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+def _stream_chunk(text: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _stream_pieces(reply: str, size: int = 40) -> List[str]:
+    return [reply[index:index + size] for index in range(0, len(reply), size)]
+
+
+_LOCAL_REQUEST = httpx.Request("POST", "http://local-llm/chat/completions")
+
+
+def _status_error(error_class: type, status_code: int, headers: Optional[Dict[str, str]] = None) -> openai.APIStatusError:
+    response = httpx.Response(status_code, headers=headers, request=_LOCAL_REQUEST)
+    return error_class(f"Injected {status_code} from the local model", response=response, body=None)
+
+
+_INJECTED_ERRORS: List[Callable[[], Exception]] = [
+    lambda: _status_error(openai.RateLimitError, 429, {"retry-after": "1"}),
+    lambda: _status_error(openai.InternalServerError, 503),
+    lambda: openai.APIConnectionError(message="Injected connection error", request=_LOCAL_REQUEST),
+]
+
+
+# Words that come from the prompt templates rather than the content
+_STOPWORDS = {
+    "about", "above", "after", "answer", "array", "article", "average", "below", "brief", "concepts", "content",
+    "correct", "description", "event", "excerpt", "explanation", "explanations", "following", "format", "from",
+    "generate", "impact", "include", "index", "json", "learner", "limit", "notes", "number", "options",
+    "paragraph", "question", "questions", "return", "should", "show", "step", "steps", "storyboard", "summary",
+    "their", "there", "these", "this", "title", "transcript", "type", "what", "which", "with", "would",
+}
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]{3,}")
+_TIME_RANGE = re.compile(r"\[(\d{2}:\d{2}-\d{2}:\d{2})\]")
+_BATCH_ROLE = re.compile(r"^- R\d+: ", re.MULTILINE)
+_BATCH_ITEM = re.compile(r"^Item (\d+): ", re.MULTILINE)
+_ROLES = re.compile(r"(?:for the following roles|for these roles): ([^\n]+?)(?:\. Put them|\n)")
+_STEP_TYPES = ["event", "impact", "concept", "conclusion"]
+
+
+def _keywords(prompt: str, rng: random.Random, count: int) -> List[str]:
+    """A deterministic sample of the prompt's distinctive words"""
+    material = prompt.split("\n\n", 1)[-1]
+    words = list(dict.fromkeys(
+        word.strip("'-").lower() for word in _WORD.findall(material) if word.lower() not in _STOPWORDS
+    ))
+    if not words:
+        words = ["strategy", "market", "platform", "customers", "growth", "risk"]
+    if len(words) >= count:
+        return rng.sample(words, count)
+    return [rng.choice(words) for _ in range(count)]
+
+
+def _sentence(words: List[str]) -> str:
+    return f"{' '.join(words).capitalize()}."
+
+
+def _summary_reply(prompt: str, rng: random.Random) -> str:
+    paragraphs = []
+    for _ in range(rng.randint(2, 3)):
+        words = _keywords(prompt, rng, 18)
+        paragraphs.append(" ".join(_sentence(words[index:index + 6]) for index in range(0, 18, 6)))
+    return "\n\n".join(paragraphs)
+
+
+def _notes_reply(prompt: str, rng: random.Random) -> str:
+    return "\n".join(f"- {_sentence(_keywords(prompt, rng, 6))}" for _ in range(rng.randint(3, 6)))
+
+
+def _tags_reply(prompt: str, rng: random.Random) -> str:
+    return ", ".join(_keywords(prompt, rng, rng.randint(3, 5)))
+
+
+def _questions_reply(prompt: str, rng: random.Random) -> str:
+    questions = []
+    for _ in range(5):
+        words = _keywords(prompt, rng, 8)
+        questions.append({
+            "question": f"Which statement about {words[0]} is supported by the content?",
+            "options": [_sentence(words[offset:offset + 2] + [f"option {offset // 2 + 1}"]) for offset in range(0, 8, 2)],
+            "correct_answer": rng.randint(0, 3),
+            "explanation": f"The content connects {words[0]} with {words[1]}.",
+        })
+    return json.dumps({"questions": questions})
+
+
+def _review_hints_reply(prompt: str, rng: random.Random) -> str:
+    time_ranges = list(dict.fromkeys(_TIME_RANGE.findall(prompt)))
+    if time_ranges:
+        timestamps = rng.sample(time_ranges, min(3, len(time_ranges)))
+        highlights = []
+    else:
+        timestamps = []
+        highlights = [{"paragraphIndex": index} for index in sorted(rng.sample(range(6), 2))]
+    return json.dumps({
+        "timestamps": timestamps,
+        "articleHighlights": highlights,
+        "concepts": _keywords(prompt, rng, 3),
+    })
+
+
+def _storyboard_reply(prompt: str, rng: random.Random) -> str:
+    steps = []
+    count = rng.randint(5, 8)
+    for index in range(1, count + 1):
+        words = _keywords(prompt, rng, 8)
+        steps.append({
+            "step": index,
+            "type": "conclusion" if index == count else _STEP_TYPES[(index - 1) % 3],
+            "title": " ".join(words[:3]).title(),
+            "description": _sentence(words[3:]),
+        })
+    return json.dumps({"steps": steps})
+
+
+def _scores(prompt: str, rng: random.Random, fallback: List[str]) -> Dict[str, Any]:
+    match = _ROLES.search(prompt)
+    roles = [role.strip() for role in match.group(1).split(", ") if role.strip()] if match else fallback
+    scores = {role: round(rng.uniform(0.2, 0.95), 2) for role in roles}
+    average = round(sum(scores.values()) / len(scores), 3) if scores else 0.5
+    return {"scores": scores, "average": average}
+
+
+def _priority_reply(prompt: str, rng: random.Random) -> str:
+    return json.dumps(_scores(prompt, rng, []))
+
+
+def _batch_scores_reply(prompt: str, rng: random.Random) -> str:
+    role_count = len(_BATCH_ROLE.findall(prompt))
+    items = [
+        {"item": int(number), "scores": [round(rng.uniform(0.2, 0.95), 2) for _ in range(role_count)]}
+        for number in _BATCH_ITEM.findall(prompt)
+    ]
+    return json.dumps({"items": items})
+
+
+def _enrichment_reply(prompt: str, rng: random.Random) -> str:
+    tags = _keywords(prompt, rng, rng.randint(3, 5))
+    summary = None if 'Set "summary" to null.' in prompt else _summary_reply(prompt, rng)
+    return json.dumps({"summary": summary, "tags": tags, **_scores(prompt, rng, tags)})
+
+
+# Matched against the system prompt of each request builder in ai_service, most specific first
+_REPLY_BUILDERS = [
+    ("summarizes, tags and rates", _enrichment_reply),
+    ("concise summaries", _summary_reply),
+    ("precise notes", _notes_reply),
+    ("generates relevant tags", _tags_reply),
+    ("educational quizzes", _questions_reply),
+    ("targeted learning feedback", _review_hints_reply),
+    ("visual storyboards", _storyboard_reply),
+    ("rates content relevance", _priority_reply),
+    ("rates how relevant content items are", _batch_scores_reply),
+]
+
+
+# Singleton instances
+azure_provider = AzureProvider()
+local_provider = LocalProvider()
+
+PROVIDERS: Dict[str, LLMProvider] = {
+    azure_provider.name: azure_provider,
+    local_provider.name: local_provider,
+}
+
+
+def get_provider(name: Optional[str] = None) -> LLMProvider:
+    """The provider selected by ``AI_PROVIDER`` unless ``name`` is given"""
+    name = (name or settings.AI_PROVIDER).lower()
+    try:
+        return PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown AI_PROVIDER {name!r}; expected one of {', '.join(sorted(PROVIDERS))}") from None
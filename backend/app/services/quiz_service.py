@@ -1,82 +1,153 @@
+import asyncio
+import hashlib
 import logging
-import re
+import time
 from typing import List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import ObjectId
-from app.core.database import get_database
-from app.models.quiz import Quiz, QuizAttempt, QuizQuestion
-from app.services.ai_service import ai_service
-from app.services.content_service import content_service
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import get_async_database, get_database
+from app.models.content import QuizStatus
+from app.models.quiz import FollowupStatus, Quiz, QuizAttempt, QuizQuestion
+from app.services.ai_service import AIService, ai_service, async_ai_service
+from app.services.analytics_service import analytics_service, async_analytics_service
+from app.services.content_service import async_content_service, content_service
+from app.services.lease_service import async_lease_service, lease_service
+from app.utils.segment_index import build_segment_index, index_matches_segments, rank_segments, tokenize
 
 logger = logging.getLogger(__name__)
 
+TRANSCRIPT_FIELDS = ("transcript", "transcript_segments")
+# Review hints also rank segments with the index stored beside them
+REVIEW_FIELDS = TRANSCRIPT_FIELDS + ("transcript_index",)
+PRECOMPUTE_ORDER = [("priority_score", -1), ("published_at", -1)]
+# Learners are served the oldest pooled retry quiz they have not seen
+RETRY_POOL_ORDER = [("created_at", 1)]
+
+
+class QuizGenerationPending(RuntimeError):
+    """Raised when another holder is still generating after ``QUIZ_LEASE_WAIT_SECONDS``."""
+
+
 class QuizService:
-    def __init__(self):
-        self.db = get_database()
+    """Synchronous quiz access, kept for scripts and background jobs"""
+
+    @property
+    def db(self) -> Database:
+        return get_database()
     
     def get_or_create_quiz(self, content_id: str, version: int = 1) -> Optional[dict]:
-        """Get existing quiz or create a new one"""
+        """Get existing quiz or create a new one.
+
+        Creation is single-flight across processes: only the holder of the
+        quiz's lease generates it, everyone else waits for the stored result,
+        raising ``QuizGenerationPending`` if it is not there in time.
+        """
         try:
-            # Try to get existing quiz
-            quiz = self.db.quizzes.find_one({
-                "content_id": content_id,
-                "version": version
-            })
-            
+            quiz = self._find_quiz(content_id, version)
             if quiz:
-                quiz["id"] = str(quiz["_id"])
                 return quiz
-            
-            # Create new quiz
-            content_item = content_service.get_content_item(content_id)
-            if not content_item:
-                return None
-            
-            summary = content_item.get("summary", "")
-            transcript = content_item.get("transcript", "")
-            content_type = content_item.get("type", "article")
-            transcript_segments = content_item.get("transcript_segments", []) or []
-            
-            # Generate quiz questions
-            if content_type == "podcast" and transcript:
-                quiz_source_text = transcript
-            else:
-                quiz_source_text = content_item.get("description", "") or summary
 
-            questions_data = ai_service.generate_quiz(
-                quiz_source_text,
-                summary,
-                content_type,
-                transcript_segments=transcript_segments,
-            )
-            
-            # Convert to QuizQuestion format
-            questions = []
-            for q in questions_data:
-                questions.append({
-                    "question": q.get("question", ""),
-                    "options": q.get("options", []),
-                    "correct_answer": q.get("correct_answer", 0),
-                    "explanation": q.get("explanation", "")
-                })
-            
-            # Create quiz document
-            quiz_data = {
-                "content_id": content_id,
-                "questions": questions,
-                "version": version,
-                "created_at": datetime.utcnow()
-            }
-            
-            result = self.db.quizzes.insert_one(quiz_data)
-            quiz_data["id"] = str(result.inserted_id)
-            quiz_data["_id"] = str(result.inserted_id)
-            
-            return quiz_data
+            lease_name = self._lease_name(content_id, version)
+            token = lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+            deadline = time.monotonic() + settings.QUIZ_LEASE_WAIT_SECONDS
+            while token is None:
+                time.sleep(settings.QUIZ_LEASE_POLL_SECONDS)
+                quiz = self._find_quiz(content_id, version)
+                if quiz:
+                    return quiz
+                if time.monotonic() >= deadline:
+                    raise QuizGenerationPending(lease_name)
+                token = lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+
+            try:
+                # The previous holder may have stored it between our read and the lease
+                quiz = self._find_quiz(content_id, version)
+                if quiz:
+                    return quiz
+
+                content_item = content_service.get_content_item(content_id)
+                if not content_item:
+                    return None
+                if self._needs_transcript(content_item):
+                    content_item.update(content_service.load_content_body(content_id, TRANSCRIPT_FIELDS))
+
+                questions_data = ai_service.generate_quiz(*self._quiz_generation_args(content_item))
+                return self._store_quiz(self._build_quiz_document(content_id, questions_data, version))
+            finally:
+                lease_service.release(lease_name, token)
+        except QuizGenerationPending:
+            raise
         except Exception as e:
             logger.error(f"Error getting or creating quiz: {e}")
             return None
-    
+
+    def _find_quiz(self, content_id: str, version: int) -> Optional[dict]:
+        quiz = self.db.quizzes.find_one({"content_id": content_id, "version": version})
+        if quiz:
+            quiz["id"] = str(quiz["_id"])
+        return quiz
+
+    def _store_quiz(self, quiz_data: dict) -> dict:
+        """Insert unless the version already exists, returning whichever quiz is stored"""
+        try:
+            quiz = self.db.quizzes.find_one_and_update(
+                *self._quiz_upsert(quiz_data), upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            quiz = self.db.quizzes.find_one({"content_id": quiz_data["content_id"], "version": quiz_data["version"]})
+        quiz["id"] = str(quiz["_id"])
+        return quiz
+
+    def precompute_quizzes(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Generate version-1 quizzes for items still waiting on one, highest priority first.
+
+        Safe to stop and rerun: items are claimed atomically, an item whose quiz
+        already exists is simply marked ready, and failures are retried later
+        up to ``QUIZ_PRECOMPUTE_MAX_FAILURES`` times.
+        """
+        counts = {"ready": 0, "failed": 0}
+        while limit is None or counts["ready"] + counts["failed"] < limit:
+            item = self.claim_quiz_precompute()
+            if item is None:
+                break
+            counts["ready" if self.precompute_quiz(item) else "failed"] += 1
+        return counts
+
+    def claim_quiz_precompute(self) -> Optional[dict]:
+        """Atomically take the next item that needs its quiz generated"""
+        try:
+            now = datetime.utcnow()
+            for claim_filter in self._precompute_filters(now):
+                item = self.db.content_items.find_one_and_update(
+                    claim_filter,
+                    self._precompute_claim(now),
+                    sort=PRECOMPUTE_ORDER,
+                    projection={"_id": 1},
+                )
+                if item:
+                    return item
+            return None
+        except Exception as e:
+            logger.error(f"Error claiming quiz precompute: {e}")
+            return None
+
+    def precompute_quiz(self, item: dict) -> bool:
+        try:
+            quiz = self.get_or_create_quiz(str(item["_id"]))
+        except QuizGenerationPending:
+            # Someone else is generating it; the claim lapses and the item is picked up again
+            return False
+        try:
+            self.db.content_items.update_one({"_id": item["_id"]}, self._precompute_result(quiz))
+        except Exception as e:
+            logger.error(f"Error recording quiz precompute: {e}")
+        return quiz is not None
+
     def submit_quiz(
         self,
         user_id: str,
@@ -96,185 +167,479 @@ class QuizService:
             if len(answers) != len(questions):
                 return {"error": "Invalid number of answers"}
             
-            # Check answers
-            correct_count = 0
-            wrong_count = 0
-            wrong_indices = []
-            
-            for i, (question, answer) in enumerate(zip(questions, answers)):
-                if answer == question.get("correct_answer"):
-                    correct_count += 1
-                else:
-                    wrong_count += 1
-                    wrong_indices.append(i)
+            correct_count, wrong_count, _ = self._grade_answers(questions, answers)
+            passed, tech_score_change = self._score_attempt(wrong_count, attempt_number)
+            attempt_data = self._build_attempt_document(
+                user_id, content_id, quiz_id, answers, attempt_number,
+                correct_count, wrong_count, passed, tech_score_change,
+            )
             
-            # Get content item for review hints
-            content_item = content_service.get_content_item(content_id)
-            summary = content_item.get("summary", "") if content_item else ""
-            transcript = content_item.get("transcript", "") if content_item else ""
-            transcript_segments = content_item.get("transcript_segments", []) if content_item else []
-            content_type = content_item.get("type", "article") if content_item else "article"
+            if not passed:
+                attempt_data["followup_status"] = FollowupStatus.PENDING.value
+
+            # Save attempt
+            self.db.quiz_attempts.insert_one(attempt_data)
             
-            # Calculate tech score change
-            tech_score_change = 0
-            passed = wrong_count <= 2  # Pass if 3+ correct (2 or fewer wrong)
+            # Scripts have no background worker, so review hints and the retry quiz are generated inline
+            if not passed and self.complete_followup(attempt_data):
+                attempt_data = self.db.quiz_attempts.find_one({"_id": attempt_data["_id"]})
             
-            if passed:
-                if attempt_number == 1:
-                    tech_score_change = 10  # First try bonus
-                elif attempt_number == 2:
-                    tech_score_change = 6   # Second try
-                else:
-                    tech_score_change = 3   # Multiple retries
+            # Update user tech score (both positive and negative) and read back the totals
+            user_doc = self.db.users.find_one_and_update(
+                {"_id": ObjectId(user_id)},
+                self._user_attempt_update(attempt_data),
+                return_document=ReturnDocument.AFTER,
+            )
+            if user_doc:
+                analytics_service.record_quiz_attempt(
+                    user_doc.get("organization_id"), user_id, passed, tech_score_change, attempt_data["created_at"],
+                )
+            return self._build_submission_result(attempt_data, user_doc)
+        except Exception as e:
+            logger.error(f"Error submitting quiz: {e}")
+            return {"error": str(e)}
+
+    def complete_followup(self, attempt: dict) -> bool:
+        """Attach review hints and a retry quiz to a failed attempt, from the retry pool when possible"""
+        try:
+            quiz = self.db.quizzes.find_one({"_id": ObjectId(attempt["quiz_id"])})
+            if not quiz:
+                raise ValueError(f"Quiz {attempt['quiz_id']} not found")
+            _, _, wrong_indices = self._grade_answers(quiz.get("questions", []), attempt["answers"])
+            retry_key = self._retry_key(quiz.get("questions", []), wrong_indices)
+            pool_filter = self._retry_pool_filter(attempt["content_id"], retry_key, self._seen_quiz_ids(attempt))
+            retry_quiz = self.db.quizzes.find_one(pool_filter, sort=RETRY_POOL_ORDER)
+            if retry_quiz is None:
+                retry_quiz = self._create_retry_quiz(attempt["content_id"], quiz, wrong_indices, retry_key, pool_filter)
+            update = self._followup_result(retry_quiz.get("review_hints") or {}, str(retry_quiz["_id"]))
+        except Exception as e:
+            logger.error(f"Error generating quiz follow-up: {e}")
+            update = self._followup_failure()
+        self.db.quiz_attempts.update_one({"_id": attempt["_id"]}, update)
+        return "$inc" not in update
+
+    def _seen_quiz_ids(self, attempt: dict) -> List[str]:
+        """Quizzes the learner has already taken or been offered for this item"""
+        seen = set()
+        for previous in self.db.quiz_attempts.find(
+            {"user_id": attempt["user_id"], "content_id": attempt["content_id"]},
+            {"quiz_id": 1, "next_quiz_id": 1},
+        ):
+            seen.update(quiz_id for quiz_id in (previous.get("quiz_id"), previous.get("next_quiz_id")) if quiz_id)
+        return list(seen)
+
+    def _create_retry_quiz(
+        self,
+        content_id: str,
+        quiz: dict,
+        wrong_indices: List[int],
+        retry_key: str,
+        pool_filter: dict,
+    ) -> dict:
+        """Add a retry quiz to the pool for ``retry_key``, one generation at a time per key"""
+        lease_name = self._retry_lease_name(content_id, retry_key)
+        token = lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+        deadline = time.monotonic() + settings.QUIZ_LEASE_WAIT_SECONDS
+        while token is None:
+            time.sleep(settings.QUIZ_LEASE_POLL_SECONDS)
+            retry_quiz = self.db.quizzes.find_one(pool_filter, sort=RETRY_POOL_ORDER)
+            if retry_quiz:
+                return retry_quiz
+            if time.monotonic() >= deadline:
+                raise QuizGenerationPending(lease_name)
+            token = lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+
+        try:
+            # The previous holder may have added one this learner has not seen
+            retry_quiz = self.db.quizzes.find_one(pool_filter, sort=RETRY_POOL_ORDER)
+            if retry_quiz:
+                return retry_quiz
+
+            questions = quiz.get("questions", [])
+            content_item = content_service.get_content_item(content_id, body_fields=REVIEW_FIELDS)
+            context = self._content_context(content_item)
+            # Hints depend only on the missed questions, so an exhausted pool lends its own
+            pooled = self.db.quizzes.find_one(
+                {"content_id": content_id, "retry_key": retry_key, "review_hints": {"$ne": None}},
+                {"review_hints": 1},
+            )
+            if pooled:
+                review_hints = pooled["review_hints"]
             else:
-                tech_score_change = -2  # Penalty for failed attempt
-            
-            # Create quiz attempt record
-            attempt_data = {
-                "user_id": user_id,
-                "content_id": content_id,
-                "quiz_id": quiz_id,
-                "attempt_number": attempt_number,
-                "answers": answers,
-                "correct_count": correct_count,
-                "wrong_count": wrong_count,
-                "passed": passed,
-                "tech_score_change": tech_score_change,
-                "created_at": datetime.utcnow()
-            }
-            
-            # If failed, generate review hints and new quiz
-            if not passed:
                 candidate_segments = self._select_relevant_segments(
                     wrong_indices,
                     questions,
-                    transcript_segments,
+                    context["transcript_segments"],
+                    transcript_index=context["transcript_index"],
                 )
                 review_hints = ai_service.generate_review_hints(
-                    summary,
-                    transcript,
-                    content_type,
+                    context["summary"],
+                    context["transcript"],
+                    context["content_type"],
                     wrong_indices,
                     questions,
-                    transcript_segments=transcript_segments,
+                    transcript_segments=context["transcript_segments"],
                     candidate_segments=candidate_segments,
-                ) or {}
-                if not isinstance(review_hints, dict):
-                    review_hints = {"articleHighlights": [], "timestamps": [], "concepts": []}
-                if content_type == "podcast" and candidate_segments:
-                    timestamps = review_hints.get("timestamps") or []
-                    if not timestamps:
-                        fallback_ranges = []
-                        for segment in candidate_segments[:5]:
-                            start_ms = segment.get("start_ms", 0)
-                            end_ms = segment.get("end_ms", start_ms)
-                            fallback_ranges.append(self._format_ms_to_mmss(start_ms) + "-" + self._format_ms_to_mmss(end_ms))
-                        if fallback_ranges:
-                            review_hints["timestamps"] = fallback_ranges
-                if "concepts" not in review_hints or not review_hints["concepts"]:
-                    inferred_concepts = [
-                        questions[idx].get("question", "").strip()
-                        for idx in wrong_indices
-                        if 0 <= idx < len(questions)
-                    ]
-                    review_hints["concepts"] = [c for c in inferred_concepts if c]
-
-                attempt_data["review_hints"] = review_hints
-                
-                # Generate retry quiz
-                wrong_concepts = review_hints.get("concepts", [])
-                new_quiz_questions = ai_service.generate_retry_quiz(
-                    summary,
-                    transcript,
-                    content_type,
-                    wrong_concepts,
-                    questions,
-                    transcript_segments=transcript_segments,
                 )
-                
-                # Create new quiz version
-                new_version = quiz.get("version", 1) + 1
-                new_quiz_data = {
-                    "content_id": content_id,
-                    "questions": new_quiz_questions,
-                    "version": new_version,
-                    "created_at": datetime.utcnow()
-                }
-                new_quiz_result = self.db.quizzes.insert_one(new_quiz_data)
-                new_quiz_id = str(new_quiz_result.inserted_id)
-                
-                attempt_data["next_quiz_id"] = new_quiz_id
-            
-            # Save attempt
-            self.db.quiz_attempts.insert_one(attempt_data)
-            
-            # Update user tech score (both positive and negative)
-            self.db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {"$inc": {"tech_score": tech_score_change}}
+                review_hints = self._finalize_review_hints(
+                    review_hints, context["content_type"], candidate_segments, wrong_indices, questions,
+                )
+
+            new_quiz_questions = ai_service.generate_retry_quiz(
+                context["summary"],
+                context["transcript"],
+                context["content_type"],
+                review_hints.get("concepts", []),
+                questions,
+                transcript_segments=context["transcript_segments"],
             )
+            retry_quiz = self._retry_quiz_document(content_id, new_quiz_questions, quiz, retry_key, review_hints)
+            self.db.quizzes.insert_one(retry_quiz)
+            return retry_quiz
+        finally:
+            lease_service.release(lease_name, token)
+
+    @staticmethod
+    def _precompute_filters(now: datetime) -> List[Dict]:
+        """Claimable items, in the order they are served"""
+        retry_before = now - timedelta(seconds=settings.QUIZ_PRECOMPUTE_RETRY_SECONDS)
+        return [
+            {"quiz_status": QuizStatus.REQUESTED.value},
+            # None also matches items ingested before quizzes were precomputed
+            {"quiz_status": {"$in": [QuizStatus.PENDING.value, None]}},
+            {"$or": [
+                # Left behind by a worker that stopped mid-generation
+                {"quiz_status": QuizStatus.GENERATING.value, "quiz_claimed_at": {"$lt": retry_before}},
+                {
+                    "quiz_status": QuizStatus.FAILED.value,
+                    "quiz_failures": {"$lt": settings.QUIZ_PRECOMPUTE_MAX_FAILURES},
+                    "quiz_claimed_at": {"$lt": retry_before},
+                },
+            ]},
+        ]
+
+    @staticmethod
+    def _precompute_claim(now: datetime) -> dict:
+        return {"$set": {"quiz_status": QuizStatus.GENERATING.value, "quiz_claimed_at": now}}
+
+    @staticmethod
+    def _precompute_result(quiz: Optional[dict]) -> dict:
+        if quiz is None:
+            return {"$set": {"quiz_status": QuizStatus.FAILED.value}, "$inc": {"quiz_failures": 1}}
+        return {"$set": {"quiz_status": QuizStatus.READY.value, "quiz_id": quiz["id"]}}
+
+    @staticmethod
+    def _followup_filters(now: datetime) -> List[Dict]:
+        """Claimable failed attempts, in the order they are served"""
+        retry_before = now - timedelta(seconds=settings.QUIZ_FOLLOWUP_RETRY_SECONDS)
+        return [
+            {"followup_status": FollowupStatus.PENDING.value},
+            {"$or": [
+                # Left behind by a worker that stopped mid-generation
+                {"followup_status": FollowupStatus.GENERATING.value, "followup_claimed_at": {"$lt": retry_before}},
+                {
+                    "followup_status": FollowupStatus.FAILED.value,
+                    "followup_failures": {"$lt": settings.QUIZ_FOLLOWUP_MAX_FAILURES},
+                    "followup_claimed_at": {"$lt": retry_before},
+                },
+            ]},
+        ]
+
+    @staticmethod
+    def _followup_claim(now: datetime) -> dict:
+        return {"$set": {"followup_status": FollowupStatus.GENERATING.value, "followup_claimed_at": now}}
+
+    @staticmethod
+    def _followup_result(review_hints: Dict, next_quiz_id: str) -> dict:
+        return {"$set": {
+            "followup_status": FollowupStatus.READY.value,
+            "review_hints": review_hints,
+            "next_quiz_id": next_quiz_id,
+        }}
+
+    @staticmethod
+    def _followup_failure() -> dict:
+        return {"$set": {"followup_status": FollowupStatus.FAILED.value}, "$inc": {"followup_failures": 1}}
+
+    @staticmethod
+    def _followup_payload(attempt: dict) -> Dict:
+        """What clients see while waiting on a failed attempt's hints and retry quiz.
+
+        ``failed`` is retried by the worker until QUIZ_FOLLOWUP_MAX_FAILURES,
+        so only ``final`` tells clients to stop waiting.
+        """
+        status = attempt.get("followup_status")
+        return {
+            "job_id": str(attempt["_id"]),
+            "status": status,
+            "review_hints": attempt.get("review_hints"),
+            "next_quiz_id": attempt.get("next_quiz_id"),
+            "final": status in (None, FollowupStatus.READY.value) or (
+                status == FollowupStatus.FAILED.value
+                and attempt.get("followup_failures", 0) >= settings.QUIZ_FOLLOWUP_MAX_FAILURES
+            ),
+        }
 
-            user_doc = self.db.users.find_one({"_id": ObjectId(user_id)})
-            current_tech_score = user_doc.get("tech_score", 0) if user_doc else 0
-            current_streak = user_doc.get("current_streak", 0) if user_doc else 0
-            longest_streak = user_doc.get("longest_streak", 0) if user_doc else 0
+    @staticmethod
+    def _retry_quiz_document(
+        content_id: str,
+        questions: List[Dict],
+        quiz: dict,
+        retry_key: str,
+        review_hints: Dict,
+    ) -> dict:
+        # Pooled quizzes are served to every learner with the same misses, so never pool an empty one
+        questions = QuizService._require_questions(questions, "retry quiz")
+        return {
+            "content_id": content_id,
+            "questions": questions,
+            "version": quiz.get("version", 1) + 1,
+            # Shared with every learner who misses the same questions
+            "retry_key": retry_key,
+            "review_hints": review_hints,
+            "created_at": datetime.utcnow()
+        }
+
+    @staticmethod
+    def _require_questions(questions: List[Dict], label: str) -> List[Dict]:
+        """The usable questions, raising when generation produced none so the failure is retried"""
+        questions = AIService.valid_questions(questions)
+        if not questions:
+            raise ValueError(f"Generated {label} has no usable questions")
+        return questions
+
+    @staticmethod
+    def _retry_key(questions: List[Dict], wrong_indices: List[int]) -> str:
+        """Fingerprint of the missed question set, independent of answer order and formatting"""
+        missed = sorted(
+            " ".join(str(questions[index].get("question", "")).lower().split())
+            for index in wrong_indices
+            if 0 <= index < len(questions)
+        )
+        return hashlib.sha256("\n".join(missed).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _retry_pool_filter(content_id: str, retry_key: str, seen_quiz_ids: List[str]) -> dict:
+        """Pooled retry quizzes for ``retry_key`` that the learner has not been given yet"""
+        return {
+            "content_id": content_id,
+            "retry_key": retry_key,
+            "_id": {"$nin": [ObjectId(quiz_id) for quiz_id in seen_quiz_ids if ObjectId.is_valid(quiz_id)]},
+            # Skips empty quizzes pooled before generation results were checked
+            "questions.0": {"$exists": True},
+        }
+
+    @staticmethod
+    def _lease_name(content_id: str, version: int) -> str:
+        return f"quiz:{content_id}:{version}"
+
+    @staticmethod
+    def _retry_lease_name(content_id: str, retry_key: str) -> str:
+        return f"retry-quiz:{content_id}:{retry_key}"
+
+    @staticmethod
+    def _quiz_upsert(quiz_data: dict) -> tuple:
+        """find_one_and_update arguments that insert the quiz only if its version is not stored yet"""
+        key = {"content_id": quiz_data["content_id"], "version": quiz_data["version"]}
+        fields = {name: value for name, value in quiz_data.items() if name not in key}
+        return key, {"$setOnInsert": fields}
+
+    @staticmethod
+    def _needs_transcript(content_item: dict) -> bool:
+        # Only podcast quizzes are generated from the transcript itself
+        return content_item.get("type") == "podcast"
+
+    @staticmethod
+    def _quiz_generation_args(content_item: dict) -> tuple:
+        """Arguments for ``ai_service.generate_quiz`` derived from a content item"""
+        summary = content_item.get("summary", "")
+        transcript = content_item.get("transcript") or ""
+        content_type = content_item.get("type", "article")
+        transcript_segments = content_item.get("transcript_segments", []) or []
+
+        if content_type == "podcast" and transcript:
+            quiz_source_text = transcript
+        else:
+            quiz_source_text = content_item.get("description", "") or summary
+
+        return quiz_source_text, summary, content_type, transcript_segments
+
+    @staticmethod
+    def _build_quiz_document(content_id: str, questions_data: List[Dict], version: int) -> dict:
+        # Stored quizzes are never regenerated, so an empty one must fail and be retried instead
+        questions_data = QuizService._require_questions(questions_data, "quiz")
+        questions = []
+        for q in questions_data:
+            questions.append({
+                "question": q.get("question", ""),
+                "options": q.get("options", []),
+                "correct_answer": q.get("correct_answer", 0),
+                "explanation": q.get("explanation", "")
+            })
+        return {
+            "content_id": content_id,
+            "questions": questions,
+            "version": version,
+            "created_at": datetime.utcnow()
+        }
 
+    @staticmethod
+    def _content_context(content_item: Optional[dict]) -> Dict:
+        if not content_item:
             return {
-                "status": "passed" if passed else "retry",
-                "correct_count": correct_count,
-                "wrong_count": wrong_count,
-                "tech_score_change": tech_score_change,
-                "tech_score": current_tech_score,
-                "current_streak": current_streak,
-                "longest_streak": longest_streak,
-                "review_hints": attempt_data.get("review_hints"),
-                "next_quiz_id": attempt_data.get("next_quiz_id")
+                "summary": "",
+                "transcript": "",
+                "transcript_segments": [],
+                "transcript_index": None,
+                "content_type": "article",
             }
-        except Exception as e:
-            logger.error(f"Error submitting quiz: {e}")
-            return {"error": str(e)}
+        return {
+            "summary": content_item.get("summary", ""),
+            "transcript": content_item.get("transcript") or "",
+            "transcript_segments": content_item.get("transcript_segments", []) or [],
+            "transcript_index": content_item.get("transcript_index"),
+            "content_type": content_item.get("type", "article"),
+        }
 
+    @staticmethod
+    def _grade_answers(questions: List[Dict], answers: List[int]) -> tuple:
+        correct_count = 0
+        wrong_count = 0
+        wrong_indices = []
+        for i, (question, answer) in enumerate(zip(questions, answers)):
+            if answer == question.get("correct_answer"):
+                correct_count += 1
+            else:
+                wrong_count += 1
+                wrong_indices.append(i)
+        return correct_count, wrong_count, wrong_indices
+
+    @staticmethod
+    def _score_attempt(wrong_count: int, attempt_number: int) -> tuple:
+        passed = wrong_count <= 2  # Pass if 3+ correct (2 or fewer wrong)
+        if not passed:
+            return passed, -2  # Penalty for failed attempt
+        if attempt_number == 1:
+            return passed, 10  # First try bonus
+        if attempt_number == 2:
+            return passed, 6   # Second try
+        return passed, 3       # Multiple retries
+
+    @staticmethod
+    def _build_attempt_document(
+        user_id: str,
+        content_id: str,
+        quiz_id: str,
+        answers: List[int],
+        attempt_number: int,
+        correct_count: int,
+        wrong_count: int,
+        passed: bool,
+        tech_score_change: int,
+    ) -> dict:
+        return {
+            "user_id": user_id,
+            "content_id": content_id,
+            "quiz_id": quiz_id,
+            "attempt_number": attempt_number,
+            "answers": answers,
+            "correct_count": correct_count,
+            "wrong_count": wrong_count,
+            "passed": passed,
+            "tech_score_change": tech_score_change,
+            "created_at": datetime.utcnow()
+        }
+
+    @staticmethod
+    def _user_attempt_update(attempt_data: dict) -> dict:
+        """Apply the score change and stamp the attempt time used by participation analytics"""
+        return {
+            "$inc": {"tech_score": attempt_data["tech_score_change"]},
+            "$set": {"last_quiz_attempt_at": attempt_data["created_at"]},
+        }
+
+    @classmethod
+    def _finalize_review_hints(
+        cls,
+        review_hints: Optional[Dict],
+        content_type: str,
+        candidate_segments: List[Dict],
+        wrong_indices: List[int],
+        questions: List[Dict],
+    ) -> Dict:
+        """Fill in timestamps and concepts the model left out"""
+        review_hints = review_hints or {}
+        if not isinstance(review_hints, dict):
+            review_hints = {"articleHighlights": [], "timestamps": [], "concepts": []}
+        if content_type == "podcast" and candidate_segments:
+            timestamps = review_hints.get("timestamps") or []
+            if not timestamps:
+                fallback_ranges = []
+                for segment in candidate_segments[:5]:
+                    start_ms = segment.get("start_ms", 0)
+                    end_ms = segment.get("end_ms", start_ms)
+                    fallback_ranges.append(cls._format_ms_to_mmss(start_ms) + "-" + cls._format_ms_to_mmss(end_ms))
+                if fallback_ranges:
+                    review_hints["timestamps"] = fallback_ranges
+        if "concepts" not in review_hints or not review_hints["concepts"]:
+            inferred_concepts = [
+                questions[idx].get("question", "").strip()
+                for idx in wrong_indices
+                if 0 <= idx < len(questions)
+            ]
+            review_hints["concepts"] = [c for c in inferred_concepts if c]
+        return review_hints
+
+    @staticmethod
+    def _build_submission_result(attempt_data: dict, user_doc: Optional[dict]) -> Dict:
+        passed = attempt_data["passed"]
+        return {
+            "status": "passed" if passed else "retry",
+            "correct_count": attempt_data["correct_count"],
+            "wrong_count": attempt_data["wrong_count"],
+            "tech_score_change": attempt_data["tech_score_change"],
+            "tech_score": user_doc.get("tech_score", 0) if user_doc else 0,
+            "current_streak": user_doc.get("current_streak", 0) if user_doc else 0,
+            "longest_streak": user_doc.get("longest_streak", 0) if user_doc else 0,
+            "review_hints": attempt_data.get("review_hints"),
+            "next_quiz_id": attempt_data.get("next_quiz_id"),
+            # Failed attempts: poll /api/quiz/attempts/{job_id} for the hints and retry quiz
+            "job_id": str(attempt_data["_id"]) if attempt_data.get("followup_status") else None,
+            "followup_status": attempt_data.get("followup_status"),
+        }
+
+    @staticmethod
     def _select_relevant_segments(
-        self,
         wrong_indices: List[int],
         questions: List[Dict],
         transcript_segments: Optional[List[Dict]],
         max_segments: int = 20,
+        transcript_index: Optional[Dict] = None,
     ) -> List[Dict]:
+        """Segments ranked by BM25 against the missed questions, using the index stored at ingest"""
         if not transcript_segments:
             return []
+        if not index_matches_segments(transcript_index, transcript_segments):
+            # Items ingested before the index existed; build_transcript_indexes.py stores theirs
+            transcript_index = build_segment_index(transcript_segments)
 
-        keyword_sets: List[set] = []
+        # Each missed question adds its distinct terms once, so terms shared by several weigh more
+        query_tokens: List[str] = []
         for idx in wrong_indices:
             if 0 <= idx < len(questions):
                 q = questions[idx]
-                text = f"{q.get('question', '')} {q.get('explanation', '')}"
-                tokens = {token for token in re.findall(r"[A-Za-z]{4,}", text.lower())}
-                if tokens:
-                    keyword_sets.append(tokens)
-
-        scored_segments: List[tuple[int, Dict]] = []
-        for segment in transcript_segments:
-            segment_text = segment.get("text", "")
-            if not segment_text:
-                continue
-            lower_segment = segment_text.lower()
-            score = 0
-            for keywords in keyword_sets:
-                score += sum(1 for kw in keywords if kw in lower_segment)
-            if score > 0:
-                scored_segments.append((score, segment))
-
-        if not scored_segments:
-            return transcript_segments[:max_segments]
+                query_tokens.extend(set(tokenize(f"{q.get('question', '')} {q.get('explanation', '')}")))
 
-        scored_segments.sort(key=lambda pair: pair[0], reverse=True)
+        ranked = rank_segments(transcript_index, query_tokens)
+        if not ranked:
+            return transcript_segments[:max_segments]
 
         selected: List[Dict] = []
         seen_ranges = set()
-        for score, segment in scored_segments:
+        for position, _ in ranked:
             if len(selected) >= max_segments:
                 break
+            segment = transcript_segments[position]
             start_ms = segment.get("start_ms", 0)
             end_ms = segment.get("end_ms", start_ms)
             bucket = (start_ms // 10000, end_ms // 10000)
@@ -292,7 +657,334 @@ class QuizService:
         remaining_seconds = seconds % 60
         return f"{minutes:02}:{remaining_seconds:02}"
 
-# Singleton instance
+
+class AsyncQuizService:
+    """Non-blocking quiz access for the FastAPI request path.
+
+    Requests never wait on the model: quizzes are generated ahead of time by
+    ``quiz_precompute_worker``, and the hints and retry quiz for a failed
+    attempt by ``quiz_followup_worker``.
+    """
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    def __init__(self) -> None:
+        # Creations in flight in this process, so concurrent callers share one
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def get_or_create_quiz(self, content_id: str, version: int = 1) -> Optional[dict]:
+        """Get existing quiz or create a new one.
+
+        Concurrent calls for the same quiz share a single creation in this
+        process, and a lease makes it single-flight across processes too.
+        Raises ``QuizGenerationPending`` if another process is still at it.
+        """
+        try:
+            quiz = await self.get_quiz(content_id, version)
+            if quiz:
+                return quiz
+
+            key = (content_id, version)
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return await asyncio.shield(inflight)
+
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                quiz = await self._create_quiz(content_id, version)
+                future.set_result(quiz)
+                return quiz
+            except QuizGenerationPending as e:
+                future.set_exception(e)
+                # Mark it retrieved so an unshared future does not log it at collection
+                future.exception()
+                raise
+            finally:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_result(None)
+        except (asyncio.CancelledError, QuizGenerationPending):
+            raise
+        except Exception as e:
+            logger.error(f"Error getting or creating quiz: {e}")
+            return None
+
+    async def _create_quiz(self, content_id: str, version: int) -> Optional[dict]:
+        lease_name = QuizService._lease_name(content_id, version)
+        token = await async_lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+        deadline = time.monotonic() + settings.QUIZ_LEASE_WAIT_SECONDS
+        while token is None:
+            await asyncio.sleep(settings.QUIZ_LEASE_POLL_SECONDS)
+            quiz = await self.get_quiz(content_id, version)
+            if quiz:
+                return quiz
+            if time.monotonic() >= deadline:
+                raise QuizGenerationPending(lease_name)
+            token = await async_lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+
+        try:
+            # The previous holder may have stored it between our read and the lease
+            quiz = await self.get_quiz(content_id, version)
+            if quiz:
+                return quiz
+
+            content_item = await async_content_service.get_content_item(content_id)
+            if not content_item:
+                return None
+            if QuizService._needs_transcript(content_item):
+                content_item.update(await async_content_service.load_content_body(content_id, TRANSCRIPT_FIELDS))
+
+            questions_data = await async_ai_service.generate_quiz(*QuizService._quiz_generation_args(content_item))
+            return await self._store_quiz(QuizService._build_quiz_document(content_id, questions_data, version))
+        finally:
+            await async_lease_service.release(lease_name, token)
+
+    async def _store_quiz(self, quiz_data: dict) -> dict:
+        """Insert unless the version already exists, returning whichever quiz is stored"""
+        try:
+            quiz = await self.db.quizzes.find_one_and_update(
+                *QuizService._quiz_upsert(quiz_data), upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            quiz = await self.db.quizzes.find_one({"content_id": quiz_data["content_id"], "version": quiz_data["version"]})
+        quiz["id"] = str(quiz["_id"])
+        return quiz
+
+    async def get_quiz(self, content_id: str, version: int = 1) -> Optional[dict]:
+        """Read a stored quiz without ever generating one"""
+        quiz = await self.db.quizzes.find_one({"content_id": content_id, "version": version})
+        if quiz:
+            quiz["id"] = str(quiz["_id"])
+        return quiz
+
+    async def request_quiz(self, content_id: str) -> Optional[str]:
+        """Move an item without a quiz to the front of the precompute queue.
+
+        Returns the item's quiz status before the request, or None if it does
+        not exist.
+        """
+        if not ObjectId.is_valid(content_id):
+            return None
+        item = await self.db.content_items.find_one({"_id": ObjectId(content_id)}, {"quiz_status": 1})
+        if not item:
+            return None
+        status = item.get("quiz_status") or QuizStatus.PENDING.value
+        if status != QuizStatus.GENERATING.value:
+            await self.db.content_items.update_one(
+                {"_id": item["_id"], "quiz_status": {"$ne": QuizStatus.GENERATING.value}},
+                {"$set": {"quiz_status": QuizStatus.REQUESTED.value}},
+            )
+        return status
+
+    async def claim_quiz_precompute(self) -> Optional[dict]:
+        """Atomically take the next item that needs its quiz generated"""
+        try:
+            now = datetime.utcnow()
+            for claim_filter in QuizService._precompute_filters(now):
+                item = await self.db.content_items.find_one_and_update(
+                    claim_filter,
+                    QuizService._precompute_claim(now),
+                    sort=PRECOMPUTE_ORDER,
+                    projection={"_id": 1},
+                )
+                if item:
+                    return item
+            return None
+        except Exception as e:
+            logger.error(f"Error claiming quiz precompute: {e}")
+            return None
+
+    async def precompute_quiz(self, item: dict) -> bool:
+        try:
+            quiz = await self.get_or_create_quiz(str(item["_id"]))
+        except QuizGenerationPending:
+            # Someone else is generating it; the claim lapses and the item is picked up again
+            return False
+        try:
+            await self.db.content_items.update_one({"_id": item["_id"]}, QuizService._precompute_result(quiz))
+        except Exception as e:
+            logger.error(f"Error recording quiz precompute: {e}")
+        return quiz is not None
+
+    async def get_followup(self, attempt_id: str, user_id: str) -> Optional[Dict]:
+        """Follow-up state of one of the user's attempts, or None if there is no such attempt"""
+        if not ObjectId.is_valid(attempt_id):
+            return None
+        attempt = await self.db.quiz_attempts.find_one(
+            {"_id": ObjectId(attempt_id), "user_id": user_id},
+            {"followup_status": 1, "followup_failures": 1, "review_hints": 1, "next_quiz_id": 1},
+        )
+        return QuizService._followup_payload(attempt) if attempt else None
+
+    async def claim_followup(self) -> Optional[dict]:
+        """Atomically take the next failed attempt waiting on hints and a retry quiz"""
+        try:
+            now = datetime.utcnow()
+            for claim_filter in QuizService._followup_filters(now):
+                attempt = await self.db.quiz_attempts.find_one_and_update(
+                    claim_filter,
+                    QuizService._followup_claim(now),
+                    sort=[("created_at", 1)],
+                )
+                if attempt:
+                    return attempt
+            return None
+        except Exception as e:
+            logger.error(f"Error claiming quiz follow-up: {e}")
+            return None
+
+    async def complete_followup(self, attempt: dict) -> bool:
+        """Attach review hints and a retry quiz to a failed attempt, from the retry pool when possible"""
+        try:
+            quiz = await self.db.quizzes.find_one({"_id": ObjectId(attempt["quiz_id"])})
+            if not quiz:
+                raise ValueError(f"Quiz {attempt['quiz_id']} not found")
+            _, _, wrong_indices = QuizService._grade_answers(quiz.get("questions", []), attempt["answers"])
+            retry_key = QuizService._retry_key(quiz.get("questions", []), wrong_indices)
+            pool_filter = QuizService._retry_pool_filter(
+                attempt["content_id"], retry_key, await self._seen_quiz_ids(attempt),
+            )
+            retry_quiz = await self.db.quizzes.find_one(pool_filter, sort=RETRY_POOL_ORDER)
+            if retry_quiz is None:
+                retry_quiz = await self._create_retry_quiz(attempt["content_id"], quiz, wrong_indices, retry_key, pool_filter)
+            update = QuizService._followup_result(retry_quiz.get("review_hints") or {}, str(retry_quiz["_id"]))
+        except Exception as e:
+            logger.error(f"Error generating quiz follow-up: {e}")
+            update = QuizService._followup_failure()
+        await self.db.quiz_attempts.update_one({"_id": attempt["_id"]}, update)
+        return "$inc" not in update
+
+    async def _seen_quiz_ids(self, attempt: dict) -> List[str]:
+        """Quizzes the learner has already taken or been offered for this item"""
+        seen = set()
+        async for previous in self.db.quiz_attempts.find(
+            {"user_id": attempt["user_id"], "content_id": attempt["content_id"]},
+            {"quiz_id": 1, "next_quiz_id": 1},
+        ):
+            seen.update(quiz_id for quiz_id in (previous.get("quiz_id"), previous.get("next_quiz_id")) if quiz_id)
+        return list(seen)
+
+    async def _create_retry_quiz(
+        self,
+        content_id: str,
+        quiz: dict,
+        wrong_indices: List[int],
+        retry_key: str,
+        pool_filter: dict,
+    ) -> dict:
+        """Add a retry quiz to the pool for ``retry_key``, one generation at a time per key"""
+        lease_name = QuizService._retry_lease_name(content_id, retry_key)
+        token = await async_lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+        deadline = time.monotonic() + settings.QUIZ_LEASE_WAIT_SECONDS
+        while token is None:
+            await asyncio.sleep(settings.QUIZ_LEASE_POLL_SECONDS)
+            retry_quiz = await self.db.quizzes.find_one(pool_filter, sort=RETRY_POOL_ORDER)
+            if retry_quiz:
+                return retry_quiz
+            if time.monotonic() >= deadline:
+                raise QuizGenerationPending(lease_name)
+            token = await async_lease_service.acquire(lease_name, settings.QUIZ_LEASE_SECONDS)
+
+        try:
+            # The previous holder may have added one this learner has not seen
+            retry_quiz = await self.db.quizzes.find_one(pool_filter, sort=RETRY_POOL_ORDER)
+            if retry_quiz:
+                return retry_quiz
+
+            questions = quiz.get("questions", [])
+            content_item = await async_content_service.get_content_item(content_id, body_fields=REVIEW_FIELDS)
+            context = QuizService._content_context(content_item)
+            # Hints depend only on the missed questions, so an exhausted pool lends its own
+            pooled = await self.db.quizzes.find_one(
+                {"content_id": content_id, "retry_key": retry_key, "review_hints": {"$ne": None}},
+                {"review_hints": 1},
+            )
+            if pooled:
+                review_hints = pooled["review_hints"]
+            else:
+                candidate_segments = QuizService._select_relevant_segments(
+                    wrong_indices,
+                    questions,
+                    context["transcript_segments"],
+                    transcript_index=context["transcript_index"],
+                )
+                review_hints = await async_ai_service.generate_review_hints(
+                    context["summary"],
+                    context["transcript"],
+                    context["content_type"],
+                    wrong_indices,
+                    questions,
+                    transcript_segments=context["transcript_segments"],
+                    candidate_segments=candidate_segments,
+                )
+                review_hints = QuizService._finalize_review_hints(
+                    review_hints, context["content_type"], candidate_segments, wrong_indices, questions,
+                )
+
+            new_quiz_questions = await async_ai_service.generate_retry_quiz(
+                context["summary"],
+                context["transcript"],
+                context["content_type"],
+                review_hints.get("concepts", []),
+                questions,
+                transcript_segments=context["transcript_segments"],
+            )
+            retry_quiz = QuizService._retry_quiz_document(content_id, new_quiz_questions, quiz, retry_key, review_hints)
+            await self.db.quizzes.insert_one(retry_quiz)
+            return retry_quiz
+        finally:
+            await async_lease_service.release(lease_name, token)
+
+    async def submit_quiz(
+        self,
+        user_id: str,
+        content_id: str,
+        quiz_id: str,
+        answers: List[int],
+        attempt_number: int = 1
+    ) -> Dict:
+        """Submit quiz answers and return results"""
+        try:
+            quiz = await self.db.quizzes.find_one({"_id": ObjectId(quiz_id)})
+            if not quiz:
+                return {"error": "Quiz not found"}
+
+            questions = quiz.get("questions", [])
+            if len(answers) != len(questions):
+                return {"error": "Invalid number of answers"}
+
+            correct_count, wrong_count, _ = QuizService._grade_answers(questions, answers)
+            passed, tech_score_change = QuizService._score_attempt(wrong_count, attempt_number)
+            attempt_data = QuizService._build_attempt_document(
+                user_id, content_id, quiz_id, answers, attempt_number,
+                correct_count, wrong_count, passed, tech_score_change,
+            )
+
+            if not passed:
+                # Review hints and the retry quiz are left to quiz_followup_worker
+                attempt_data["followup_status"] = FollowupStatus.PENDING.value
+
+            await self.db.quiz_attempts.insert_one(attempt_data)
+
+            user_doc = await self.db.users.find_one_and_update(
+                {"_id": ObjectId(user_id)},
+                QuizService._user_attempt_update(attempt_data),
+                return_document=ReturnDocument.AFTER,
+            )
+            if user_doc:
+                await async_analytics_service.record_quiz_attempt(
+                    user_doc.get("organization_id"), user_id, passed, tech_score_change, attempt_data["created_at"],
+                )
+            return QuizService._build_submission_result(attempt_data, user_doc)
+        except Exception as e:
+            logger.error(f"Error submitting quiz: {e}")
+            return {"error": str(e)}
+
+# Singleton instances
 quiz_service = QuizService()
+async_quiz_service = AsyncQuizService()
 
 
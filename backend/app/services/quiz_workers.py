@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.quiz_service import async_quiz_service
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimWorker:
+    """Background tasks that drain a queue kept in MongoDB.
+
+    ``concurrency`` tasks repeatedly ``claim`` the next document and hand it
+    to ``process``, which returns whether it succeeded, then sleep for
+    ``poll_interval`` seconds once nothing is left. ``notify`` wakes them
+    early when new work is queued. Claims are atomic in the database, so
+    several API instances and the ingestion function can share a queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        claim: Callable[[], Awaitable[Optional[dict]]],
+        process: Callable[[dict], Awaitable[bool]],
+        concurrency: int,
+        poll_interval: float,
+    ) -> None:
+        self.name = name
+        self._claim = claim
+        self._process = process
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self._concurrency)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; an interrupted claim is picked up again once it goes stale"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": self._concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before claiming so a notify during the claim is not lost
+            self._wakeup.clear()
+            try:
+                item = await self._claim()
+                if item is not None:
+                    if await self._process(item):
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in {self.name} worker: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Generates version-1 quizzes ahead of the first request, highest priority first
+quiz_precompute_worker = ClaimWorker(
+    "quiz precompute",
+    async_quiz_service.claim_quiz_precompute,
+    async_quiz_service.precompute_quiz,
+    concurrency=settings.QUIZ_PRECOMPUTE_CONCURRENCY,
+    poll_interval=settings.QUIZ_PRECOMPUTE_POLL_SECONDS,
+)
+
+# Generates review hints and the retry quiz for failed attempts, oldest first
+quiz_followup_worker = ClaimWorker(
+    "quiz follow-up",
+    async_quiz_service.claim_followup,
+    async_quiz_service.complete_followup,
+    concurrency=settings.QUIZ_FOLLOWUP_CONCURRENCY,
+    poll_interval=settings.QUIZ_FOLLOWUP_POLL_SECONDS,
+)
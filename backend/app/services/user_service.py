@@ -3,16 +3,33 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 
 from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.database import Database
 
-from app.core.database import get_database
+from app.core.database import get_async_database, get_database
 from app.core.config import settings
+from app.services.analytics_service import analytics_service, async_analytics_service
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Resolved user records keyed by Azure AD object id, so authenticated requests
+# skip the users lookup while the token's profile claims stay the same.
+_identity_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    max_entries=settings.USER_IDENTITY_CACHE_SIZE,
+    default_ttl=settings.USER_IDENTITY_CACHE_TTL_SECONDS,
+)
+
+# Profile fields whose change alters what a user can see or do
+_IDENTITY_SCOPE_FIELDS = ("role", "organization_id")
+
 
 class UserService:
-    def __init__(self):
-        self.db = get_database()
+    """Synchronous user access, kept for scripts and background jobs"""
+
+    @property
+    def db(self) -> Database:
+        return get_database()
     
     def get_user(self, user_id: str) -> Optional[dict]:
         """Get user by ID"""
@@ -25,98 +42,48 @@ class UserService:
     
     def get_or_create_user_from_claims(self, claims: Dict[str, Any]) -> dict:
         """Ensure a local user exists for the authenticated Azure AD identity."""
-        external_id = claims.get("oid") or claims.get("sub")
-        if not external_id:
-            raise ValueError("Token did not include an object identifier (oid/sub)")
-
-        email = claims.get("preferred_username") or claims.get("email")
-        display_name = claims.get("name") or email or "PulseLoop User"
-        organization_id = claims.get("tid") or claims.get("tenant_id")
-        role = self._resolve_role(claims)
-        job_role = claims.get("jobTitle") or claims.get("job_role") or claims.get("jobRole")
+        profile = self._profile_from_claims(claims)
+        cached = self._cached_identity(profile)
+        if cached:
+            return cached
 
-        user = self.db.users.find_one({"external_id": external_id})
+        user = self.db.users.find_one({"external_id": profile["external_id"]})
         now = datetime.utcnow()
 
         if user:
-            updates: Dict[str, Any] = {}
-            if email and email != user.get("email"):
-                updates["email"] = email
-            if display_name and display_name != user.get("display_name"):
-                updates["display_name"] = display_name
-            if organization_id and organization_id != user.get("organization_id"):
-                updates["organization_id"] = organization_id
-            if role and role != user.get("role"):
-                updates["role"] = role
-            if job_role and job_role != user.get("job_role"):
-                updates["job_role"] = job_role
-
+            updates = self._profile_updates(user, profile)
             if updates:
                 updates["updated_at"] = now
                 self.db.users.update_one({"_id": user["_id"]}, {"$set": updates})
+                if "organization_id" in updates:
+                    self._move_membership(user, updates["organization_id"])
                 user.update(updates)
-            return self._format_user(user)
-
-        user_doc: Dict[str, Any] = {
-            "external_id": external_id,
-            "email": email,
-            "display_name": display_name,
-            "organization_id": organization_id,
-            "role": role or settings.AZURE_AD_DEFAULT_ROLE,
-            "job_role": job_role,
-            "tech_score": 0,
-            "current_streak": 0,
-            "longest_streak": 0,
-            "created_at": now,
-            "updated_at": now,
-        }
+                if self._invalidate_on_scope_change(profile["external_id"], updates):
+                    return self._format_user(user)
+            return self._remember_identity(profile, self._format_user(user))
 
+        user_doc = self._build_user_document(profile, now)
         result = self.db.users.insert_one(user_doc)
         user_doc["_id"] = result.inserted_id
-        return self._format_user(user_doc)
+        analytics_service.record_user_membership(user_doc["organization_id"])
+        return self._remember_identity(profile, self._format_user(user_doc))
     
+    def _move_membership(self, user: Dict[str, Any], organization_id: Optional[str]) -> None:
+        """Carry the user's count and score from the old org rollup to the new one"""
+        tech_score = user.get("tech_score", 0)
+        analytics_service.record_user_membership(user.get("organization_id"), tech_score, joined=False)
+        analytics_service.record_user_membership(organization_id, tech_score)
+
     def update_streak(self, user_id: str):
         """Update user streak based on today's activity"""
         try:
             user = self.db.users.find_one({"_id": ObjectId(user_id)})
             if not user:
                 return
-            
-            today = datetime.utcnow().date()
-            last_activity = user.get("last_activity_date")
-            
-            if last_activity:
-                last_activity_date = last_activity.date() if isinstance(last_activity, datetime) else last_activity
-                days_diff = (today - last_activity_date).days
-                
-                if days_diff == 0:
-                    # Already updated today
-                    return
-                elif days_diff == 1:
-                    # Consecutive day - increment streak
-                    new_streak = user.get("current_streak", 0) + 1
-                    longest_streak = max(user.get("longest_streak", 0), new_streak)
-                else:
-                    # Streak broken - reset to 1
-                    new_streak = 1
-                    longest_streak = user.get("longest_streak", 0)
-            else:
-                # First activity
-                new_streak = 1
-                longest_streak = 1
-            
-            # Update user
-            self.db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {
-                    "$set": {
-                        "current_streak": new_streak,
-                        "longest_streak": longest_streak,
-                        "last_activity_date": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
+
+            streak_update = self._streak_update(user)
+            if streak_update:
+                self.db.users.update_one({"_id": ObjectId(user_id)}, {"$set": streak_update})
         except Exception as e:
             logger.error(f"Error updating streak: {e}")
     
@@ -156,6 +123,105 @@ class UserService:
             logger.error(f"Error getting user dashboard: {e}")
             return {}
 
+    @classmethod
+    def _profile_from_claims(cls, claims: Dict[str, Any]) -> Dict[str, Any]:
+        external_id = claims.get("oid") or claims.get("sub")
+        if not external_id:
+            raise ValueError("Token did not include an object identifier (oid/sub)")
+
+        email = claims.get("preferred_username") or claims.get("email")
+        return {
+            "external_id": external_id,
+            "email": email,
+            "display_name": claims.get("name") or email or "PulseLoop User",
+            "organization_id": claims.get("tid") or claims.get("tenant_id"),
+            "role": cls._resolve_role(claims),
+            "job_role": claims.get("jobTitle") or claims.get("job_role") or claims.get("jobRole"),
+        }
+
+    @staticmethod
+    def _cached_identity(profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        entry = _identity_cache.get(profile["external_id"])
+        if entry is None or entry["profile"] != profile:
+            # Unknown identity or the claims changed: resolve against Mongo
+            return None
+        return dict(entry["user"])
+
+    @staticmethod
+    def _remember_identity(profile: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
+        _identity_cache.set(profile["external_id"], {"profile": profile, "user": dict(user)})
+        return user
+
+    @staticmethod
+    def _invalidate_on_scope_change(external_id: str, updates: Dict[str, Any]) -> bool:
+        """Drop the cached record once a role or org change is written; True if the caller must not re-cache it.
+
+        The next request resolves the user from Mongo again, so no request
+        keeps serving the scope from before the change.
+        """
+        if not any(field in updates for field in _IDENTITY_SCOPE_FIELDS):
+            return False
+        _identity_cache.pop(external_id)
+        return True
+
+    @staticmethod
+    def _profile_updates(user: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+        updates: Dict[str, Any] = {}
+        for field in ("email", "display_name", "organization_id", "role", "job_role"):
+            value = profile.get(field)
+            if value and value != user.get(field):
+                updates[field] = value
+        return updates
+
+    @staticmethod
+    def _build_user_document(profile: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        return {
+            "external_id": profile["external_id"],
+            "email": profile["email"],
+            "display_name": profile["display_name"],
+            "organization_id": profile["organization_id"],
+            "role": profile["role"] or settings.AZURE_AD_DEFAULT_ROLE,
+            "job_role": profile["job_role"],
+            "tech_score": 0,
+            "current_streak": 0,
+            "longest_streak": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    @staticmethod
+    def _streak_update(user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the ``$set`` payload for today's activity, or None if already counted"""
+        today = datetime.utcnow().date()
+        last_activity = user.get("last_activity_date")
+
+        if last_activity:
+            last_activity_date = last_activity.date() if isinstance(last_activity, datetime) else last_activity
+            days_diff = (today - last_activity_date).days
+
+            if days_diff == 0:
+                # Already updated today
+                return None
+            elif days_diff == 1:
+                # Consecutive day - increment streak
+                new_streak = user.get("current_streak", 0) + 1
+                longest_streak = max(user.get("longest_streak", 0), new_streak)
+            else:
+                # Streak broken - reset to 1
+                new_streak = 1
+                longest_streak = user.get("longest_streak", 0)
+        else:
+            # First activity
+            new_streak = 1
+            longest_streak = 1
+
+        return {
+            "current_streak": new_streak,
+            "longest_streak": longest_streak,
+            "last_activity_date": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+
     @staticmethod
     def _format_user(user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         if not user:
@@ -180,7 +246,105 @@ class UserService:
                     return "admin"
         return settings.AZURE_AD_DEFAULT_ROLE
 
-# Singleton instance
+
+class AsyncUserService:
+    """Non-blocking user access for the FastAPI request path"""
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return get_async_database()
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        """Get user by ID"""
+        try:
+            user = await self.db.users.find_one({"_id": ObjectId(user_id)})
+            return UserService._format_user(user)
+        except Exception as e:
+            logger.error("Error getting user: {0}".format(e))
+            return None
+
+    async def get_or_create_user_from_claims(self, claims: Dict[str, Any]) -> dict:
+        """Ensure a local user exists for the authenticated Azure AD identity."""
+        profile = UserService._profile_from_claims(claims)
+        cached = UserService._cached_identity(profile)
+        if cached:
+            return cached
+
+        user = await self.db.users.find_one({"external_id": profile["external_id"]})
+        now = datetime.utcnow()
+
+        if user:
+            updates = UserService._profile_updates(user, profile)
+            if updates:
+                updates["updated_at"] = now
+                await self.db.users.update_one({"_id": user["_id"]}, {"$set": updates})
+                if "organization_id" in updates:
+                    await self._move_membership(user, updates["organization_id"])
+                user.update(updates)
+                if UserService._invalidate_on_scope_change(profile["external_id"], updates):
+                    return UserService._format_user(user)
+            return UserService._remember_identity(profile, UserService._format_user(user))
+
+        user_doc = UserService._build_user_document(profile, now)
+        result = await self.db.users.insert_one(user_doc)
+        user_doc["_id"] = result.inserted_id
+        await async_analytics_service.record_user_membership(user_doc["organization_id"])
+        return UserService._remember_identity(profile, UserService._format_user(user_doc))
+
+    async def _move_membership(self, user: Dict[str, Any], organization_id: Optional[str]) -> None:
+        """Carry the user's count and score from the old org rollup to the new one"""
+        tech_score = user.get("tech_score", 0)
+        await async_analytics_service.record_user_membership(user.get("organization_id"), tech_score, joined=False)
+        await async_analytics_service.record_user_membership(organization_id, tech_score)
+
+    async def update_streak(self, user_id: str):
+        """Update user streak based on today's activity"""
+        try:
+            user = await self.db.users.find_one({"_id": ObjectId(user_id)})
+            if not user:
+                return
+
+            streak_update = UserService._streak_update(user)
+            if streak_update:
+                await self.db.users.update_one({"_id": ObjectId(user_id)}, {"$set": streak_update})
+        except Exception as e:
+            logger.error(f"Error updating streak: {e}")
+
+    async def get_user_dashboard(self, user_id: str) -> Dict:
+        """Get user dashboard data"""
+        try:
+            user = await self.get_user(user_id)
+            if not user:
+                return {}
+
+            recent_completions = await self.db.quiz_attempts.find({
+                "user_id": user_id,
+                "passed": True
+            }).sort("created_at", -1).limit(10).to_list(length=10)
+
+            for completion in recent_completions:
+                completion["id"] = str(completion["_id"])
+                completion["_id"] = str(completion["_id"])
+
+            # Note: Would need to join with content_items for type, so every
+            # bucket currently reports the same passed-attempt count.
+            passed_count = await self.db.quiz_attempts.count_documents({
+                "user_id": user_id,
+                "passed": True,
+            })
+            stats_by_type = {content_type: passed_count for content_type in ["article", "podcast"]}
+
+            return {
+                "user": user,
+                "recent_completions": recent_completions,
+                "stats_by_type": stats_by_type
+            }
+        except Exception as e:
+            logger.error(f"Error getting user dashboard: {e}")
+            return {}
+
+# Singleton instances
 user_service = UserService()
+async_user_service = AsyncUserService()
 
 
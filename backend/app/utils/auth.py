@@ -2,9 +2,10 @@ import os
 from typing import Optional
 
 from fastapi import Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import settings
-from app.services.user_service import user_service
+from app.services.user_service import async_user_service
 from app.utils.azure_ad import AzureADVerifier, AzureADVerificationError
 
 _verifier: Optional[AzureADVerifier] = None
@@ -31,7 +32,7 @@ if settings.AZURE_AD_TENANT_ID and settings.AZURE_AD_CLIENT_ID:
         logger.warning("Failed to initialise Azure AD verifier: %s. Using dev bypass if enabled.", exc)
 
 
-def _get_dev_bypass_user() -> dict:
+async def _get_dev_bypass_user() -> dict:
     claims = {
         "oid": settings.AUTH_DEV_BYPASS_USER_OID,
         "preferred_username": settings.AUTH_DEV_BYPASS_USER_EMAIL,
@@ -41,21 +42,23 @@ def _get_dev_bypass_user() -> dict:
         "tid": settings.AUTH_DEV_BYPASS_TENANT_ID,
         "jobTitle": settings.AUTH_DEV_BYPASS_JOB_ROLE,
     }
-    user = user_service.get_or_create_user_from_claims(claims)
+    user = await async_user_service.get_or_create_user_from_claims(claims)
     return {
         "id": user["id"],
         "email": user.get("email"),
         "organization_id": user.get("organization_id"),
         "role": user.get("role", settings.AZURE_AD_DEFAULT_ROLE),
+        "job_role": user.get("job_role"),
+        "source_ids": user.get("source_ids"),
         "claims": claims,
     }
 
 
-def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
+async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
     """Validate a bearer token and return the associated user record."""
     if settings.AUTH_DEV_BYPASS:
         # Development bypass: ignore tokens entirely when enabled.
-        return _get_dev_bypass_user()
+        return await _get_dev_bypass_user()
 
     if not _verifier:
         # If neither verifier nor bypass is available, return 500
@@ -65,7 +68,7 @@ def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
                 detail="Authentication is not configured. Set AUTH_DEV_BYPASS=true for local development or configure Azure AD.",
             )
         # Fall back to dev bypass if available
-        return _get_dev_bypass_user()
+        return await _get_dev_bypass_user()
 
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header missing")
@@ -75,12 +78,16 @@ def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid bearer token")
 
     try:
-        claims = _verifier.validate(token)
+        # Repeat tokens are answered from the verifier's cache; only a first-seen
+        # token pays for signature verification (and possibly a JWKS fetch) in the threadpool.
+        claims = _verifier.get_cached_claims(token)
+        if claims is None:
+            claims = await run_in_threadpool(_verifier.validate, token)
     except AzureADVerificationError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
 
     try:
-        user = user_service.get_or_create_user_from_claims(claims)
+        user = await async_user_service.get_or_create_user_from_claims(claims)
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -92,6 +99,8 @@ def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
         "email": user.get("email"),
         "organization_id": user.get("organization_id"),
         "role": user.get("role", settings.AZURE_AD_DEFAULT_ROLE),
+        "job_role": user.get("job_role"),
+        "source_ids": user.get("source_ids"),
         "claims": claims,
     }
 
@@ -1,3 +1,6 @@
+import hashlib
+import logging
+import threading
 import time
 from typing import Any, Dict, List, Optional
 
@@ -5,6 +8,19 @@ import requests
 from jose import jwk, jwt
 from jose.utils import base64url_decode
 
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Signing keys are considered fresh for an hour, then served stale while a
+# background refresh runs.
+SIGNING_KEYS_TTL_SECONDS = 3600
+# Unknown ``kid`` values force a synchronous refresh at most this often, so a
+# stream of forged headers cannot hammer the JWKS endpoint.
+FORCED_REFRESH_INTERVAL_SECONDS = 300
+# Verified claims are cached until the token's ``exp`` but never longer than this.
+CLAIMS_CACHE_MAX_TTL_SECONDS = 900
+
 
 class AzureADVerificationError(Exception):
     """Raised when an Azure AD token fails validation."""
@@ -13,7 +29,7 @@ class AzureADVerificationError(Exception):
 class AzureADVerifier:
     """Validates Azure AD issued JWT access tokens."""
 
-    def __init__(self, tenant_id: str, audiences: List[str]) -> None:
+    def __init__(self, tenant_id: str, audiences: List[str], claims_cache_size: int = 4096) -> None:
         if not tenant_id:
             raise ValueError("Azure AD tenant ID is required")
         if not audiences:
@@ -26,7 +42,13 @@ class AzureADVerifier:
 
         self._jwks_uri: Optional[str] = None
         self._signing_keys: Dict[str, Dict[str, Any]] = {}
+        self._key_objects: Dict[str, Any] = {}
         self._signing_keys_expires_at = 0.0
+        self._last_forced_refresh = 0.0
+        self._refresh_lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
+
+        self._claims_cache: TTLCache[Dict[str, Any]] = TTLCache(max_entries=claims_cache_size)
 
     def _load_openid_configuration(self) -> None:
         response = requests.get(self._openid_config_url, timeout=5)
@@ -36,11 +58,7 @@ class AzureADVerifier:
         if not self._jwks_uri:
             raise AzureADVerificationError("JWKS URI not found in OpenID configuration")
 
-    def _refresh_signing_keys(self, force: bool = False) -> None:
-        now = time.time()
-        if not force and now < self._signing_keys_expires_at and self._signing_keys:
-            return
-
+    def _fetch_signing_keys(self) -> None:
         if not self._jwks_uri:
             self._load_openid_configuration()
 
@@ -50,27 +68,87 @@ class AzureADVerifier:
         response = requests.get(self._jwks_uri, timeout=5)
         response.raise_for_status()
         jwks = response.json()
-        keys = jwks.get("keys", [])
-        self._signing_keys = {key["kid"]: key for key in keys if "kid" in key}
-        # cache keys for one hour by default
-        self._signing_keys_expires_at = now + 3600
+        keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+
+        key_objects: Dict[str, Any] = {}
+        for kid, key_data in keys.items():
+            try:
+                key_objects[kid] = jwk.construct(key_data)
+            except Exception as exc:
+                logger.warning("Skipping unusable Azure AD signing key %s: %s", kid, exc)
+
+        # Swap both maps in one step so readers never see a half-built set
+        self._signing_keys, self._key_objects = keys, key_objects
+        self._signing_keys_expires_at = time.time() + SIGNING_KEYS_TTL_SECONDS
+
+    def _refresh_in_background(self) -> None:
+        with self._refresh_lock:
+            if self._background_refresh and self._background_refresh.is_alive():
+                return
+
+            def _run() -> None:
+                try:
+                    self._fetch_signing_keys()
+                except Exception as exc:
+                    # Keep serving the stale keys; the next request retries
+                    logger.warning("Background Azure AD key refresh failed: %s", exc)
+
+            self._background_refresh = threading.Thread(
+                target=_run, name="azure-ad-jwks-refresh", daemon=True
+            )
+            self._background_refresh.start()
 
-    def _get_signing_key(self, kid: str) -> Dict[str, Any]:
+    def _refresh_signing_keys(self, force: bool = False) -> None:
+        now = time.time()
+        if force:
+            if now - self._last_forced_refresh < FORCED_REFRESH_INTERVAL_SECONDS:
+                return
+            self._last_forced_refresh = now
+            self._fetch_signing_keys()
+            return
+
+        if not self._key_objects:
+            # Nothing to serve yet, so the first request has to wait
+            with self._refresh_lock:
+                if not self._key_objects:
+                    self._fetch_signing_keys()
+            return
+
+        if now >= self._signing_keys_expires_at:
+            # Stale-while-revalidate: keep verifying with the current keys
+            self._refresh_in_background()
+
+    def _get_signing_key(self, kid: str) -> Any:
         self._refresh_signing_keys()
-        key = self._signing_keys.get(kid)
+        key = self._key_objects.get(kid)
         if key:
             return key
         # Refresh once more in case of rollover
         self._refresh_signing_keys(force=True)
-        key = self._signing_keys.get(kid)
+        key = self._key_objects.get(kid)
         if not key:
             raise AzureADVerificationError("Signing key not found for token")
         return key
 
+    @staticmethod
+    def _token_cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get_cached_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return claims for a token verified earlier, without any I/O"""
+        if not token:
+            return None
+        claims = self._claims_cache.get(self._token_cache_key(token))
+        return dict(claims) if claims is not None else None
+
     def validate(self, token: str) -> Dict[str, Any]:
         if not token:
             raise AzureADVerificationError("Token missing")
 
+        cached = self.get_cached_claims(token)
+        if cached is not None:
+            return cached
+
         try:
             header = jwt.get_unverified_header(token)
         except Exception as exc:
@@ -80,8 +158,7 @@ class AzureADVerifier:
         if not kid:
             raise AzureADVerificationError("Token missing key identifier (kid)")
 
-        key_data = self._get_signing_key(kid)
-        signing_key = jwk.construct(key_data)
+        signing_key = self._get_signing_key(kid)
 
         message, encoded_signature = token.rsplit(".", 1)
         decoded_signature = base64url_decode(encoded_signature.encode("utf-8"))
@@ -112,6 +189,8 @@ class AzureADVerifier:
         if issuer != self._issuer:
             raise AzureADVerificationError("Token issuer mismatch")
 
+        expires_at = min(float(exp), now + CLAIMS_CACHE_MAX_TTL_SECONDS) if exp else now + CLAIMS_CACHE_MAX_TTL_SECONDS
+        self._claims_cache.set(self._token_cache_key(token), dict(claims), expires_at=expires_at)
         return claims
 
 
@@ -0,0 +1,88 @@
+import re
+from typing import Dict, List, Optional
+
+# Rough size of a token in English text, good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN
+
+
+def chunk_content(
+    content: str,
+    transcript_segments: Optional[List[Dict]] = None,
+    max_tokens: int = 2000,
+) -> List[Dict]:
+    """Split content into pieces of at most ``max_tokens``.
+
+    Transcripts are cut on ``transcript_segments`` boundaries and each chunk
+    keeps ``start_ms``/``end_ms``; other text is cut on paragraphs, then
+    sentences. Content that fits comes back as a single chunk.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if transcript_segments:
+        pieces = [
+            {"text": (segment.get("text") or "").strip(), "start_ms": segment.get("start_ms"), "end_ms": segment.get("end_ms")}
+            for segment in transcript_segments
+        ]
+        pieces = [piece for piece in pieces if piece["text"]]
+    else:
+        pieces = [{"text": paragraph.strip()} for paragraph in _PARAGRAPH_BREAK.split(content or "") if paragraph.strip()]
+
+    chunks: List[Dict] = []
+    current: Optional[Dict] = None
+    for piece in pieces:
+        for text in _split_oversized(piece["text"], max_chars):
+            if current is not None and len(current["text"]) + len(text) + 1 <= max_chars:
+                current["text"] += "\n" + text
+                if piece.get("end_ms") is not None:
+                    current["end_ms"] = piece["end_ms"]
+                continue
+            current = {"text": text}
+            if transcript_segments:
+                current["start_ms"] = piece.get("start_ms")
+                current["end_ms"] = piece.get("end_ms")
+            chunks.append(current)
+    return chunks
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """Break a single paragraph or segment that alone exceeds the budget"""
+    if len(text) <= max_chars:
+        return [text]
+    parts: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+def group_by_budget(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """Consecutive runs of texts whose combined size stays within ``max_tokens``"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    groups: List[List[str]] = []
+    size = 0
+    for text in texts:
+        if groups and size + len(text) <= max_chars:
+            groups[-1].append(text)
+            size += len(text)
+        else:
+            groups.append([text])
+            size = len(text)
+    return groups
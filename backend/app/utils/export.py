@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from bson import ObjectId
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Spreadsheets evaluate cells starting with these as formulas, so quote them as text
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(_csv_cell(value) for value in values)
+    return buffer.getvalue()
+
+
+async def encode_rows(
+    rows: AsyncIterator[Dict[str, Any]],
+    export_format: str,
+    columns: List[str],
+) -> AsyncIterator[str]:
+    """Serialize rows one at a time so the response never holds the full export"""
+    if export_format == "csv":
+        yield _csv_line(columns)
+        async for row in rows:
+            yield _csv_line([row.get(column) for column in columns])
+    elif export_format == "ndjson":
+        async for row in rows:
+            yield json.dumps({column: row.get(column) for column in columns}, default=_json_default) + "\n"
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
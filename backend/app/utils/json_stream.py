@@ -0,0 +1,58 @@
+import json
+from typing import Any, List, Optional
+
+
+class JsonArrayStream:
+    """Pulls the objects out of the first JSON array in text that arrives in chunks.
+
+    ``feed`` returns the array's objects completed by each chunk, so a reply
+    like ``{"steps": [{...}, {...}]}`` can be used before the model finishes
+    it. Only the brackets and quotes are tracked; every object is still
+    decoded with ``json.loads`` once it is closed.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        items: List[Any] = []
+        if self.done:
+            return items
+        self._text += chunk
+        for index in range(self._scanned, len(self._text)):
+            char = self._text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = self._depth
+                elif char == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item_start = index
+            elif char in "}]":
+                if char == "}" and self._item_start is not None and self._depth == self._array_depth + 1:
+                    try:
+                        items.append(json.loads(self._text[self._item_start:index + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                elif char == "]" and self._depth == self._array_depth:
+                    self.done = True
+                    break
+                self._depth -= 1
+        self._scanned = len(self._text)
+        return items
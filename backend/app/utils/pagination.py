@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+# Marker for datetimes inside the JSON payload so they round-trip exactly
+_DATETIME_TAG = "$dt"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {_DATETIME_TAG: value.isoformat()}
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def _decode_value(value: Any, allowed: Tuple[type, ...]) -> Any:
+    """A cursor value as a scalar of one of the ``allowed`` types, never a query operator"""
+    if isinstance(value, dict):
+        if set(value) != {_DATETIME_TAG} or not isinstance(value[_DATETIME_TAG], str):
+            raise InvalidCursorError("Malformed pagination cursor")
+        value = datetime.fromisoformat(value[_DATETIME_TAG])
+    # bool is an int subclass, but no sort key is a bool
+    if isinstance(value, bool) or not isinstance(value, allowed):
+        raise InvalidCursorError("Malformed pagination cursor")
+    return value
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Pack the sort key of the last returned document into an opaque token"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, field_types: Sequence[Tuple[type, ...]]) -> List[Any]:
+    """Unpack a cursor, checking each value against the types its sort field allows.
+
+    Cursors come from the client, so anything but the expected scalars is
+    rejected before it can reach a query.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as exc:
+        raise InvalidCursorError("Malformed pagination cursor") from exc
+    if not isinstance(values, list) or len(values) != len(field_types):
+        raise InvalidCursorError("Malformed pagination cursor")
+    try:
+        return [_decode_value(value, allowed) for value, allowed in zip(values, field_types)]
+    except InvalidCursorError:
+        raise
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursorError("Malformed pagination cursor") from exc
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """Build the "strictly after this sort key" filter for keyset pagination.
+
+    For a sort ``[(a, -1), (b, -1)]`` and last key ``(A, B)`` this yields
+    ``{"$or": [{a: {"$lt": A}}, {a: None}, {a: A, b: {"$lt": B}}, {a: A, b: None}]}``,
+    which Mongo answers with range scans on an index that matches the sort.
+
+    Null and missing fields sort lowest, so they come last in a descending
+    sort and first in an ascending one, and ``$lt``/``$gt`` never match them;
+    they get their own branches.
+    """
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        prefix: Dict[str, Any] = {
+            prefix_field: values[index] for index, (prefix_field, _) in enumerate(sort[:position])
+        }
+        value = values[position]
+        if value is None:
+            # Only non-null values follow a null in ascending order; nothing does in descending
+            if direction > 0:
+                branches.append({**prefix, field: {"$ne": None}})
+            continue
+        branches.append({**prefix, field: {"$lt" if direction < 0 else "$gt": value}})
+        if direction < 0:
+            branches.append({**prefix, field: None})
+    return {"$or": branches} if branches else {"_id": {"$exists": False}}
+
+
+def cursor_values(document: Dict[str, Any], sort: List[Tuple[str, int]]) -> List[Any]:
+    values: List[Optional[Any]] = []
+    for field, _ in sort:
+        if field == "_id":
+            values.append(str(document.get("_id") or document.get("id")))
+        else:
+            values.append(document.get(field))
+    return values
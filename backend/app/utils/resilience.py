@@ -0,0 +1,257 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream that is currently failing."""
+
+
+class TokenBucket:
+    """Client-side limiter for a requests-per-minute and tokens-per-minute quota.
+
+    ``reserve`` always succeeds and returns how long the caller must wait
+    before sending: capacity may go into debt, which keeps callers ordered and
+    lets both threads and coroutines share one bucket. A limit of 0 disables
+    that dimension.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        self._rpm = requests_per_minute
+        self._tpm = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._rpm > 0 or self._tpm > 0
+
+    def reserve(self, tokens: int) -> float:
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self._rpm > 0:
+                self._requests = min(float(self._rpm), self._requests + elapsed * self._rpm / 60.0)
+                self._requests -= 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests * 60.0 / self._rpm)
+            if self._tpm > 0:
+                # A single call larger than the whole quota still goes through eventually
+                tokens = min(tokens, self._tpm)
+                self._tokens = min(float(self._tpm), self._tokens + elapsed * self._tpm / 60.0)
+                self._tokens -= tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens * 60.0 / self._tpm)
+            return wait
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and fails fast for
+    ``reset_timeout`` seconds, then lets a single probe call through."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            retry_in = max(0.0, self._reset_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(f"Upstream unavailable; retrying in {retry_in:.0f}s")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._state = self.CLOSED
+
+    def release_probe(self) -> None:
+        """End a call that never reached the upstream without changing the state"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+# How a failed call is treated, as returned by a CallGuard's ``classify``
+THROTTLED = "throttled"   # quota hit: retry after backoff, upstream is healthy
+TRANSIENT = "transient"   # timeout, connection or 5xx: retry, counts against the breaker
+REJECTED = "rejected"     # the request itself was refused or bad: raise immediately
+ABORTED = "aborted"       # failed before reaching the upstream: raise, breaker untouched
+
+
+class CallGuard:
+    """Retry with jittered exponential backoff, rate limiting and a circuit breaker
+    around an upstream call, usable from threads and coroutines alike.
+
+    ``classify`` maps an exception to ``(kind, retry_after_seconds)`` where kind
+    is THROTTLED, TRANSIENT, REJECTED or ABORTED; the server's Retry-After, when given,
+    replaces the computed backoff.
+    """
+
+    def __init__(
+        self,
+        classify: Callable[[BaseException], Tuple[str, Optional[float]]],
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self._classify = classify
+        self._bucket = bucket or TokenBucket()
+        self._breaker = breaker or CircuitBreaker()
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, float] = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "throttled": 0,
+            "circuit_rejections": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "backoff_wait_seconds": 0.0,
+        }
+
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            self._admit()
+            wait = self._reserve(tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                result = fn()
+            except BaseException as exc:
+                delay = self._on_error(exc, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            self._admit()
+            wait = self._reserve(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except BaseException as exc:
+                delay = self._on_error(exc, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["circuit_state"] = self._breaker.state
+        return metrics
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self._backoff_max)
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * (2 ** attempt)))
+
+    def _admit(self) -> None:
+        try:
+            self._breaker.before_call()
+        except CircuitOpenError:
+            self._count("circuit_rejections")
+            raise
+        self._count("calls")
+
+    def _reserve(self, tokens: int) -> float:
+        wait = self._bucket.reserve(tokens)
+        if wait:
+            self._count("rate_limit_wait_seconds", wait)
+        return wait
+
+    def _on_success(self) -> None:
+        self._breaker.record_success()
+        self._count("successes")
+
+    def _on_error(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None when the error should propagate"""
+        if isinstance(exc, (asyncio.CancelledError, KeyboardInterrupt, SystemExit)):
+            # Says nothing about the upstream; only free a half-open probe for the next caller
+            self._breaker.release_probe()
+            return None
+
+        kind, retry_after = self._classify(exc)
+        if kind == ABORTED:
+            self._breaker.release_probe()
+            self._count("failures")
+            return None
+        if kind == TRANSIENT:
+            self._breaker.record_failure()
+        else:
+            # The upstream answered, so it is healthy even if this call failed
+            self._breaker.record_success()
+        if kind == THROTTLED:
+            self._count("throttled")
+        if kind == REJECTED or attempt >= self._max_retries:
+            self._count("failures")
+            return None
+        delay = self.backoff_delay(attempt, retry_after)
+        self._count("retries")
+        self._count("backoff_wait_seconds", delay)
+        return delay
+
+    def _count(self, metric: str, amount: float = 1) -> None:
+        with self._lock:
+            self._metrics[metric] += amount
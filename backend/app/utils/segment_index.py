@@ -0,0 +1,81 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bump when the stored layout or tokenization changes; older indexes are rebuilt on read
+SEGMENT_INDEX_VERSION = 1
+# Standard BM25 parameters: term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]{3,}")
+_STOPWORDS = {
+    "about", "after", "also", "and", "are", "been", "but", "can", "did", "does", "for", "from", "had",
+    "has", "have", "how", "into", "its", "not", "our", "than", "that", "the", "their", "them", "then",
+    "there", "these", "they", "this", "was", "were", "what", "when", "which", "who", "why", "will",
+    "with", "would", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+def build_segment_index(transcript_segments: List[Dict]) -> Dict:
+    """Inverted index over a transcript: token -> ``[[segment position, term frequency], ...]``.
+
+    Positions refer to ``transcript_segments`` as stored, so the index is kept
+    beside the segments it was built from. Tokens are ``[a-z0-9]`` only and
+    safe to use as field names.
+    """
+    postings: Dict[str, List[List[int]]] = {}
+    lengths: List[int] = []
+    for position, segment in enumerate(transcript_segments):
+        counts = Counter(tokenize(segment.get("text") or ""))
+        lengths.append(sum(counts.values()))
+        for token, frequency in counts.items():
+            postings.setdefault(token, []).append([position, frequency])
+    indexed = [length for length in lengths if length]
+    return {
+        "version": SEGMENT_INDEX_VERSION,
+        "segment_count": len(transcript_segments),
+        "lengths": lengths,
+        "avg_length": sum(indexed) / len(indexed) if indexed else 0.0,
+        "postings": postings,
+    }
+
+
+def index_matches_segments(index: Optional[Dict], transcript_segments: List[Dict]) -> bool:
+    """Whether a stored index was built, in this layout, for these segments"""
+    return bool(
+        index
+        and index.get("version") == SEGMENT_INDEX_VERSION
+        and index.get("segment_count") == len(transcript_segments)
+    )
+
+
+def rank_segments(index: Dict, query_tokens: Iterable[str], limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Segment positions by BM25 score for the query, best first; segments matching no term are left out.
+
+    Only the postings of the query's tokens are read. A token repeated in the
+    query counts that many times.
+    """
+    postings = index.get("postings") or {}
+    lengths = index.get("lengths") or []
+    avg_length = index.get("avg_length") or 1.0
+    document_count = sum(1 for length in lengths if length)
+
+    scores: Dict[int, float] = {}
+    for token, query_frequency in Counter(query_tokens).items():
+        matches = postings.get(token)
+        if not matches:
+            continue
+        idf = math.log(1.0 + (document_count - len(matches) + 0.5) / (len(matches) + 0.5))
+        for position, frequency in matches:
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[position] / avg_length)
+            score = idf * frequency * (BM25_K1 + 1.0) / (frequency + norm)
+            scores[position] = scores.get(position, 0.0) + query_frequency * score
+
+    ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+    return ranked[:limit] if limit is not None else ranked
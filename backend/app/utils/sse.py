@@ -0,0 +1,10 @@
+import json
+from typing import Any
+
+# Comment frame that keeps idle proxies from closing a quiet stream
+KEEPALIVE = ": keepalive\n\n"
+
+
+def format_sse(event: str, data: Any) -> str:
+    """One server-sent event frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,205 @@
+"""
+AI pipeline throughput benchmark
+Drives content ingestion (create_content_item), quiz creation
+(get_or_create_quiz) and quiz submission (submit_quiz) end to end against the
+deterministic local model provider, so the whole path can be load-tested
+without network access or model quota. Latency and error injection mimic the
+real deployment; every stage reports its throughput, latency and how many
+model calls it made.
+
+Usage:
+    python benchmarks/ai_throughput.py --items 50 --concurrency 8 --latency-ms 400 --error-rate 0.05
+
+Requires MONGODB_URI. Run it against a scratch database (MONGODB_DB_NAME):
+the benchmark's items are removed afterwards unless --keep is given, but
+materialized feed segments may show them until they are rebuilt.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The services pick their provider when they are created, so this must come first
+os.environ["AI_PROVIDER"] = "local"
+
+from bson import ObjectId
+
+from app.core.database import close_mongo_connection, get_database
+from app.services.content_service import content_service
+from app.services.generation_cache import generation_cache
+from app.services.llm_providers import local_provider
+from app.services.quiz_service import quiz_service
+
+ROLES = ["Data Analyst - Hospitality", "Software Engineer - FinTech", "Product Manager - Retail"]
+TOPICS = [
+    "payments", "forecasting", "loyalty", "pricing", "compliance", "latency", "inventory",
+    "personalisation", "fraud", "churn", "onboarding", "analytics", "automation", "security",
+]
+
+
+def _paragraphs(rng_offset: int, words: int) -> List[str]:
+    """Varied filler text so every item produces distinct prompts"""
+    paragraphs = []
+    sentence_count = max(1, words // 12)
+    sentences = [
+        f"Teams focused on {TOPICS[(rng_offset + index) % len(TOPICS)]} reported that "
+        f"{TOPICS[(rng_offset * 3 + index) % len(TOPICS)]} improved after the {index + 1} quarter review."
+        for index in range(sentence_count)
+    ]
+    for start in range(0, len(sentences), 5):
+        paragraphs.append(" ".join(sentences[start:start + 5]))
+    return paragraphs
+
+
+def _content_data(run_id: str, index: int, content_type: str, words: int) -> dict:
+    paragraphs = _paragraphs(index, words)
+    data = {
+        "title": f"Benchmark {run_id} item {index}",
+        "description": "\n\n".join(paragraphs),
+        "type": content_type,
+        "source_id": f"benchmark-{run_id}",
+        "role_tags": ROLES[: 1 + index % len(ROLES)],
+        "published_at": datetime.utcnow(),
+    }
+    if content_type == "podcast":
+        data["transcript"] = data["description"]
+        data["transcript_segments"] = [
+            {"text": text, "start_ms": position * 30000, "end_ms": (position + 1) * 30000}
+            for position, text in enumerate(paragraphs)
+        ]
+    return data
+
+
+def _run_stage(label: str, jobs: List[Callable[[], Optional[str]]], concurrency: int) -> List[Optional[str]]:
+    """Run the jobs on a thread pool and print throughput, latency and model usage"""
+    latencies: List[float] = []
+    calls_before, errors_before = local_provider.calls, local_provider.errors
+
+    def timed(job: Callable[[], Optional[str]]) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            return job()
+        except Exception as e:
+            print(f"  {label} job failed: {e}")
+            return None
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, jobs))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    succeeded = sum(1 for result in results if result)
+    print(
+        f"{label:<8} {len(jobs) / elapsed if elapsed else 0.0:>8.1f} ops/s  "
+        f"ok {succeeded:>4}/{len(jobs):<4} "
+        f"p50 {statistics.median(latencies) * 1000:>8.1f} ms  "
+        f"p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:>8.1f} ms  "
+        f"model calls {local_provider.calls - calls_before:>5}  "
+        f"injected errors {local_provider.errors - errors_before:>4}"
+    )
+    return results
+
+
+def _submit(quiz: Optional[dict], user_id: str, fail: bool) -> Optional[str]:
+    if not quiz:
+        return None
+    answers = [question.get("correct_answer", 0) for question in quiz.get("questions", [])]
+    if fail:
+        # Wrong on every question, so review hints and the retry quiz are generated too
+        answers = [(answer + 1) % 4 for answer in answers]
+    result = quiz_service.submit_quiz(user_id, quiz["content_id"], quiz["id"], answers)
+    return None if "error" in result else result["status"]
+
+
+def _cleanup(content_ids: List[str], run_id: str) -> None:
+    db = get_database()
+    object_ids = [ObjectId(content_id) for content_id in content_ids]
+    db.content_items.delete_many({"source_id": f"benchmark-{run_id}"})
+    db.content_bodies.delete_many({"_id": {"$in": object_ids}})
+    db.quizzes.delete_many({"content_id": {"$in": content_ids}})
+    db.quiz_attempts.delete_many({"content_id": {"$in": content_ids}})
+
+
+def main(args: argparse.Namespace) -> None:
+    local_provider.latency_ms = args.latency_ms
+    local_provider.jitter_ms = args.jitter_ms
+    local_provider.error_rate = args.error_rate
+    generation_cache.enabled = args.cache
+
+    run_id = uuid.uuid4().hex[:8]
+    user_id = str(ObjectId())
+    print(
+        f"run {run_id}: {args.items} {args.type} items of ~{args.words} words, concurrency {args.concurrency}, "
+        f"latency {args.latency_ms:g}+{args.jitter_ms:g} ms, error rate {args.error_rate:g}"
+    )
+
+    content_ids: List[str] = []
+    try:
+        created = _run_stage(
+            "ingest",
+            [
+                lambda index=index: content_service.create_content_item(_content_data(run_id, index, args.type, args.words))
+                for index in range(args.items)
+            ],
+            args.concurrency,
+        )
+        content_ids = [content_id for content_id in created if content_id]
+
+        # Several learners open each quiz at once; only one generation per item should run
+        quizzes: Dict[str, dict] = {}
+
+        def open_quiz(content_id: str) -> Optional[str]:
+            quiz = quiz_service.get_or_create_quiz(content_id)
+            if quiz:
+                quizzes[content_id] = quiz
+            return quiz["id"] if quiz else None
+
+        _run_stage(
+            "quiz",
+            [lambda content_id=content_id: open_quiz(content_id) for content_id in content_ids for _ in range(args.learners)],
+            args.concurrency,
+        )
+
+        _run_stage(
+            "submit",
+            [
+                lambda content_id=content_id, index=index: _submit(
+                    quizzes.get(content_id), user_id, fail=index < len(content_ids) * args.fail_ratio
+                )
+                for index, content_id in enumerate(content_ids)
+            ],
+            args.concurrency,
+        )
+        print(f"total model calls {local_provider.calls}, injected errors {local_provider.errors}")
+    finally:
+        if content_ids and not args.keep:
+            _cleanup(content_ids, run_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--type", choices=["article", "podcast"], default="article")
+    parser.add_argument("--words", type=int, default=800, help="Length of each item; long podcasts exercise map-reduce")
+    parser.add_argument("--learners", type=int, default=3, help="Concurrent quiz requests per item")
+    parser.add_argument("--fail-ratio", type=float, default=0.5, help="Share of submissions that fail and need a follow-up")
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Keep the generation cache enabled")
+    parser.add_argument("--keep", action="store_true", help="Leave the benchmark's items in the database")
+    try:
+        main(parser.parse_args())
+    finally:
+        close_mongo_connection()
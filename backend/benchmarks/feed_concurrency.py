@@ -0,0 +1,111 @@
+"""
+Feed concurrency benchmark
+Measures how many concurrent feed requests a single event loop (one uvicorn
+worker) can serve with the blocking pymongo services versus the Motor-backed
+async services.
+
+Usage:
+    python benchmarks/feed_concurrency.py --requests 200 --concurrency 50
+
+Requires MONGODB_URI and at least one user document (see app/scripts/init_db.py).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import close_mongo_connection, get_database
+from app.services.content_service import async_content_service, content_service
+
+
+async def _blocking_handler(user_id: str) -> None:
+    # Mirrors the previous route bodies: an async def calling sync pymongo
+    content_service.get_user_feed(user_id)
+
+
+async def _async_handler(user_id: str) -> None:
+    await async_content_service.get_user_feed(user_id)
+
+
+async def _measure_loop_lag(stop: asyncio.Event, samples: List[float], interval: float = 0.005) -> None:
+    """Record how late the event loop wakes up a sleeping coroutine"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+async def _run(
+    handler: Callable[[str], Awaitable[None]],
+    user_id: str,
+    total_requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+
+    async def one_request() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(user_id)
+            latencies.append(time.perf_counter() - started)
+
+    lag_task = asyncio.create_task(_measure_loop_lag(stop, lag_samples))
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    latencies.sort()
+    return {
+        "elapsed_s": elapsed,
+        "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": max(lag_samples, default=0.0) * 1000,
+    }
+
+
+def _print_result(label: str, result: Dict[str, float]) -> None:
+    print(
+        f"{label:<10} {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+        f"max loop lag {result['max_loop_lag_ms']:>8.1f} ms"
+    )
+
+
+async def main(total_requests: int, concurrency: int, user_id: str = None) -> None:
+    if not user_id:
+        user = get_database().users.find_one({}, {"_id": 1})
+        if not user:
+            raise SystemExit("No users found; run app/scripts/init_db.py first")
+        user_id = str(user["_id"])
+
+    # Warm up both connection pools so pool creation is not measured
+    await _blocking_handler(user_id)
+    await _async_handler(user_id)
+
+    print(f"{total_requests} feed requests, concurrency {concurrency}, user {user_id}")
+    _print_result("blocking", await _run(_blocking_handler, user_id, total_requests, concurrency))
+    _print_result("async", await _run(_async_handler, user_id, total_requests, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--user-id", default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.requests, args.concurrency, args.user_id))
+    finally:
+        close_mongo_connection()
@@ -16,7 +16,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.core.config import settings
 from app.core.database import get_database
 from app.services.ai_service import ai_service
+from app.services.content_index import content_index
 from app.services.content_service import content_service
+from app.services.quiz_service import quiz_service
 from app.services.speech_service import speech_service
 from app.services.storage_service import storage_service
 
@@ -26,6 +28,8 @@ def main(timer: func.TimerRequest) -> None:
     """Timer-triggered function to ingest content from various sources"""
     try:
         db = get_database()
+        # New items are added to the index as they are created and saved at the end
+        content_index.refresh()
         
         # Get all active sources
         sources = list(db.sources.find({"enabled": True}))
@@ -38,12 +42,35 @@ def main(timer: func.TimerRequest) -> None:
             elif source_type == "podcast":
                 ingest_podcast_source(source, db)
         
-        logger.info("Content ingestion completed")
+        logger.info(f"Content ingestion completed; enrichment {ai_service.enrichment_stats()}")
+        content_index.save()
+
+        # Generate quizzes for the new items now, so no reader waits on one
+        if settings.QUIZ_PRECOMPUTE_ENABLED:
+            counts = quiz_service.precompute_quizzes(limit=settings.QUIZ_PRECOMPUTE_BATCH_SIZE)
+            logger.info(f"Quiz precompute completed; {counts['ready']} ready, {counts['failed']} failed")
     except Exception as e:
         logger.error(f"Error in content ingestion: {e}")
 
+def create_content_batch(batch: List[dict], label: str) -> None:
+    """Create the collected items together so their relevance is scored in shared calls.
+
+    An item failing enrichment must not drop the rest of the feed; it is not
+    stored, so the next run picks it up again.
+    """
+    if not batch:
+        return
+    content_ids = content_service.create_content_items(batch)
+    for content_data, content_id in zip(batch, content_ids):
+        if content_id:
+            logger.info(f"Created {label} content item: {content_id}")
+        else:
+            logger.error(f"Error creating {label} content item for {content_data.get('url')}")
+    batch.clear()
+
 def ingest_rss_source(source: dict, db):
     """Ingest content from RSS feed"""
+    batch: List[dict] = []
     try:
         url = source.get("url")
         if not url:
@@ -54,7 +81,7 @@ def ingest_rss_source(source: dict, db):
         
         for entry in feed.entries:
             # Check if content already exists
-            existing = db.content_items.find_one({"url": entry.link})
+            existing = db.content_items.find_one({"url": entry.link}, {"_id": 1})
             if existing:
                 continue
             
@@ -87,13 +114,16 @@ def ingest_rss_source(source: dict, db):
                 "organization_id": source.get("organization_id")
             }
             
-            content_id = content_service.create_content_item(content_data)
-            logger.info(f"Created content item: {content_id}")
+            batch.append(content_data)
+            if len(batch) >= settings.AI_SCORING_BATCH_SIZE:
+                create_content_batch(batch, "article")
+        create_content_batch(batch, "article")
     except Exception as e:
         logger.error(f"Error ingesting RSS source: {e}")
 
 def ingest_podcast_source(source: dict, db):
     """Ingest content from podcast RSS feed"""
+    batch: List[dict] = []
     try:
         url = source.get("url")
         if not url:
@@ -114,7 +144,7 @@ def ingest_podcast_source(source: dict, db):
                 continue
             
             # Check if content already exists
-            existing = db.content_items.find_one({"url": entry.link})
+            existing = db.content_items.find_one({"url": entry.link}, {"_id": 1})
             if existing:
                 continue
             
@@ -168,8 +198,10 @@ def ingest_podcast_source(source: dict, db):
                 "organization_id": source.get("organization_id")
             }
             
-            content_id = content_service.create_content_item(content_data)
-            logger.info(f"Created podcast content item: {content_id}")
+            batch.append(content_data)
+            if len(batch) >= settings.AI_SCORING_BATCH_SIZE:
+                create_content_batch(batch, "podcast")
+        create_content_batch(batch, "podcast")
     except Exception as e:
         logger.error(f"Error ingesting podcast source: {e}")
 
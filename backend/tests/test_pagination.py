@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.utils.pagination import cursor_values, decode_cursor, encode_cursor, keyset_filter
+
+mongomock = pytest.importorskip("mongomock")
+
+SORT = [("priority_score", -1), ("published_at", -1), ("_id", -1)]
+CURSOR_TYPES = ((int, float, type(None)), (datetime, type(None)), (str,))
+
+
+def _collection():
+    collection = mongomock.MongoClient().db.items
+    published = datetime(2026, 1, 1)
+    documents = []
+    for index in range(30):
+        document = {"_id": ObjectId()}
+        # Every third item has no score, every fourth no date, some neither
+        if index % 3:
+            document["priority_score"] = (index % 5) / 5
+        if index % 4:
+            document["published_at"] = published + timedelta(hours=index % 7)
+        elif index % 8 == 0:
+            document["published_at"] = None
+        documents.append(document)
+    collection.insert_many(documents)
+    return collection
+
+
+def _page(collection, cursor, limit):
+    query = {}
+    if cursor:
+        values = decode_cursor(cursor, CURSOR_TYPES)
+        values[-1] = ObjectId(values[-1])
+        query = keyset_filter(SORT, values)
+    found = list(collection.find(query).sort(SORT).limit(limit + 1))
+    page = found[:limit]
+    next_cursor = encode_cursor(cursor_values(page[-1], SORT)) if len(found) > limit else None
+    return page, next_cursor
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7])
+def test_pages_reach_items_with_null_sort_keys(limit):
+    collection = _collection()
+    expected = [document["_id"] for document in collection.find().sort(SORT)]
+
+    seen = []
+    page, cursor = _page(collection, None, limit)
+    seen.extend(document["_id"] for document in page)
+    while cursor:
+        page, cursor = _page(collection, cursor, limit)
+        seen.extend(document["_id"] for document in page)
+
+    assert seen == expected
+
+
+def test_null_cursor_value_keeps_only_the_equality_prefix():
+    last_id = ObjectId()
+    branches = keyset_filter(SORT, [None, None, last_id])["$or"]
+    # No range branch on the null fields, which would match nothing
+    assert all(isinstance(branch["priority_score"], type(None)) for branch in branches)
+    assert all(isinstance(branch["published_at"], type(None)) for branch in branches)
+    assert {"priority_score": None, "published_at": None, "_id": {"$lt": last_id}} in branches
+
+
+def test_non_null_cursor_value_also_matches_nulls_after_it():
+    published = datetime(2026, 1, 1)
+    branches = keyset_filter(SORT[:2], [0.5, published])["$or"]
+    assert {"priority_score": None} in branches
+    assert {"priority_score": 0.5, "published_at": None} in branches
@@ -1,6 +1,6 @@
 'use client'
 
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { useParams } from 'next/navigation'
 import Link from 'next/link'
 
@@ -42,6 +42,52 @@ export default function ContentPage() {
   const [loadingSummary, setLoadingSummary] = useState(false)
   const [currentStep, setCurrentStep] = useState(0)
   const [audioPlaying, setAudioPlaying] = useState(false)
+  const summaryStream = useRef<EventSource | null>(null)
+
+  useEffect(() => () => summaryStream.current?.close(), [])
+
+  // Storyboard steps arrive one by one while they are generated; the narration follows
+  const streamSummary = () => {
+    summaryStream.current?.close()
+    const source = new EventSource(
+      `${process.env.NEXT_PUBLIC_API_BASE_URL}/api/content/${contentId}/summary?stream=true`
+    )
+    summaryStream.current = source
+    setAnimatedSummary({ storyboard: [], audio_url: '' })
+    setCurrentStep(0)
+
+    source.addEventListener('step', event => {
+      const step: StoryboardStep = JSON.parse((event as MessageEvent).data)
+      setAnimatedSummary(current => ({
+        storyboard: [...(current?.storyboard ?? []), step],
+        audio_url: current?.audio_url ?? '',
+      }))
+      setShowSummary(true)
+      setLoadingSummary(false)
+    })
+    source.addEventListener('audio', event => {
+      const { audio_url } = JSON.parse((event as MessageEvent).data)
+      setAnimatedSummary(current => current && { ...current, audio_url })
+    })
+    source.addEventListener('done', event => {
+      setAnimatedSummary(JSON.parse((event as MessageEvent).data))
+      source.close()
+    })
+    source.addEventListener('failed', event => {
+      const { detail } = JSON.parse((event as MessageEvent).data)
+      console.error('Error streaming animated summary:', detail)
+      alert(detail || 'Error loading animated summary')
+      source.close()
+      setLoadingSummary(false)
+    })
+    source.onerror = () => {
+      // Connection dropped before the stream finished
+      if (source.readyState !== EventSource.CLOSED) {
+        source.close()
+        setLoadingSummary(false)
+      }
+    }
+  }
 
   useEffect(() => {
     let cancelled = false
@@ -149,21 +195,12 @@ export default function ContentPage() {
           
           {/* Animated Summary Button */}
           <button
-            onClick={async () => {
+            onClick={() => {
               if (!showSummary) {
                 setLoadingSummary(true)
-                try {
-                  const summary = await api.getJson<AnimatedSummary>(`/api/content/${contentId}/summary`)
-                  setAnimatedSummary(summary)
-                  setShowSummary(true)
-                } catch (error: any) {
-                  console.error('Error fetching animated summary:', error)
-                  const errorMessage = error?.message || 'Error loading animated summary'
-                  alert(errorMessage)
-                } finally {
-                  setLoadingSummary(false)
-                }
+                streamSummary()
               } else {
+                summaryStream.current?.close()
                 setShowSummary(false)
                 setCurrentStep(0)
                 setAudioPlaying(false)
@@ -17,6 +17,26 @@ interface Quiz {
   questions: QuizQuestion[]
 }
 
+interface QuizPending {
+  status: 'pending'
+  retry_after?: number
+}
+
+interface AttemptFollowup {
+  job_id: string
+  status: 'pending' | 'generating' | 'ready' | 'failed'
+  review_hints?: any
+  next_quiz_id?: string
+  // failed is retried in the background; only final means no more updates
+  final: boolean
+}
+
+// Give up waiting for a quiz, or a failed attempt's hints, after this many polls
+const MAX_PENDING_POLLS = 24
+const FOLLOWUP_POLL_MS = 2000
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
 interface QuizSubmitResponse {
   status: string
   correct_count?: number
@@ -27,6 +47,8 @@ interface QuizSubmitResponse {
   tech_score?: number
   current_streak?: number
   longest_streak?: number
+  job_id?: string
+  followup_status?: string
 }
 
 export default function QuizPage() {
@@ -41,9 +63,22 @@ export default function QuizPage() {
   const [loading, setLoading] = useState(true)
   const [nextQuizId, setNextQuizId] = useState<string | null>(null)
 
+  const fetchQuiz = useCallback(async (path: string): Promise<Quiz> => {
+    for (let polls = 0; ; polls++) {
+      const response = await api.getJson<Quiz | QuizPending>(path)
+      if (!('status' in response)) {
+        return response
+      }
+      if (polls >= MAX_PENDING_POLLS) {
+        throw new Error('Quiz is still being generated')
+      }
+      await sleep((response.retry_after ?? 5) * 1000)
+    }
+  }, [api])
+
   const loadOriginalQuiz = useCallback(async () => {
     try {
-      const data = await api.getJson<Quiz>(`/api/quiz/content/${contentId}`)
+      const data = await fetchQuiz(`/api/quiz/content/${contentId}`)
       setQuiz(data)
       setAnswers(new Array(data.questions.length).fill(-1))
       setNextQuizId(null)
@@ -53,7 +88,7 @@ export default function QuizPage() {
     } finally {
       setLoading(false)
     }
-  }, [api, contentId])
+  }, [fetchQuiz, contentId])
 
   useEffect(() => {
     let cancelled = false
@@ -65,7 +100,7 @@ export default function QuizPage() {
 
       if (isRetry) {
         try {
-          const data = await api.getJson<Quiz>(`/api/quiz/content/${contentId}/retry`)
+          const data = await fetchQuiz(`/api/quiz/content/${contentId}/retry`)
           if (!cancelled) {
             setQuiz(data)
             setAnswers(new Array(data.questions.length).fill(-1))
@@ -89,7 +124,7 @@ export default function QuizPage() {
     return () => {
       cancelled = true
     }
-  }, [api, contentId, loadOriginalQuiz])
+  }, [fetchQuiz, contentId, loadOriginalQuiz])
 
   const handleAnswerChange = (questionIndex: number, answerIndex: number) => {
     const newAnswers = [...answers]
@@ -97,6 +132,33 @@ export default function QuizPage() {
     setAnswers(newAnswers)
   }
 
+  // Review hints and the retry quiz for a failed attempt are generated in the background
+  const waitForFollowup = async (jobId: string) => {
+    for (let polls = 0; polls < MAX_PENDING_POLLS; polls++) {
+      await sleep(FOLLOWUP_POLL_MS)
+      try {
+        const followup = await api.getJson<AttemptFollowup>(`/api/quiz/attempts/${jobId}`)
+        if (followup.status === 'ready') {
+          setResult(current => current && {
+            ...current,
+            review_hints: followup.review_hints,
+            next_quiz_id: followup.next_quiz_id,
+          })
+          if (followup.next_quiz_id) {
+            setNextQuizId(followup.next_quiz_id)
+          }
+          return
+        }
+        if (followup.final) {
+          return
+        }
+      } catch (error) {
+        console.error('Error fetching review hints:', error)
+        return
+      }
+    }
+  }
+
   const handleSubmit = async () => {
     if (answers.some(a => a === -1)) {
       alert('Please answer all questions')
@@ -113,6 +175,8 @@ export default function QuizPage() {
       setSubmitted(true)
       if (data.next_quiz_id) {
         setNextQuizId(data.next_quiz_id)
+      } else if (data.job_id) {
+        await waitForFollowup(data.job_id)
       }
     } catch (error) {
       console.error('Error submitting quiz:', error)
@@ -15,9 +15,19 @@ type ContentItem = {
   priority_score?: number
 }
 
+type FeedPage = {
+  feed: ContentItem[]
+  next_cursor?: string | null
+}
+
+const FEED_PAGE_SIZE = 20
+
 export default function Dashboard() {
   const api = useApiClient()
   const [feed, setFeed] = useState<ContentItem[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [prefetchedPage, setPrefetchedPage] = useState<FeedPage | null>(null)
+  const [queueSize, setQueueSize] = useState(3)
   const [loading, setLoading] = useState(true)
   const [techScore, setTechScore] = useState(0)
   const [streak, setStreak] = useState(0)
@@ -40,18 +50,31 @@ export default function Dashboard() {
     }
   }, [api])
 
+  const fetchFeedPage = useCallback(
+    (cursor?: string | null) => {
+      const params = new URLSearchParams({ limit: String(FEED_PAGE_SIZE) })
+      if (cursor) {
+        params.set('cursor', cursor)
+      }
+      return api.getJson<FeedPage>(`/api/feed?${params.toString()}`)
+    },
+    [api],
+  )
+
   useEffect(() => {
     let cancelled = false
     const loadFeed = async () => {
       try {
-        const data = await api.getJson<{ feed: ContentItem[] }>('/api/feed')
+        const data = await fetchFeedPage()
         if (!cancelled) {
           setFeed(Array.isArray(data.feed) ? data.feed : [])
+          setNextCursor(data.next_cursor ?? null)
         }
       } catch (error) {
         console.warn('Unable to fetch feed.', error)
         if (!cancelled) {
           setFeed([])
+          setNextCursor(null)
         }
       } finally {
         if (!cancelled) {
@@ -66,7 +89,35 @@ export default function Dashboard() {
     return () => {
       cancelled = true
     }
-  }, [api, loadStats])
+  }, [fetchFeedPage, loadStats])
+
+  // Prefetch the next page as soon as its cursor is known so "Load more" is instant
+  useEffect(() => {
+    if (!nextCursor) {
+      setPrefetchedPage(null)
+      return
+    }
+    let cancelled = false
+    fetchFeedPage(nextCursor)
+      .then(page => {
+        if (!cancelled) {
+          setPrefetchedPage(page)
+        }
+      })
+      .catch(error => console.warn('Unable to prefetch feed page.', error))
+    return () => {
+      cancelled = true
+    }
+  }, [fetchFeedPage, nextCursor])
+
+  const handleLoadMore = useCallback(() => {
+    setQueueSize(size => size + FEED_PAGE_SIZE)
+    if (prefetchedPage && feed.length - 1 < queueSize + FEED_PAGE_SIZE) {
+      setFeed(current => [...current, ...(prefetchedPage.feed ?? [])])
+      setNextCursor(prefetchedPage.next_cursor ?? null)
+      setPrefetchedPage(null)
+    }
+  }, [feed.length, prefetchedPage, queueSize])
 
   useEffect(() => {
     const handler = () => {
@@ -186,7 +237,7 @@ export default function Dashboard() {
               </span>
             </header>
             <div className="mt-4 space-y-4">
-              {feed.slice(1, 4).map(item => (
+              {feed.slice(1, queueSize + 1).map(item => (
                 <article
                   key={item.id}
                   className="rounded-2xl border border-white/5 bg-[#101d16]/70 p-5 transition hover:border-[#9FE870]/30"
@@ -222,6 +273,16 @@ export default function Dashboard() {
                 </article>
               ))}
 
+              {!loading && (feed.length - 1 > queueSize || prefetchedPage) && (
+                <button
+                  type="button"
+                  onClick={handleLoadMore}
+                  className="w-full rounded-2xl border border-[#9FE870]/25 px-4 py-3 text-xs font-semibold text-[#9FE870] hover:bg-[#132118]"
+                >
+                  Load more
+                </button>
+              )}
+
               {!loading && feed.slice(1).length === 0 && (
                 <p className="rounded-2xl border border-white/5 bg-[#101d16]/60 px-5 py-6 text-sm text-[#b4ccbf]/70">
                   Finish the spotlight to unlock the next set of role-tuned pieces.